@@ -0,0 +1,284 @@
+import os
+import json
+import atexit
+import asyncio
+
+from app.services.kokoro_service import kokoro_client
+from app.services.openai_service import generate_script
+from app.core.audio_generator import generate_audio
+from app.core.caption_generator import generate_timed_captions, get_audio_duration
+from app.services.pexels_diversity import generate_video_url_diverse
+from app.core.render import get_output_media
+from app.core.search_generator import getVideoSearchQueriesTimed, merge_empty_intervals
+from app.utils.helpers import start_pexel_recipe_log, finalize_pexel_recipe_log
+from app.utils.job_workspace import JobWorkspace
+from app.utils.pg_cache import pg_cache_stats
+
+import argparse
+from datetime import datetime
+
+# One event loop per process, so the pooled Kokoro session keeps its connections across worker jobs
+_event_loop = None
+
+
+def _close_event_loop():
+    if _event_loop is not None and not _event_loop.is_closed():
+        _event_loop.run_until_complete(kokoro_client.close())
+        _event_loop.close()
+
+
+def run_async(coro):
+    """Run coro to completion on the process-wide event loop."""
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+        atexit.register(_close_event_loop)
+    return _event_loop.run_until_complete(coro)
+
+
+def build_parser():
+    """Command line of a video job (shared by app.py and the warm worker)."""
+    parser = argparse.ArgumentParser(description="Generate a video from a topic or custom script.")
+    parser.add_argument("input_text", type=str, nargs="?", help="The topic or custom script for the video")
+    parser.add_argument("--theme", type=str, required=True, help="Theme for the video")
+    parser.add_argument("--aspect-ratio", type=str, default="landscape", choices=["landscape", "portrait", "square"], help="Aspect ratio for the video")
+    parser.add_argument("--title", type=str, required=True, help="Title (video name)")
+    parser.add_argument("--custom-script", action="store_true", help="Use input as custom script (bypass OpenAI)")
+    parser.add_argument("--render-mode", type=str, default="video", choices=["video", "photo", "hybrid (both)"], help="Rendering mode: video, photo, or hybrid (both)")
+    parser.add_argument("--audio-file", type=str, help="Path to user-uploaded audio file (bypass TTS)")
+    parser.add_argument("--disable-captions", action="store_true", help="Do not render captions on the video")
+    parser.add_argument("--disable-audio", action="store_true", help="Do not add audio to the rendered video")
+    parser.add_argument("--soundtrack-file", type=str, help="Optional background soundtrack audio file")
+    parser.add_argument("--soundtrack-volume", type=float, default=0.4, help="Soundtrack volume (0.0-1.0, default 0.1)")
+    parser.add_argument("--background-video-file", type=str, help="Optional background video file to use for the entire video")
+    parser.add_argument("--max-seconds", type=int, default=30, help="Maximum duration for the script in seconds")
+    parser.add_argument("--max-words", type=int, default=50, help="Maximum number of words for the script")
+    parser.add_argument("--caption-vertical-align", type=str, default="bottom", choices=["bottom", "center"], help="Vertical alignment for captions: bottom or center")
+    parser.add_argument("--caption-margin", type=int, default=80, help="Margin (in px) from the bottom or center for captions")
+    parser.add_argument("--max-caption-size", type=int, default=None, help="Maximum caption size (characters)")
+    parser.add_argument("--caption-font", type=str, default="LuckiestGuy-Regular.ttf", help="Font filename for captions")
+    parser.add_argument("--render-backend", type=str, default=None, choices=["moviepy", "ffmpeg", "parallel"], help="Render backend (default: RENDER_BACKEND env or moviepy)")
+    parser.add_argument("--caption-mode", type=str, default=None, choices=["overlay", "ass"], help="Caption burn-in: per-caption overlays or one ASS subtitle script (default: CAPTION_MODE env or overlay)")
+    parser.add_argument("--subtitle-files", action="store_true", help="Also write .ass/.srt soft subtitles next to the rendered video")
+    parser.add_argument("--job-dir", type=str, default=None, help="Working directory for this job (owned by the caller); a new workspace under JOB_ROOT if omitted")
+    parser.add_argument("--output-file", type=str, default="rendered_video.mp4", help="Path of the rendered video")
+    return parser
+
+
+def run_job(args):
+    """Run one video job end to end from parsed build_parser() arguments. Returns the output path."""
+    # --- Per-job workspace: TTS audio, intermediates and the ffmpeg report never collide with other jobs ---
+    job = None
+    if args.job_dir:
+        job_dir = os.path.abspath(args.job_dir)
+        os.makedirs(job_dir, exist_ok=True)
+    else:
+        job = JobWorkspace()
+        job_dir = job.dir
+    print("job_dir:", job_dir)
+    # Handed to the render's ffmpeg processes, never set in os.environ: a warm worker
+    # would carry it into the next job
+    ffreport = f"file={os.path.join(job_dir, 'ffmpeg_report.log')}:level=32" if os.environ.get("FFREPORT") else None
+    SAMPLE_FILE_NAME = os.path.join(job_dir, "audio_tts.wav")
+    VIDEO_SERVER = "pexel"
+    # Per-sentence offsets in the narration, when it was synthesized sentence by sentence
+    sentence_offsets = None
+    job_succeeded = False
+    try:
+        print("video_title:", args.title)
+
+        # Start a new Pexels log file for this run
+        start_pexel_recipe_log(args.title)
+
+        if args.audio_file:
+            # User uploaded audio, skip script and TTS
+            print("Using uploaded audio file:", args.audio_file)
+            SAMPLE_FILE_NAME = args.audio_file
+            # For search/captions, need a script text. Use a placeholder or empty string.
+            response = ""
+        else:
+            if args.custom_script:
+                print("Generating script (custom)...")
+                response = args.input_text
+            else:
+                print("Generating script with OpenAI...")
+                response = generate_script(
+                    args.theme,
+                    args.input_text,
+                    max_seconds=args.max_seconds,
+                    max_words=args.max_words
+                )
+            print("script:", response)
+
+            print("Generating audio...")
+            sentence_offsets = run_async(generate_audio(response, SAMPLE_FILE_NAME))
+            print(f"[TTS] Kokoro client: {kokoro_client.metrics()}")
+
+        print("Generating captions...")
+        max_caption_size = args.max_caption_size
+        timed_captions = generate_timed_captions(
+            SAMPLE_FILE_NAME,
+            aspect_ratio=args.aspect_ratio,
+            max_caption_size=max_caption_size,
+            # TTS of a known script: align it instead of transcribing (uploaded audio is transcribed)
+            known_text=None if args.audio_file else response,
+            sentence_offsets=sentence_offsets
+        )
+        print("timed_captions:", json.dumps(timed_captions))  # Print as JSON
+        if not timed_captions:
+            print("WARNING: No captions were generated!")
+
+        # --- DEBUG: Print audio duration and last caption end ---
+        audio_duration = get_audio_duration(SAMPLE_FILE_NAME)
+        print("AUDIO FILE DURATION:", audio_duration)
+        if timed_captions:
+            print("LAST CAPTION END:", timed_captions[-1][0][1])
+
+        # --- Save captions as JSON ---
+        captions_dir = "exports/logs/captions"
+        os.makedirs(captions_dir, exist_ok=True)
+        safe_title = "".join(c for c in args.title if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        captions_path = os.path.join(captions_dir, f"{timestamp}-{safe_title}.json")
+        captions_log = {
+            "title": args.title,
+            "audio_file": SAMPLE_FILE_NAME,
+            "audio_duration": audio_duration,
+            "captions": timed_captions
+        }
+        with open(captions_path, "w", encoding="utf-8") as f:
+            json.dump(captions_log, f, indent=2)
+        print(f"Saved captions log: {captions_path}")
+
+        print("Generating search terms...")
+        # For search_terms, if response is empty (audio upload), you may want to use captions as context
+        if not response and timed_captions:
+            # Use all captions as a single string for search context
+            response = " ".join([c[1] for c in timed_captions])
+        search_terms = getVideoSearchQueriesTimed(response, timed_captions)
+        print("search_terms:", json.dumps(search_terms))  # Print as JSON
+        print("theme:", args.theme)
+        print("input_text:", args.input_text)
+
+        # --- Check for uploaded background video ---
+        if getattr(args, "background_video_file", None) and os.path.exists(args.background_video_file):
+            print(f"[BG VIDEO] Using uploaded background video: {args.background_video_file}")
+            # Generate captions as usual
+            timed_captions = generate_timed_captions(
+                SAMPLE_FILE_NAME, aspect_ratio=args.aspect_ratio, known_text=None if args.audio_file else response,
+                sentence_offsets=sentence_offsets
+            )
+            print("timed_captions:", json.dumps(timed_captions))
+            # Prepare render_kwargs as before
+            render_kwargs = dict(
+                preset='ultrafast',
+                aspect_ratio=args.aspect_ratio,
+                disable_captions=getattr(args, "disable_captions", False),
+                disable_audio=getattr(args, "disable_audio", False),
+                background_video_file=args.background_video_file
+            )
+            if getattr(args, "soundtrack_file", None):
+                print(f"Soundtrack file received: {args.soundtrack_file}")
+                render_kwargs["soundtrack_file"] = args.soundtrack_file
+                render_kwargs["soundtrack_volume"] = args.soundtrack_volume
+            # Call get_output_media with empty background_video_data
+            video = get_output_media(
+                SAMPLE_FILE_NAME,
+                timed_captions,
+                [],  # No Pexels backgrounds
+                VIDEO_SERVER,
+                caption_vertical_align=getattr(args, "caption_vertical_align", "bottom"),
+                caption_margin=getattr(args, "caption_margin", 80),
+                caption_font=getattr(args, "caption_font", "LuckiestGuy-Regular.ttf"),
+                render_backend=args.render_backend,
+                caption_mode=args.caption_mode,
+                subtitle_files=args.subtitle_files,
+                output_file=args.output_file,
+                work_dir=job_dir,
+                ffreport=ffreport,
+                **render_kwargs
+            )
+            print("video:", video)
+            finalize_pexel_recipe_log()
+            job_succeeded = True
+            return video
+
+        background_video_urls = None
+        if search_terms is not None:
+            print("Generating background video URLs...")
+            background_video_urls = generate_video_url_diverse(
+                search_terms,
+                VIDEO_SERVER,
+                theme=args.theme,
+                aspect_ratio=args.aspect_ratio,
+                video_name=args.title,
+                topic=args.input_text,
+                render_mode=args.render_mode  # <-- pass render mode
+            )
+            print("background_video_urls:", json.dumps(background_video_urls))  # Print as JSON
+        else:
+            print("No background video")
+            print("Failed search_terms:", search_terms)
+            print("Query context - theme:", args.theme, "input_text:", args.input_text)
+
+        if background_video_urls is not None:
+            # Only keep [interval, url] for merge_empty_intervals
+            background_video_urls_for_merge = [
+                [interval, url] for interval, url, _ in background_video_urls
+            ]
+            print("Merging empty intervals in background video URLs...")
+            background_video_urls_merged = merge_empty_intervals(background_video_urls_for_merge)
+            if background_video_urls_merged is not None:
+                print("Rendering video...")
+                # --- Prepare kwargs for soundtrack ---
+                render_kwargs = dict(
+                    preset='ultrafast',
+                    aspect_ratio=args.aspect_ratio,
+                    disable_captions=getattr(args, "disable_captions", False),
+                    disable_audio=getattr(args, "disable_audio", False)
+                )
+                if getattr(args, "soundtrack_file", None):
+                    print(f"Soundtrack file received: {args.soundtrack_file}")
+                    render_kwargs["soundtrack_file"] = args.soundtrack_file
+                    render_kwargs["soundtrack_volume"] = args.soundtrack_volume
+                video = get_output_media(
+                    SAMPLE_FILE_NAME,
+                    timed_captions,
+                    background_video_urls_merged,
+                    VIDEO_SERVER,
+                    preset='ultrafast',
+                    aspect_ratio=args.aspect_ratio,
+                    disable_captions=getattr(args, "disable_captions", False),
+                    disable_audio=getattr(args, "disable_audio", False),
+                    soundtrack_file=render_kwargs.get("soundtrack_file"),
+                    soundtrack_volume=render_kwargs.get("soundtrack_volume"),
+                    background_video_file=getattr(args, "background_video_file", None),
+                    caption_font=getattr(args, "caption_font", "LuckiestGuy-Regular.ttf"),
+                    caption_vertical_align=getattr(args, "caption_vertical_align", "bottom"),
+                    caption_margin=getattr(args, "caption_margin", 80),
+                    render_backend=args.render_backend,
+                    caption_mode=args.caption_mode,
+                    subtitle_files=args.subtitle_files,
+                    output_file=args.output_file,
+                    work_dir=job_dir,
+                    ffreport=ffreport
+                )
+                print("video:", video)
+            else:
+                print("merge_empty_intervals returned None. Failed background_video_urls:", json.dumps(background_video_urls))
+                print("Query context - theme:", args.theme, "input_text:", args.input_text, "search_terms:", json.dumps(search_terms))
+        else:
+            print("background_video_urls is None. Failed search_terms:", json.dumps(search_terms))
+            print("Query context - theme:", args.theme, "input_text:", args.input_text)
+
+        finalize_pexel_recipe_log()
+        job_succeeded = True
+        return args.output_file if os.path.exists(args.output_file) else None
+    finally:
+        print(f"[PG CACHE] {pg_cache_stats()}")
+        if job is not None:
+            job.cleanup(success=job_succeeded)
+
+
+def main(argv=None):
+    run_job(build_parser().parse_args(argv))
@@ -0,0 +1,123 @@
+"""
+ASS/SRT subtitle generation.
+
+Turns timed_captions plus the caption style used by get_output_media into an
+ASS script that libass burns in during the encode pass (ffmpeg "ass" filter),
+and writes ASS/SRT sidecar files for soft subtitles next to the MP4.
+"""
+
+import os
+
+from PIL import ImageColor, ImageFont
+
+from app.core.ffmpeg_render import escape_filter_value
+
+# ASS alignment codes (numpad layout)
+ASS_ALIGN_BOTTOM_CENTER = 2
+ASS_ALIGN_MIDDLE_CENTER = 5
+
+
+def ass_color(color):
+    """CSS-style color ("yellow", "#ff0", "rgba(0,0,0,0)") -> ASS &HAABBGGRR (alpha 00 = opaque)."""
+    rgba = ImageColor.getrgb(color)
+    r, g, b = rgba[:3]
+    a = rgba[3] if len(rgba) == 4 else 255
+    return f"&H{255 - a:02X}{b:02X}{g:02X}{r:02X}"
+
+
+def ass_timestamp(seconds):
+    centis = int(round(max(seconds, 0) * 100))
+    h, rem = divmod(centis, 360000)
+    m, rem = divmod(rem, 6000)
+    s, cs = divmod(rem, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def srt_timestamp(seconds):
+    millis = int(round(max(seconds, 0) * 1000))
+    h, rem = divmod(millis, 3600000)
+    m, rem = divmod(rem, 60000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def resolve_font(font):
+    """
+    (family name, bold, fonts directory) for libass.
+    Font files are identified by their family name and loaded from their directory;
+    bare names such as "DejaVuSans-Bold" go to fontconfig.
+    """
+    if os.path.exists(font):
+        try:
+            family, style_name = ImageFont.truetype(font, 10).getname()
+            return family, "bold" in (style_name or "").lower(), os.path.dirname(os.path.abspath(font))
+        except Exception:
+            pass
+        return os.path.splitext(os.path.basename(font))[0], False, os.path.dirname(os.path.abspath(font))
+    bold = font.lower().endswith("-bold")
+    family = font[:-5] if bold else font
+    return family, bold, None
+
+
+def _escape_ass_text(text):
+    # Braces open override blocks and backslashes start tags
+    return text.replace("\\", "\\\\").replace("{", "(").replace("}", ")").replace("\n", "\\N")
+
+
+def build_ass(captions, style, width, height):
+    """ASS script for captions [((t1, t2), text), ...] styled like the overlay captions."""
+    family, bold, _ = resolve_font(style["font"])
+    side_margin = max(0, int((width - style["text_max_width"]) / 2))
+    if style.get("vertical_align") == "center":
+        alignment, margin_v = ASS_ALIGN_MIDDLE_CENTER, 0
+    else:
+        alignment, margin_v = ASS_ALIGN_BOTTOM_CENTER, int(style["margin"])
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{family},{style['fontsize']},{ass_color(style['fontcolor'])},{ass_color(style['fontcolor'])},"
+        f"{ass_color(style['stroke_color'])},&HFF000000,{-1 if bold else 0},0,0,0,100,100,0,0,1,"
+        f"{style['stroke_width']},0,{alignment},{side_margin},{side_margin},{margin_v},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for (t1, t2), text in captions:
+        lines.append(f"Dialogue: 0,{ass_timestamp(t1)},{ass_timestamp(t2)},Default,,0,0,0,,{_escape_ass_text(text)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_ass(captions, style, width, height, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(build_ass(captions, style, width, height))
+    return path
+
+
+def _srt_text(text):
+    # A blank line ends an SRT cue, so line breaks are kept but empty lines dropped
+    return "\n".join(line for line in text.splitlines() if line.strip())
+
+
+def write_srt(captions, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for n, ((t1, t2), text) in enumerate(captions, start=1):
+            f.write(f"{n}\n{srt_timestamp(t1)} --> {srt_timestamp(t2)}\n{_srt_text(text)}\n\n")
+    return path
+
+
+def ass_filter(ass_path, font):
+    """ffmpeg filter that burns ass_path with libass, pointing it at the caption font's directory."""
+    _, _, fonts_dir = resolve_font(font)
+    value = f"ass='{escape_filter_value(ass_path)}'"
+    if fonts_dir:
+        value += f":fontsdir='{escape_filter_value(fonts_dir)}'"
+    return value
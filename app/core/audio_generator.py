@@ -1,48 +1,158 @@
 import os
+import shutil
+import asyncio
+import tempfile
 import edge_tts
 # from loguru import logger
 from app.services.kokoro_service import kokoro_client
+from app.core.tts_sentences import split_sentences, wav_params, tts_cache_key, WavStitcher
+from app.utils.media_store import MediaStore
 
 VOICE_PROVIDER = os.getenv('VOICE_PROVIDER', 'kokoro')  # Kokoro is default
+EDGE_VOICE = "en-AU-WilliamNeural"
+# Synthesize sentence by sentence, TTS_CONCURRENCY at a time, and stitch them in order
+TTS_SENTENCE_SPLIT = str(os.getenv('TTS_SENTENCE_SPLIT', 'true')).lower() in ('true', '1', 'yes')
+TTS_CONCURRENCY = int(os.getenv('TTS_CONCURRENCY', '4'))
+# Every sentence is normalized to this before stitching (Kokoro's native format)
+TTS_SAMPLE_RATE = 24000
+TTS_PCM_PARAMS = (1, 2, TTS_SAMPLE_RATE)  # mono, 16-bit
+TTS_AUDIO_FORMAT = f"wav-pcm_s16le-{TTS_SAMPLE_RATE}-mono"
+# Synthesized sentences keyed by provider, voice, speech rate and normalized text
+TTS_CACHE = str(os.getenv('TTS_CACHE', 'true')).lower() in ('true', '1', 'yes')
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', 'temp/tts')
+TTS_CACHE_MAX_MB = int(os.getenv('TTS_CACHE_MAX_MB', '1024'))
 
-async def generate_audio(text, output_filename):
-    print("Generating audio...")
+_tts_store = None
+
+
+def get_tts_store():
+    global _tts_store
+    if _tts_store is None:
+        _tts_store = MediaStore(root=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024)
+    return _tts_store
+
+
+def _voice_settings(voice_provider):
+    """(provider, voice, speech rate) the provider is configured with."""
+    if voice_provider == 'edge':
+        return ('edge', EDGE_VOICE, None)
+    elif voice_provider == 'kokoro':
+        return ('kokoro', os.getenv('VOICE_ID', 'af_heart'), float(os.getenv('SPEECH_RATE', '0.8')))
+    raise ValueError(f"Unsupported voice provider: {voice_provider}")
+
+
+async def _edge_tts(text, output_filename):
+    communicate = edge_tts.Communicate(text, EDGE_VOICE)
+    await communicate.save(output_filename)
+
+
+async def _kokoro_tts(text, output_filename, voice_id, speech_rate):
+    """Kokoro speech for text streamed into output_filename; False when the service failed."""
+    # logger.debug(f"Using Kokoro TTS for: {text[:50]}...")
+    return await kokoro_client.save_speech(
+        text=text,
+        output_path=output_filename,
+        voice=voice_id,
+        speed=speech_rate,
+        response_format="wav"
+    )
+
+
+async def _synthesize(text, output_filename, voice):
+    """Synthesize text with voice settings; returns the settings actually used (edge-tts after a Kokoro failure)."""
+    provider, voice_id, speech_rate = voice
+    if provider == 'kokoro':
+        if await _kokoro_tts(text, output_filename, voice_id, speech_rate):
+            return voice
+        # logger.error("Kokoro service failed to generate audio, falling back to edge-tts")
+        print(f"[TTS] Kokoro failed, using edge-tts for: {text[:50]}")
+    await _edge_tts(text, output_filename)
+    return _voice_settings('edge')
+
+
+async def _to_pcm_wav(path, output_filename):
+    """path as a mono 16-bit TTS_SAMPLE_RATE WAV; edge-tts writes MP3 whatever the file name."""
     try:
-        if VOICE_PROVIDER == 'edge':
-            communicate = edge_tts.Communicate(text, "en-AU-WilliamNeural")
-            await communicate.save(output_filename)
-            
-        elif VOICE_PROVIDER == 'kokoro':
-            voice_id = os.getenv('VOICE_ID', 'af_heart')
-            speech_rate = float(os.getenv('SPEECH_RATE', '0.8'))
-            print(f"[DEBUG] Using Kokoro TTS voice: {voice_id}, speech_rate: {speech_rate}")
-            
-            # logger.debug(f"Using Kokoro TTS for: {text[:50]}...")
-            audio_data = await kokoro_client.create_speech(
-                text=text,
-                voice=voice_id,
-                speed=speech_rate,
-                response_format="wav"
-            )
-            if not audio_data:
-                # logger.error("Kokoro service failed to generate audio, falling back to edge-tts")
-                communicate = edge_tts.Communicate(text, "en-AU-WilliamNeural")
-                await communicate.save(output_filename)
-                return
-                
-            # Save the audio bytes to file
-            with open(output_filename, 'wb') as f:
-                f.write(audio_data)
-            # logger.success(f"Audio generated successfully: {output_filename}")
-            
-        else:
-            raise ValueError(f"Unsupported voice provider: {VOICE_PROVIDER}")
-            
-    except Exception as e:
-        print(f"Error generating audio: {e}")
-        raise
+        if wav_params(path) == TTS_PCM_PARAMS:
+            return path
+    except Exception:
+        pass
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-y", "-v", "error", "-nostdin", "-i", path,
+        "-ac", "1", "-ar", str(TTS_SAMPLE_RATE), "-c:a", "pcm_s16le", output_filename,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"Converting {path} to WAV failed: {stderr.decode(errors='replace')[-500:]}")
+    return output_filename
 
 
+async def _generate_sentences(sentences, output_filename, voice):
+    workdir = tempfile.mkdtemp(prefix="tts_", dir=os.path.dirname(os.path.abspath(output_filename)))
+    semaphore = asyncio.Semaphore(max(1, TTS_CONCURRENCY))
+    store = get_tts_store() if TTS_CACHE else None
+    # Cached sentences stay pinned until stitched, whatever other sentences are stored meanwhile
+    lease = store.lease() if store else None
 
+    async def sentence_audio(i, sentence):
+        if store:
+            cached = lease.get(tts_cache_key(*voice, sentence, TTS_AUDIO_FORMAT), suffix=".wav")
+            if cached:
+                stitcher.add(i, cached)
+                return
+        async with semaphore:
+            raw = os.path.join(workdir, f"sentence_{i:04d}.audio")
+            used = await _synthesize(sentence, raw, voice)
+        wav = await _to_pcm_wav(raw, os.path.join(workdir, f"sentence_{i:04d}.wav"))
+        if store:
+            # Stored under the voice that spoke it, so a fallback never stands in for Kokoro on the next run
+            wav = lease.put(tts_cache_key(*used, sentence, TTS_AUDIO_FORMAT), wav, suffix=".wav")
+        # Appended to the narration as soon as every earlier sentence is in
+        stitcher.add(i, wav)
+
+    stitcher = WavStitcher(output_filename)
+    tasks = [asyncio.ensure_future(sentence_audio(i, s)) for i, s in enumerate(sentences)]
+    try:
+        with stitcher:
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if lease:
+            lease.release()
+    offsets = stitcher.offsets
+    if store:
+        print(f"[TTS] Cache: {store.stats()}")
+    return [{"text": s, "start": round(start, 3), "end": round(end, 3)} for s, (start, end) in zip(sentences, offsets)]
 
 
+async def generate_audio(text, output_filename):
+    """
+    Narrate text into output_filename (mono 16-bit WAV) and return [{"text", "start", "end"}, ...]
+    per sentence. With TTS_SENTENCE_SPLIT the sentences are synthesized concurrently,
+    otherwise the script is synthesized as one piece.
+    """
+    print("Generating audio...")
+    # Read per call: a warm worker runs jobs with different providers in one process
+    voice_provider = os.getenv('VOICE_PROVIDER', VOICE_PROVIDER)
+    try:
+        voice = _voice_settings(voice_provider)
+        if voice_provider == 'kokoro':
+            print(f"[DEBUG] Using Kokoro TTS voice: {voice[1]}, speech_rate: {voice[2]}")
+        sentences = split_sentences(text) if TTS_SENTENCE_SPLIT else [text.strip()]
+        sentences = [s for s in sentences if s]
+        if not sentences:
+            raise ValueError("No text to narrate")
+        print(f"[TTS] {len(sentences)} sentences with {voice_provider}, {TTS_CONCURRENCY} at a time")
+        offsets = await _generate_sentences(sentences, output_filename, voice)
+        # logger.success(f"Audio generated successfully: {output_filename}")
+        return offsets
+    except Exception as e:
+        print(f"Error generating audio: {e}")
+        raise
@@ -0,0 +1,80 @@
+"""
+Known-text caption alignment.
+
+When the narration is TTS of a script we already have, there is nothing to
+recognise, only words to place in time. The script's words are spread over the
+speech spans found by the energy VAD in proportion to their length, so pauses
+between sentences stay silent. With the per-sentence offsets from sentence-level
+TTS each sentence's words are only spread over the speech inside that
+sentence, so a misjudged pause cannot shift later sentences. The result has the shape of a
+transcribe_timestamped result, so getCaptionsWithTime works on it unchanged.
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+def _speech_to_time(spans, offsets, position, prefer_next):
+    # offsets[k] is the speech time elapsed before spans[k]; a position exactly on a
+    # span boundary maps to the next span's start (word start) or this span's end (word end)
+    find = bisect_right if prefer_next else bisect_left
+    k = max(0, min(find(offsets, position) - 1, len(spans) - 1))
+    start, end = spans[k]
+    return min(end, start + position - offsets[k])
+
+
+def align_words_to_speech(words, spans):
+    """[{"text", "start", "end"}, ...] for words spread over speech spans by character length."""
+    spans = [(float(s), float(e)) for s, e in spans if e > s]
+    if not words or not spans:
+        return []
+    offsets = []
+    speech = 0.0
+    for s, e in spans:
+        offsets.append(speech)
+        speech += e - s
+    # +1 per word for the transition into the next word
+    weights = [len(word) + 1 for word in words]
+    scale = speech / sum(weights)
+    aligned = []
+    position = 0.0
+    for word, weight in zip(words, weights):
+        start = _speech_to_time(spans, offsets, position, prefer_next=True)
+        position += weight * scale
+        end = _speech_to_time(spans, offsets, min(position, speech), prefer_next=False)
+        aligned.append({"text": word, "start": round(start, 3), "end": round(max(end, start), 3)})
+    return aligned
+
+
+def align_sentences_to_speech(sentences, spans):
+    """Words of [{"text", "start", "end"}, ...] sentences, each aligned within its own time range."""
+    aligned = []
+    for sentence in sentences:
+        start, end = sentence["start"], sentence["end"]
+        window = [(max(s, start), min(e, end)) for s, e in spans if e > start and s < end]
+        aligned.extend(align_words_to_speech(sentence["text"].split(), window or [(start, end)]))
+    return aligned
+
+
+def align_known_text(audio_filename, text, spans=None, sentences=None):
+    """
+    transcribe_timestamped-shaped result for audio_filename whose spoken words are text.
+    sentences are optional per-sentence offsets of text in the audio.
+    Raises ValueError when no speech is detected.
+    """
+    if spans is None:
+        from app.core.vad import detect_speech_in_file
+        spans = detect_speech_in_file(audio_filename)
+    if sentences:
+        words = [word for sentence in sentences for word in sentence["text"].split()]
+        aligned = align_sentences_to_speech(sentences, spans) if spans else []
+    else:
+        words = text.split()
+        aligned = align_words_to_speech(words, spans)
+    if not aligned:
+        raise ValueError(f"No speech found in {audio_filename} to align {len(words)} words to")
+    print(f"[ALIGN] Aligned {len(words)} words to {len(spans)} speech spans")
+    return {
+        "text": " ".join(words),
+        "segments": [{"start": aligned[0]["start"], "end": aligned[-1]["end"], "text": " ".join(words), "words": aligned}],
+        "language": None,
+    }
@@ -1,25 +1,37 @@
-import whisper_timestamped as whisper
-from whisper_timestamped import load_model, transcribe_timestamped
-import re
-import wave
+import os
+
+from app.utils.media_probe import get_media_duration
+from app.core.transcription import transcribe
+from app.core.caption_alignment import align_known_text
+from app.core.caption_timing import build_captions
+
+# "transcribe": always run Whisper; "align": place the known script on the audio's speech spans (no Whisper).
+# Alignment stays opt-in until benchmarks/bench_caption_alignment.py shows its word timing is close to Whisper's
+CAPTION_ALIGNMENT = os.environ.get("CAPTION_ALIGNMENT", "transcribe")
 
 def get_audio_duration(audio_filename):
-    try:
-        with wave.open(audio_filename, 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            duration = frames / float(rate)
-            print(f"DEBUG: WAV duration for {audio_filename}: {duration}")
-            return duration
-    except Exception as e:
-        print(f"DEBUG: Failed to get WAV duration for {audio_filename}: {e}")
-        return None
+    duration = get_media_duration(audio_filename)
+    print(f"DEBUG: Audio duration for {audio_filename}: {duration}")
+    return duration
 
-def generate_timed_captions(audio_filename, model_size="base", aspect_ratio="landscape", max_caption_size=None):
+def generate_timed_captions(audio_filename, model_size=None, aspect_ratio="landscape", max_caption_size=None, known_text=None,
+                            sentence_offsets=None):
+    """
+    Timed captions [((t1, t2), text), ...] for audio_filename.
+    known_text is the exact script the audio speaks (TTS); it is aligned instead of transcribed,
+    within the per-sentence sentence_offsets returned by generate_audio when given.
+    """
     print("Generating captions...")
     try:
-        WHISPER_MODEL = load_model(model_size)
-        gen = transcribe_timestamped(WHISPER_MODEL, audio_filename, verbose=False, fp16=False)
+        gen = None
+        if known_text and known_text.strip() and CAPTION_ALIGNMENT == "align":
+            try:
+                gen = align_known_text(audio_filename, known_text, sentences=sentence_offsets)
+            except Exception as e:
+                print(f"Known-text alignment failed, transcribing instead: {e}")
+        if gen is None:
+            # Shared model, and the raw result is cached by audio content + settings
+            gen = transcribe(audio_filename, model_size=model_size)
         # Use provided max_caption_size if given, else default by aspect_ratio
         if max_caption_size is not None:
             maxCaptionSize = max_caption_size
@@ -58,26 +70,6 @@ def splitWordsBySize(words, maxCaptionSize):
         captions.append(caption)
     return captions
 
-def getTimestampMapping(whisper_analysis):
-    index = 0
-    locationToTimestamp = {}
-    print("Mapping timestamps...")
-    for segment in whisper_analysis['segments']:
-        for word in segment['words']:
-            newIndex = index + len(word['text']) + 1
-            locationToTimestamp[(index, newIndex)] = word['end']
-            index = newIndex
-    return locationToTimestamp
-
-def cleanWord(word):
-    return re.sub(r'[^\w\s\-_"\'\']', '', word)
-
-def interpolateTimeFromDict(word_position, d):
-    for key, value in d.items():
-        if key[0] <= word_position <= key[1]:
-            return value
-    return None
-
 def getCaptionsWithTime(
     whisper_analysis,
     maxCaptionSize=30,
@@ -85,61 +77,8 @@ def getCaptionsWithTime(
     split_on_sentences=False  # Not needed for this logic
 ):
     print("Processing captions with time...")
-    wordLocationToTime = getTimestampMapping(whisper_analysis)
-    position = 0
-    start_time = 0
-    CaptionsPairs = []
-    text = whisper_analysis['text']
-
-    # Find sentence boundaries (start indices in the text)
-    sentence_endings = [m.end() for m in re.finditer(r'[.!?]', text)]
-    sentence_starts = [0] + [i+1 for i in sentence_endings if i+1 < len(text)]
-    sentence_starts_set = set(sentence_starts)
-
-    words = text.split()
-    idx_in_text = 0
-    chunk_words = []
-    chunk_start_in_text = 0
-
-    for i, word in enumerate(words):
-        # Find the index of this word in the original text
-        idx_in_text = text.find(word, idx_in_text)
-        # If this word is the start of a sentence (except for the first word), and we already have words in chunk, flush the chunk
-        if i > 0 and idx_in_text in sentence_starts_set and chunk_words:
-            # End the current caption at the previous word (end of previous sentence)
-            caption = " ".join(chunk_words) if preserve_punctuation else cleanWord(" ".join(chunk_words))
-            position += len(caption) + 1
-            end_time = interpolateTimeFromDict(position, wordLocationToTime)
-            if end_time:
-                CaptionsPairs.append(((start_time, end_time), caption))
-                start_time = end_time
-            chunk_words = []
-            chunk_start_in_text = idx_in_text
-        chunk_words.append(word)
-        # If adding the next word would exceed maxCaptionSize, flush the chunk
-        if (i + 1 < len(words)):
-            next_word = words[i+1]
-            # Check if next word is the start of a sentence
-            next_idx_in_text = text.find(next_word, idx_in_text + len(word))
-            if len(" ".join(chunk_words + [next_word])) > maxCaptionSize or (next_idx_in_text in sentence_starts_set and chunk_words):
-                caption = " ".join(chunk_words) if preserve_punctuation else cleanWord(" ".join(chunk_words))
-                position += len(caption) + 1
-                end_time = interpolateTimeFromDict(position, wordLocationToTime)
-                if end_time:
-                    CaptionsPairs.append(((start_time, end_time), caption))
-                    start_time = end_time
-                chunk_words = []
-                chunk_start_in_text = next_idx_in_text
-    # Add any remaining words as the last caption
-    if chunk_words:
-        caption = " ".join(chunk_words) if preserve_punctuation else cleanWord(" ".join(chunk_words))
-        position += len(caption) + 1
-        end_time = interpolateTimeFromDict(position, wordLocationToTime)
-        if end_time:
-            CaptionsPairs.append(((start_time, end_time), caption))
-            start_time = end_time
-
-    return CaptionsPairs
+    # Sorted offset index + bisect (see caption_timing); same output as the original linear scan
+    return build_captions(whisper_analysis, maxCaptionSize=maxCaptionSize, preserve_punctuation=preserve_punctuation)
 
 def merge_captions_by_duration(captions, min_segment_duration=8, max_segment_duration=12):
     """
@@ -0,0 +1,104 @@
+"""
+Pillow caption rasterizer.
+
+Renders caption text straight to RGBA bitmaps with ImageFont (word wrap to
+text_max_width, fill and stroke) instead of going through TextClip. Bitmaps are
+cached per (text, font, size, colors, stroke, width) in memory for the life of
+the process and on disk across jobs, so repeated captions and styles are free.
+"""
+
+import os
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.utils.media_store import MediaStore
+
+# "pillow" (default) or "textclip" to keep MoviePy's TextClip
+CAPTION_RENDERER = os.environ.get("CAPTION_RENDERER", "pillow")
+CAPTION_CACHE_DIR = os.environ.get("CAPTION_CACHE_DIR", "temp/caption_cache")
+CAPTION_CACHE_MAX_MB = int(os.environ.get("CAPTION_CACHE_MAX_MB", "256"))
+CAPTION_MEMORY_CACHE_SIZE = int(os.environ.get("CAPTION_MEMORY_CACHE_SIZE", "1024"))
+
+
+@lru_cache(maxsize=64)
+def load_font(font, fontsize):
+    """Font file path or installed font name -> ImageFont; Pillow's default font if neither loads."""
+    try:
+        return ImageFont.truetype(font, fontsize)
+    except Exception:
+        print(f"[CAPTIONS] Could not load font '{font}', using Pillow default")
+        return ImageFont.load_default(size=fontsize)
+
+
+def wrap_caption_lines(text, font, fontsize, max_width):
+    """Greedy word wrap of text so each line fits in max_width pixels."""
+    pil_font = load_font(font, fontsize)
+    lines = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and pil_font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+def render_caption_image(text, font, fontsize, fontcolor, stroke_color, stroke_width, max_width):
+    """Rasterize one caption as a max_width-wide RGBA image with centered lines."""
+    pil_font = load_font(font, fontsize)
+    lines = wrap_caption_lines(text, font, fontsize, max_width) or [""]
+    ascent, descent = pil_font.getmetrics()
+    line_height = ascent + descent + 2 * stroke_width
+    image = Image.new("RGBA", (int(max_width), max(1, line_height * len(lines))), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for n, line in enumerate(lines):
+        x = (max_width - pil_font.getlength(line)) / 2
+        draw.text(
+            (x, n * line_height + stroke_width),
+            line,
+            font=pil_font,
+            fill=fontcolor,
+            stroke_width=stroke_width,
+            stroke_fill=stroke_color,
+        )
+    return image
+
+
+def caption_cache_key(text, font, fontsize, fontcolor, stroke_color, stroke_width, max_width):
+    raw = "\x1f".join(str(part) for part in (text, font, fontsize, fontcolor, stroke_color, stroke_width, max_width))
+    return "caption:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+_caption_store = None
+
+
+def get_caption_store():
+    global _caption_store
+    if _caption_store is None:
+        _caption_store = MediaStore(root=CAPTION_CACHE_DIR, max_bytes=CAPTION_CACHE_MAX_MB * 1024 * 1024)
+    return _caption_store
+
+
+@lru_cache(maxsize=CAPTION_MEMORY_CACHE_SIZE)
+def get_caption_array(text, font, fontsize, fontcolor, stroke_color, stroke_width, max_width):
+    """
+    RGBA caption bitmap as a read-only uint8 array (H, W, 4).
+    Memory hit -> no work; disk hit -> PNG decode; miss -> rasterize and store the PNG.
+    """
+    key = caption_cache_key(text, font, fontsize, fontcolor, stroke_color, stroke_width, max_width)
+
+    def rasterize(_key, output):
+        render_caption_image(text, font, fontsize, fontcolor, stroke_color, stroke_width, max_width).save(output, format="PNG")
+
+    path = get_caption_store().fetch(key, rasterize, suffix=".png")
+    with Image.open(path) as image:
+        array = np.array(image.convert("RGBA"))
+    array.setflags(write=False)
+    return array
@@ -0,0 +1,106 @@
+"""
+Caption timing engine.
+
+Builds the ((t1, t2), text) captions from a transcribe_timestamped result with
+the same chunking rules as the original getCaptionsWithTime, but with each
+caption's end time looked up by bisecting a sorted character-offset index built
+once per transcript, instead of scanning every word interval per caption.
+Word offsets are found once with the same text.find calls as before, so output
+is identical, including its edge cases.
+"""
+
+import re
+from bisect import bisect_left
+
+SENTENCE_END = re.compile(r'[.!?]')
+
+
+def cleanWord(word):
+    return re.sub(r'[^\w\s\-_"\'\']', '', word)
+
+
+class CaptionTimingIndex:
+    """
+    Character offset -> word end time. Word i covers [ends[i-1], ends[i]] (len(text) + 1
+    characters), and an offset on a shared boundary belongs to the earlier word.
+    """
+
+    def __init__(self, whisper_analysis):
+        self.ends = []
+        self.times = []
+        index = 0
+        for segment in whisper_analysis['segments']:
+            for word in segment['words']:
+                index += len(word['text']) + 1
+                self.ends.append(index)
+                self.times.append(word['end'])
+
+    def time_at(self, position):
+        """End time of the word covering character offset position, or None past the last word."""
+        if position < 0:
+            return None
+        i = bisect_left(self.ends, position)
+        return self.times[i] if i < len(self.times) else None
+
+
+def word_offsets(text, words):
+    """
+    (offset of each word, offset of the following word searched after it) using the
+    original search rules: word i is searched from word i-1's offset, the lookahead
+    from the end of word i.
+    """
+    offsets = []
+    next_offsets = []
+    idx_in_text = 0
+    for i, word in enumerate(words):
+        idx_in_text = text.find(word, idx_in_text)
+        offsets.append(idx_in_text)
+        if i + 1 < len(words):
+            next_offsets.append(text.find(words[i + 1], idx_in_text + len(word)))
+    return offsets, next_offsets
+
+
+def build_captions(whisper_analysis, maxCaptionSize=30, preserve_punctuation=True):
+    """[((start, end), caption), ...] for whisper_analysis; a drop-in for getCaptionsWithTime."""
+    index = CaptionTimingIndex(whisper_analysis)
+    text = whisper_analysis['text']
+
+    # Start offsets of sentences in the text
+    sentence_endings = [m.end() for m in SENTENCE_END.finditer(text)]
+    sentence_starts_set = {0} | {i + 1 for i in sentence_endings if i + 1 < len(text)}
+
+    words = text.split()
+    offsets, next_offsets = word_offsets(text, words)
+
+    captions = []
+    position = 0
+    start_time = 0
+    chunk_words = []
+    chunk_length = -1  # len(" ".join(chunk_words)), kept incrementally
+
+    def flush():
+        nonlocal position, start_time
+        caption = " ".join(chunk_words) if preserve_punctuation else cleanWord(" ".join(chunk_words))
+        position += len(caption) + 1
+        end_time = index.time_at(position)
+        if end_time:
+            captions.append(((start_time, end_time), caption))
+            start_time = end_time
+
+    for i, word in enumerate(words):
+        # A new sentence closes the current caption
+        if i > 0 and offsets[i] in sentence_starts_set and chunk_words:
+            flush()
+            chunk_words = []
+            chunk_length = -1
+        chunk_words.append(word)
+        chunk_length += len(word) + 1
+        # Close the caption if the next word would not fit or starts a sentence
+        if i + 1 < len(words):
+            if chunk_length + 1 + len(words[i + 1]) > maxCaptionSize or next_offsets[i] in sentence_starts_set:
+                flush()
+                chunk_words = []
+                chunk_length = -1
+    if chunk_words:
+        flush()
+    return captions
@@ -0,0 +1,140 @@
+"""
+Chunked parallel transcription for long narrations.
+
+The audio is cut on silences into ~TRANSCRIBE_CHUNK_SECONDS chunks that overlap
+by TRANSCRIBE_CHUNK_OVERLAP seconds on each side. The chunks are transcribed in
+a process pool (one Whisper model per worker, CPU threads split between them)
+and the words are shifted back onto the original timeline. In the overlaps only
+words centred inside a chunk's own cut range are kept, so every word appears
+once and getCaptionsWithTime sees one continuous transcript.
+"""
+
+import os
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+TRANSCRIBE_CHUNK_SECONDS = float(os.environ.get("TRANSCRIBE_CHUNK_SECONDS", "120"))
+TRANSCRIBE_CHUNK_OVERLAP = float(os.environ.get("TRANSCRIBE_CHUNK_OVERLAP", "1.0"))
+TRANSCRIBE_WORKERS = int(os.environ.get("TRANSCRIBE_WORKERS", str(os.cpu_count() or 1)))
+# Shorter audio is transcribed in one piece
+TRANSCRIBE_PARALLEL_MIN_SECONDS = float(os.environ.get("TRANSCRIBE_PARALLEL_MIN_SECONDS", "300"))
+
+
+def plan_chunks(duration, speech_spans, chunk_seconds=TRANSCRIBE_CHUNK_SECONDS):
+    """
+    Cut [0, duration] into (start, end) ranges of about chunk_seconds, cutting in the
+    middle of the silence gap nearest each target boundary (or at the target if there is none).
+    """
+    if duration <= chunk_seconds:
+        return [(0.0, duration)]
+    gaps = [(e1 + s2) / 2 for (_, e1), (s2, _) in zip(speech_spans, speech_spans[1:]) if s2 > e1]
+    cuts = []
+    previous = 0.0
+    target = chunk_seconds
+    while target < duration - chunk_seconds / 4:
+        # Only gaps that keep the chunk between half and one and a half target lengths
+        nearby = [g for g in gaps if previous + chunk_seconds / 2 < g < previous + chunk_seconds * 1.5]
+        cut = min(nearby, key=lambda g: abs(g - target)) if nearby else target
+        cuts.append(cut)
+        previous = cut
+        target = cut + chunk_seconds
+    edges = [0.0] + cuts + [duration]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def merge_chunk_results(chunk_results):
+    """
+    Merge [((cut_start, cut_end), window_start, result), ...] into one transcribe_timestamped-shaped
+    result. result timestamps are relative to window_start; words whose midpoint falls outside
+    [cut_start, cut_end) belong to the neighbouring chunk and are dropped.
+    """
+    segments = []
+    language = None
+    for (cut_start, cut_end), window_start, result in chunk_results:
+        language = language or result.get("language")
+        for segment in result.get("segments", []):
+            words = []
+            for word in segment.get("words", []):
+                start = word["start"] + window_start
+                end = word["end"] + window_start
+                if cut_start <= (start + end) / 2 < cut_end:
+                    words.append(dict(word, start=round(start, 3), end=round(end, 3)))
+            if words:
+                segments.append(dict(
+                    segment,
+                    start=words[0]["start"],
+                    end=words[-1]["end"],
+                    text=" ".join(w["text"] for w in words),
+                    words=words,
+                ))
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+    }
+
+
+# --- Pool workers ---
+
+_worker_model = None
+
+
+def _init_worker(model, threads):
+    import torch
+    from app.core.whisper_models import get_whisper_model
+
+    global _worker_model
+    _worker_model = get_whisper_model(*model)
+    # After the load, which applies WHISPER_THREADS process-wide
+    torch.set_num_threads(threads)
+
+
+def _transcribe_chunk(chunk_path, language, options):
+    from whisper_timestamped import transcribe_timestamped
+    return transcribe_timestamped(_worker_model, chunk_path, language=language, **options)
+
+
+def _extract_chunk(audio_filename, start, end, output):
+    cmd = [
+        "ffmpeg", "-y", "-v", "error", "-nostdin",
+        "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", audio_filename,
+        "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", output,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Extracting {start:.1f}-{end:.1f}s of {audio_filename} failed: {result.stderr[-500:]}")
+    return output
+
+
+def transcribe_chunked(audio_filename, duration, model, language=None, options=None,
+                       chunk_seconds=None, overlap=None, workers=None, speech_spans=None):
+    """Transcribe audio_filename in overlapping chunks across a process pool and merge the words."""
+    chunk_seconds = chunk_seconds or TRANSCRIBE_CHUNK_SECONDS
+    overlap = TRANSCRIBE_CHUNK_OVERLAP if overlap is None else overlap
+    if speech_spans is None:
+        from app.core.vad import detect_speech_in_file
+        speech_spans = detect_speech_in_file(audio_filename)
+    chunks = plan_chunks(duration, speech_spans, chunk_seconds)
+    workers = max(1, min(workers or TRANSCRIBE_WORKERS, len(chunks)))
+    from app.core.whisper_models import WHISPER_THREADS
+    threads = max(1, (WHISPER_THREADS or os.cpu_count() or 1) // workers)
+    print(f"[TRANSCRIBE] {len(chunks)} chunks of ~{chunk_seconds:.0f}s on {workers} workers x {threads} threads")
+
+    workdir = tempfile.mkdtemp(prefix="transcribe_chunks_")
+    try:
+        windows = []
+        for i, (cut_start, cut_end) in enumerate(chunks):
+            window_start = max(0.0, cut_start - overlap)
+            window_end = min(duration, cut_end + overlap)
+            path = _extract_chunk(audio_filename, window_start, window_end, os.path.join(workdir, f"chunk_{i:04d}.wav"))
+            windows.append(((cut_start, cut_end), window_start, path))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model, threads)) as pool:
+            futures = [pool.submit(_transcribe_chunk, path, language, dict(options or {})) for _, _, path in windows]
+            results = [future.result() for future in futures]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return merge_chunk_results([(cut, window_start, result) for (cut, window_start, _), result in zip(windows, results)])
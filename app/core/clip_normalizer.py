@@ -0,0 +1,107 @@
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from app.utils.media_store import MediaStore
+
+# Pre-normalized background clips (exact window length, output size, 25 fps)
+CLIP_CACHE_DIR = os.environ.get("CLIP_CACHE_DIR", "temp/normalized_clips")
+CLIP_CACHE_MAX_MB = int(os.environ.get("CLIP_CACHE_MAX_MB", "2048"))
+NORMALIZE_WORKERS = int(os.environ.get("NORMALIZE_WORKERS", str(os.cpu_count() or 1)))
+NORMALIZE_CLIPS = str(os.environ.get("NORMALIZE_CLIPS", "true")).lower() in ("true", "1", "yes")
+OUTPUT_FPS = 25
+
+
+def normalized_clip_key(source, duration, width, height, fps=OUTPUT_FPS):
+    """
+    Cache key for a normalized clip: (source, window length, size, fps).
+    The media store touches mtime on every hit, so the source is identified by
+    path and byte size rather than mtime.
+    """
+    return f"normalized-clip:{os.path.abspath(source)}:{os.path.getsize(source)}:{duration:.3f}:{width}x{height}@{fps}"
+
+
+def _transcode(source, duration, width, height, fps, threads):
+    def run(_key, output):
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", source,
+            "-vf",
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},"
+            # Hold the last frame if the source is shorter than the window
+            f"tpad=stop_mode=clone:stop_duration={duration:.3f}",
+            "-t", f"{duration:.3f}",
+            "-an",
+            "-c:v", "libx264", "-preset", "ultrafast", "-crf", "18",
+            "-pix_fmt", "yuv420p",
+            "-threads", str(threads),
+            "-f", "mp4",
+            output,
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Normalizing {source} failed: {result.stderr[-1000:]}")
+    return run
+
+
+def get_clip_store(auto_evict=True):
+    return MediaStore(root=CLIP_CACHE_DIR, max_bytes=CLIP_CACHE_MAX_MB * 1024 * 1024, auto_evict=auto_evict)
+
+
+def normalize_clip(source, duration, width, height, fps=OUTPUT_FPS, threads=1):
+    """
+    Return a cached clip of source trimmed to duration seconds at width x height and fps.
+    Runs in pool workers, so it opens its own MediaStore on the shared cache directory.
+    Workers never evict; the ClipNormalizer has already leased the clip for its render
+    and trims the cache in shutdown().
+    """
+    store = get_clip_store(auto_evict=False)
+    key = normalized_clip_key(source, duration, width, height, fps)
+    return store.fetch(key, _transcode(source, duration, width, height, fps, threads), suffix=".mp4")
+
+
+class ClipNormalizer:
+    """
+    Normalizes downloaded background clips in a process pool across all cores.
+    submit() returns a future resolving to the normalized path. Every normalized
+    clip is leased until shutdown(), so no job (in this process or another) evicts
+    it while this render still reads it.
+    """
+
+    def __init__(self, width, height, fps=OUTPUT_FPS, max_workers=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.max_workers = max_workers or NORMALIZE_WORKERS
+        # Split the cores between concurrent ffmpeg processes instead of oversubscribing
+        self.threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._futures = {}
+        self.store = get_clip_store()
+        self.lease = self.store.lease()
+
+    def submit(self, source, duration):
+        key = (source, round(duration, 3))
+        if key not in self._futures:
+            # Leased before the worker writes it
+            self.lease.pin(normalized_clip_key(source, duration, self.width, self.height, self.fps), suffix=".mp4")
+            self._futures[key] = self._executor.submit(
+                normalize_clip, source, duration, self.width, self.height, self.fps, self.threads
+            )
+        return self._futures[key]
+
+    def result(self, source, duration):
+        """Normalized path for (source, duration), or source itself if normalization failed."""
+        try:
+            return self.submit(source, duration).result()
+        except Exception as e:
+            print(f"[NORMALIZE] Falling back to original clip {source}: {e}")
+            return source
+
+    def shutdown(self):
+        """Stop the pool, release this render's clips and trim the clip cache to CLIP_CACHE_MAX_MB."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._futures = {}
+        self.lease.release()
+        self.store.evict()
@@ -0,0 +1,220 @@
+"""
+Native FFmpeg render backend.
+
+Builds one filter_complex graph from the same inputs get_output_media uses
+(background segments, timed captions, narration, soundtrack) and encodes it in a
+single ffmpeg process, instead of compositing every frame in MoviePy/NumPy.
+"""
+
+import os
+import subprocess
+import tempfile
+
+from app.core.caption_rasterizer import wrap_caption_lines
+from app.utils.job_workspace import ffmpeg_env
+
+OUTPUT_FPS = 25
+AUDIO_SAMPLE_RATE = 44100
+CAPTION_LINE_SPACING = 1.2  # line height as a multiple of font size
+
+
+def _font_option(font):
+    # Font files go through fontfile=, bare names are resolved by fontconfig
+    if os.path.exists(font):
+        return f"fontfile='{escape_filter_value(font)}'"
+    return f"font='{escape_filter_value(font)}'"
+
+
+def escape_filter_value(value):
+    # Used inside '...' quotes, where everything is literal except the quote itself
+    return str(value).replace("'", "'\\''")
+
+
+def plan_background_segments(segments, final_duration):
+    """
+    Turn (t1, t2, path, kind) segments into a gapless, non-overlapping timeline
+    covering [0, final_duration]. Gaps are filled with black, matching the
+    black canvas MoviePy composites onto.
+    """
+    timeline = []
+    cursor = 0.0
+    for t1, t2, path, kind in sorted(segments, key=lambda s: s[0]):
+        t1 = max(float(t1), cursor)
+        t2 = min(float(t2), final_duration)
+        if t2 <= t1:
+            continue
+        if t1 - cursor > 1e-3:
+            timeline.append((cursor, t1, None, "color"))
+        timeline.append((t1, t2, path, kind))
+        cursor = t2
+    if final_duration - cursor > 1e-3:
+        timeline.append((cursor, final_duration, None, "color"))
+    return timeline
+
+
+def build_audio_graph(first_input_index, final_duration, audio_file_path=None, disable_audio=False,
+                      soundtrack_file=None, soundtrack_volume=0.1):
+    """
+    Inputs and filters for the output audio: narration padded to final_duration (or
+    silence when audio is disabled but a soundtrack is set), amixed with the looping
+    soundtrack at soundtrack_volume.
+    Returns (input args, filter list, output label or None when there is no audio).
+    """
+    inputs = []
+    filters = []
+    input_index = first_input_index
+    audio_label = None
+    audio_format = f"aformat=sample_rates={AUDIO_SAMPLE_RATE}:channel_layouts=stereo"
+    if audio_file_path and not disable_audio:
+        inputs += ["-i", audio_file_path]
+        filters.append(f"[{input_index}:a]{audio_format},apad=whole_dur={final_duration:.3f}[narr]")
+        input_index += 1
+        audio_label = "narr"
+    elif soundtrack_file:
+        filters.append(f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo,atrim=duration={final_duration:.3f}[narr]")
+        audio_label = "narr"
+    if soundtrack_file and os.path.exists(soundtrack_file):
+        inputs += ["-stream_loop", "-1", "-i", soundtrack_file]
+        filters.append(
+            f"[{input_index}:a]{audio_format},volume={soundtrack_volume},atrim=duration={final_duration:.3f}[st]"
+        )
+        filters.append("[narr][st]amix=inputs=2:duration=first:dropout_transition=2[aout]")
+        input_index += 1
+        audio_label = "aout"
+    return inputs, filters, audio_label
+
+
+def build_ffmpeg_command(
+    output_file,
+    segments,
+    captions,
+    caption_style,
+    width,
+    height,
+    final_duration,
+    audio_file_path=None,
+    disable_audio=False,
+    soundtrack_file=None,
+    soundtrack_volume=0.1,
+    preset="ultrafast",
+    caption_text_dir=None,
+    video_filters=None,
+):
+    """
+    Build the ffmpeg argv for one render.
+    - segments: list of (t1, t2, path, kind), kind in {"video", "image", "loop", "color"}
+    - captions: list of ((t1, t2), text); empty when captions are disabled
+    - caption_style: dict with font, fontsize, fontcolor, stroke_color, stroke_width,
+      text_max_width, vertical_align and margin
+    - video_filters: extra filters applied after captions (e.g. libass burn-in)
+    """
+    inputs = []
+    filters = []
+    input_index = 0
+
+    # --- Video: one normalized stream per timeline slot, then concat ---
+    timeline = plan_background_segments(segments, final_duration)
+    normalize = (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={OUTPUT_FPS}"
+    )
+    labels = []
+    for i, (t1, t2, path, kind) in enumerate(timeline):
+        duration = t2 - t1
+        label = f"v{i}"
+        if kind == "color" or path is None:
+            filters.append(f"color=c=black:s={width}x{height}:r={OUTPUT_FPS}:d={duration:.3f},setsar=1[{label}]")
+        else:
+            if kind == "image":
+                inputs += ["-loop", "1", "-framerate", str(OUTPUT_FPS), "-t", f"{duration:.3f}", "-i", path]
+            elif kind == "loop":
+                inputs += ["-stream_loop", "-1", "-i", path]
+            else:
+                inputs += ["-i", path]
+            # Hold the last frame if the source is shorter than its slot (MoviePy does the same)
+            filters.append(
+                f"[{input_index}:v]{normalize},tpad=stop_mode=clone:stop_duration={duration:.3f},"
+                f"trim=duration={duration:.3f},setpts=PTS-STARTPTS[{label}]"
+            )
+            input_index += 1
+        labels.append(f"[{label}]")
+    filters.append(f"{''.join(labels)}concat=n={len(labels)}:v=1:a=0[bg]")
+
+    # --- Captions: one drawtext per wrapped line, enabled only inside its window ---
+    video_label = "bg"
+    if captions:
+        caption_text_dir = caption_text_dir or tempfile.mkdtemp(prefix="captions_")
+        font = caption_style["font"]
+        fontsize = caption_style["fontsize"]
+        line_height = int(fontsize * CAPTION_LINE_SPACING)
+        drawtexts = []
+        for c, ((t1, t2), text) in enumerate(captions):
+            lines = wrap_caption_lines(text, font, fontsize, caption_style["text_max_width"])
+            block_height = line_height * len(lines)
+            if caption_style.get("vertical_align") == "center":
+                top = f"({height}-{block_height})/2"
+            else:
+                top = f"{height}-{block_height}-{caption_style['margin']}"
+            for n, line in enumerate(lines):
+                # textfile= sidesteps drawtext's escaping rules for arbitrary caption text
+                text_path = os.path.join(caption_text_dir, f"caption_{c}_{n}.txt")
+                with open(text_path, "w", encoding="utf-8") as f:
+                    f.write(line)
+                drawtexts.append(
+                    f"drawtext={_font_option(font)}:textfile='{escape_filter_value(text_path)}'"
+                    f":fontsize={fontsize}:fontcolor={caption_style['fontcolor']}"
+                    f":borderw={caption_style['stroke_width']}:bordercolor={caption_style['stroke_color']}"
+                    f":x=(w-text_w)/2:y={top}+{n * line_height}"
+                    f":enable='between(t,{t1:.3f},{t2:.3f})'"
+                )
+        filters.append(f"[bg]{','.join(drawtexts)}[vout]")
+        video_label = "vout"
+    if video_filters:
+        filters.append(f"[{video_label}]{','.join(video_filters)}[vsub]")
+        video_label = "vsub"
+
+    # --- Audio: narration (or silence) plus looping soundtrack, mixed in the same graph ---
+    audio_inputs, audio_filters, audio_label = build_audio_graph(
+        input_index, final_duration, audio_file_path, disable_audio, soundtrack_file, soundtrack_volume
+    )
+    inputs += audio_inputs
+    filters += audio_filters
+
+    cmd = ["ffmpeg", "-y", "-hide_banner"] + inputs + [
+        "-filter_complex", ";".join(filters),
+        "-map", f"[{video_label}]",
+    ]
+    if audio_label:
+        cmd += ["-map", f"[{audio_label}]", "-c:a", "aac", "-ar", str(AUDIO_SAMPLE_RATE)]
+    else:
+        cmd += ["-an"]
+    cmd += [
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", "28",
+        "-pix_fmt", "yuv420p",
+        "-r", str(OUTPUT_FPS),
+        "-threads", os.environ.get('FFMPEG_THREADS', '8'),
+        "-movflags", "+faststart",
+        "-max_muxing_queue_size", "1024",
+        "-t", f"{final_duration:.3f}",
+        output_file,
+    ]
+    return cmd
+
+
+def render_with_ffmpeg(output_file, segments, captions, caption_style, width, height, final_duration,
+                       work_dir=None, ffreport=None, **kwargs):
+    """Build and run the single-process ffmpeg render (reporting per the FFREPORT value ffreport). Returns output_file."""
+    with tempfile.TemporaryDirectory(prefix="captions_", dir=work_dir) as caption_text_dir:
+        cmd = build_ffmpeg_command(
+            output_file, segments, captions, caption_style, width, height, final_duration,
+            caption_text_dir=caption_text_dir, **kwargs
+        )
+        print("[FFMPEG RENDER] Running command:", " ".join(cmd))
+        result = subprocess.run(cmd, capture_output=True, text=True, env=ffmpeg_env(ffreport))
+        if result.returncode != 0:
+            print("[FFMPEG RENDER] STDERR:\n", result.stderr)
+            raise RuntimeError(f"FFmpeg render failed with code {result.returncode}: {result.stderr[-2000:]}")
+    print(f"[FFMPEG RENDER] Wrote {output_file}")
+    return output_file
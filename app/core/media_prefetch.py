@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of concurrent downloads per render job
+MEDIA_PREFETCH_WORKERS = int(os.environ.get("MEDIA_PREFETCH_WORKERS", "8"))
+
+
+class MediaPrefetcher:
+    """
+    Fetches every distinct media URL of a render job concurrently.
+    - fetch_func: callable(url, suffix) that returns a local path for url
+    - max_workers: size of the download pool (defaults to MEDIA_PREFETCH_WORKERS)
+    Duplicate URLs (e.g. repeated by merge_empty_intervals) are fetched once.
+    """
+
+    def __init__(self, fetch_func, max_workers=None):
+        self.fetch_func = fetch_func
+        self.max_workers = max_workers or MEDIA_PREFETCH_WORKERS
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch")
+        self._futures = {}
+
+    def __contains__(self, url):
+        return url in self._futures
+
+    def submit(self, url, suffix=""):
+        """Schedule url for download unless it is already queued. Returns the future."""
+        if url in self._futures:
+            return self._futures[url]
+        future = self._executor.submit(self._fetch, url, suffix)
+        self._futures[url] = future
+        return future
+
+    def _fetch(self, url, suffix):
+        path = self.fetch_func(url, suffix)
+        print(f"[PREFETCH] Ready {url} -> {path}")
+        return path
+
+    def result(self, url):
+        """Block until url is available locally and return its path."""
+        if url not in self._futures:
+            self.submit(url)
+        return self._futures[url].result()
+
+    def shutdown(self):
+        """Stop pending downloads. Fetched files belong to fetch_func's owner (the media store)."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._futures = {}
+
+
+def prefetch_background_media(background_video_data, fetch_func, suffix_func, max_workers=None):
+    """
+    Start fetching all media referenced by background_video_data.
+    - suffix_func: callable(url, is_photo) returning the local file suffix
+    Entries may be [interval, url] or [interval, url, is_photo]; None URLs are skipped.
+    """
+    prefetcher = MediaPrefetcher(fetch_func, max_workers=max_workers)
+    distinct = 0
+    for entry in background_video_data:
+        media_url = entry[1]
+        is_photo = entry[2] if len(entry) == 3 else False
+        if media_url is None:
+            continue
+        if media_url not in prefetcher:
+            distinct += 1
+        prefetcher.submit(media_url, suffix=suffix_func(media_url, is_photo))
+    print(f"[PREFETCH] Queued {distinct} distinct media files for {len(background_video_data)} segments")
+    return prefetcher
@@ -0,0 +1,167 @@
+"""
+Time-sliced parallel rendering.
+
+The timeline is cut into chunks on background segment boundaries. Each chunk
+(its background clips plus the captions that fall inside it) is composited and
+encoded by MoviePy in its own worker process, so frame compositing scales with
+cores. The chunks are then joined losslessly with the ffmpeg concat demuxer and
+the audio (narration + soundtrack) is muxed once over the whole video.
+"""
+
+import os
+import subprocess
+import tempfile
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.ffmpeg_render import build_audio_graph, plan_background_segments, AUDIO_SAMPLE_RATE
+from app.core.ass_subtitles import write_ass, ass_filter
+from app.utils.job_workspace import ffmpeg_env, ffreport_environ
+
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(os.cpu_count() or 1)))
+OUTPUT_FPS = 25
+
+
+def _snap(t, fps=OUTPUT_FPS):
+    # Chunk edges sit on the frame grid so the joined video has no drift
+    return round(t * fps) / fps
+
+
+def split_timeline(segments, final_duration, n_chunks):
+    """
+    Split [0, final_duration] into at most n_chunks contiguous (start, end) chunks of
+    roughly equal length, cutting only on segment boundaries. A timeline with a single
+    segment (e.g. an uploaded background video) is cut evenly instead.
+    """
+    timeline = plan_background_segments(segments, final_duration)
+    if len(timeline) <= 1:
+        boundaries = [_snap(final_duration * k / n_chunks) for k in range(1, n_chunks)]
+    else:
+        boundaries = sorted({_snap(t2) for _, t2, _, _ in timeline[:-1]})
+    target = final_duration / n_chunks
+    cuts = []
+    for k in range(1, n_chunks):
+        previous = cuts[-1] if cuts else 0.0
+        candidates = [b for b in boundaries if previous < b < final_duration]
+        if not candidates:
+            break
+        cuts.append(min(candidates, key=lambda b: abs(b - k * target)))
+    edges = [0.0] + cuts + [final_duration]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def render_chunk(chunk_start, chunk_end, segments, captions, caption_style, width, height, preset, output_file, threads,
+                 ffreport=None):
+    """Worker: composite and encode [chunk_start, chunk_end) to output_file (video only)."""
+    from moviepy import CompositeVideoClip
+    from app.core.render import build_segment_clip, build_caption_clip
+
+    duration = chunk_end - chunk_start
+    burn_ass = caption_style.get("caption_mode") == "ass"
+    chunk_captions = []
+    clips = []
+    for t1, t2, path, kind in segments:
+        start, end = max(t1, chunk_start), min(t2, chunk_end)
+        if end <= start:
+            continue
+        clips.append(build_segment_clip(
+            start - chunk_start, end - chunk_start, path, kind, width, height, offset=start - t1
+        ))
+    for (t1, t2), text in captions:
+        start, end = max(t1, chunk_start), min(t2, chunk_end)
+        if end <= start:
+            continue
+        chunk_captions.append(((start - chunk_start, end - chunk_start), text))
+    if not burn_ass:
+        for (t1, t2), text in chunk_captions:
+            clips.append(build_caption_clip(text, t1, t2, caption_style, width, height))
+
+    ffmpeg_params = [
+        '-threads', str(threads),
+        '-crf', '28',
+        '-pix_fmt', 'yuv420p',
+    ]
+    if burn_ass and chunk_captions:
+        # Chunk-local subtitle script, burned by libass in this chunk's encode
+        ass_path = write_ass(chunk_captions, caption_style, width, height, os.path.splitext(output_file)[0] + ".ass")
+        ffmpeg_params += ['-vf', ass_filter(ass_path, caption_style["font"])]
+
+    video = CompositeVideoClip(clips, size=(width, height), bg_color=(0, 0, 0))
+    video = video.with_duration(duration).without_audio()
+    with ffreport_environ(ffreport):
+        video.write_videofile(
+            output_file,
+            codec='libx264',
+            audio=False,
+            fps=OUTPUT_FPS,
+            preset=preset,
+            logger=None,
+            ffmpeg_params=ffmpeg_params
+        )
+    print(f"[PARALLEL RENDER] Chunk {chunk_start:.2f}-{chunk_end:.2f} done")
+    return output_file
+
+
+def render_parallel(
+    output_file,
+    segments,
+    captions,
+    caption_style,
+    width,
+    height,
+    final_duration,
+    audio_file_path=None,
+    disable_audio=False,
+    soundtrack_file=None,
+    soundtrack_volume=0.1,
+    preset="ultrafast",
+    max_workers=None,
+    work_dir=None,
+    ffreport=None,
+):
+    """Render chunks in a process pool, concat them without re-encoding, then mux audio once."""
+    max_workers = max_workers or RENDER_WORKERS
+    chunks = split_timeline(segments, final_duration, max_workers)
+    workers = min(max_workers, len(chunks))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"[PARALLEL RENDER] {len(chunks)} chunks on {workers} workers")
+
+    workdir = tempfile.mkdtemp(prefix="render_chunks_", dir=work_dir)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    render_chunk, chunk_start, chunk_end, segments, captions, caption_style,
+                    width, height, preset, os.path.join(workdir, f"chunk_{i:04d}.mp4"), threads, ffreport
+                )
+                for i, (chunk_start, chunk_end) in enumerate(chunks)
+            ]
+            chunk_files = [future.result() for future in futures]
+
+        list_path = os.path.join(workdir, "chunks.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for chunk_file in chunk_files:
+                escaped = os.path.abspath(chunk_file).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        audio_inputs, audio_filters, audio_label = build_audio_graph(
+            1, final_duration, audio_file_path, disable_audio, soundtrack_file, soundtrack_volume
+        )
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-f", "concat", "-safe", "0", "-i", list_path] + audio_inputs
+        if audio_filters:
+            cmd += ["-filter_complex", ";".join(audio_filters)]
+        cmd += ["-map", "0:v", "-c:v", "copy"]
+        if audio_label:
+            cmd += ["-map", f"[{audio_label}]", "-c:a", "aac", "-ar", str(AUDIO_SAMPLE_RATE)]
+        else:
+            cmd += ["-an"]
+        cmd += ["-movflags", "+faststart", "-t", f"{final_duration:.3f}", output_file]
+        print("[PARALLEL RENDER] Running command:", " ".join(cmd))
+        result = subprocess.run(cmd, capture_output=True, text=True, env=ffmpeg_env(ffreport))
+        if result.returncode != 0:
+            print("[PARALLEL RENDER] STDERR:\n", result.stderr)
+            raise RuntimeError(f"FFmpeg concat failed with code {result.returncode}: {result.stderr[-2000:]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"[PARALLEL RENDER] Wrote {output_file}")
+    return output_file
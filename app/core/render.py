@@ -12,29 +12,29 @@ import shutil
 # Import our MoviePy config first to ensure proper initialization
 # from utility.render.moviepy_config import *
 
-import time
 import zipfile
 import platform
 import subprocess
+from functools import lru_cache
 # from moviepy.audio.io.AudioFileClip import AudioFileClip
 # from moviepy.audio.AudioClip import CompositeAudioClip
 # from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 # from moviepy.video.VideoClip import ImageClip, ColorClip, TextClip
 # from moviepy.video.io.VideoFileClip import VideoFileClip
-from moviepy import AudioFileClip, CompositeVideoClip, CompositeAudioClip, ImageClip, TextClip, VideoFileClip, ColorClip
-from moviepy.audio.AudioClip import AudioArrayClip
-import numpy as np
+from moviepy import AudioFileClip, CompositeVideoClip, CompositeAudioClip, ImageClip, TextClip, VideoFileClip, ColorClip, concatenate_videoclips, afx
 
-import requests
 from PIL import Image
 
-def download_file(url, filename):
-    with open(filename, 'wb') as f:
-        headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers)
-        f.write(response.content)
+from app.core.media_prefetch import prefetch_background_media
+from app.core.ffmpeg_render import render_with_ffmpeg
+from app.core.parallel_render import render_parallel
+from app.core.caption_rasterizer import CAPTION_RENDERER, get_caption_array
+from app.core.ass_subtitles import write_ass, write_srt, ass_filter
+from app.core.clip_normalizer import ClipNormalizer, NORMALIZE_CLIPS
+from app.utils.media_store import get_media_store
+from app.utils.download import fetch_remote_file
+from app.utils.media_probe import get_media_duration
+from app.utils.job_workspace import ffreport_path, ffreport_environ
 
 def get_extension_from_url(url):
     path = urlparse(url).path
@@ -43,6 +43,14 @@ def get_extension_from_url(url):
         return ext
     return ".jpg"  # Default fallback
 
+def is_image_url(url):
+    return url.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'))
+
+def get_media_suffix(media_url, is_photo=False):
+    # Use correct file extension for image files
+    return get_extension_from_url(media_url) if (is_photo or is_image_url(media_url)) else ""
+
+@lru_cache(maxsize=None)
 def search_program(program_name):
     try: 
         search_cmd = "where" if platform.system() == "Windows" else "which"
@@ -74,8 +82,11 @@ def pad_image_to_even(filename):
     else:
         img.close()
 
-def resize_and_pad_image(filename, target_width=1920, target_height=1080):
-    """Resize and pad image to fit exactly target_width x target_height."""
+def resize_and_pad_image(filename, target_width=1920, target_height=1080, output_filename=None):
+    """
+    Resize and pad image to fit exactly target_width x target_height.
+    Overwrites filename unless output_filename is given.
+    """
     img = Image.open(filename)
     # Calculate new size preserving aspect ratio
     img_ratio = img.width / img.height
@@ -96,7 +107,7 @@ def resize_and_pad_image(filename, target_width=1920, target_height=1080):
     paste_x = (target_width - new_width) // 2
     paste_y = (target_height - new_height) // 2
     new_img.paste(img_resized, (paste_x, paste_y))
-    new_img.save(filename)
+    new_img.save(output_filename or filename)
     img.close()
     img_resized.close()
     new_img.close()
@@ -111,74 +122,96 @@ def load_caption_settings():
         print(f"Could not load caption settings: {e}")
         return {}
 
-def add_soundtrack_ffmpeg(input_video, soundtrack, output_video, volume=0.1):
+# Default render backend: "moviepy" (frame compositing in Python), "ffmpeg" (single filter graph)
+# or "parallel" (MoviePy time slices in a process pool, joined with the ffmpeg concat demuxer)
+RENDER_BACKEND = os.environ.get("RENDER_BACKEND", "moviepy")
+RENDER_BACKENDS = ("moviepy", "ffmpeg", "parallel")
+
+# Caption burn-in: "overlay" (one clip / drawtext per caption) or "ass" (one ASS script burned by libass)
+CAPTION_MODE = os.environ.get("CAPTION_MODE", "overlay")
+CAPTION_MODES = ("overlay", "ass")
+
+def build_segment_clip(t1, t2, path, kind, width, height, offset=0.0):
     """
-    Mixes the soundtrack into the input_video and writes to output_video.
-    - soundtrack: path to audio file (wav/mp3)
-    - volume: soundtrack volume (0.0-1.0)
+    MoviePy clip for one background segment placed at [t1, t2].
+    - kind: "video", "image" (already sized), "loop" (looped to fill the window) or "color" (black)
+    - offset: seconds into the source to start from (used when a segment is split across chunks)
     """
-    print(f"[FFMPEG] Preparing to mix soundtrack '{soundtrack}' into '{input_video}' at volume {volume}")
-    # --- DEBUG: Check soundtrack file existence and size ---
-    if not os.path.exists(soundtrack):
-        print(f"[FFMPEG] ERROR: Soundtrack file does not exist: {soundtrack}")
+    duration = t2 - t1
+    if kind == "color" or path is None:
+        clip = ColorClip(size=(width, height), color=(0, 0, 0)).with_duration(duration)
+    elif kind == "image":
+        clip = ImageClip(path).with_duration(duration)
+    elif kind == "loop":
+        clip = VideoFileClip(path).with_audio(None)  # Remove original audio
+        needed = offset + duration
+        if clip.duration < needed:
+            n_loops = int(needed // clip.duration) + 1
+            clip = concatenate_videoclips([clip] * n_loops)
+        clip = clip.subclipped(offset, needed)
     else:
-        print(f"[FFMPEG] Soundtrack file size: {os.path.getsize(soundtrack)} bytes")
-    # --- END DEBUG ---
-    try:
-        import ffmpeg
-        probe = ffmpeg.probe(input_video)
-        duration = float(probe['format']['duration'])
-    except Exception as e:
-        print(f"[FFMPEG] Failed to probe video duration: {e}")
-        raise
-
-    # Compose FFmpeg command
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-i", input_video,
-        "-stream_loop", "-1", "-i", soundtrack,
-        "-filter_complex",
-        f"[1:a]volume={volume},atrim=duration={duration}[bg];"
-        f"[0:a][bg]amix=inputs=2:duration=first:dropout_transition=2[aout]",
-        "-map", "0:v",
-        "-map", "[aout]",
-        "-c:v", "copy",
-        "-c:a", "aac",
-        "-shortest",
-        output_video
-    ]
-    print("[FFMPEG] Running command:", " ".join(cmd))
-    try:
-        # --- DEBUG: Print working directory and file list before running FFmpeg ---
-        print("[FFMPEG] Current working directory:", os.getcwd())
-        print("[FFMPEG] Files in working directory:", os.listdir(os.getcwd()))
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        print("[FFMPEG] STDOUT:\n", result.stdout)
-        print("[FFMPEG] STDERR:\n", result.stderr)
-        # --- BEGIN: Save FFmpeg debug output to exports/logs/ffmpeg ---
-        from datetime import datetime
-        ffmpeg_log_dir = "exports/logs/ffmpeg"
-        os.makedirs(ffmpeg_log_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-        log_path = os.path.join(ffmpeg_log_dir, f"ffmpeg_soundtrack_{timestamp}.log")
-        print(f"[DEBUG] About to write FFmpeg log to {log_path}")
-        print(f"[DEBUG] ffmpeg_log_dir exists: {os.path.exists(ffmpeg_log_dir)}")
-        print(f"[DEBUG] CWD: {os.getcwd()}")
-        print(f"[DEBUG] Directory listing for ffmpeg_log_dir: {os.listdir(ffmpeg_log_dir)}")
-        with open(log_path, "w", encoding="utf-8") as f:
-            f.write("FFMPEG COMMAND:\n" + " ".join(cmd) + "\n\n")
-            f.write("STDOUT:\n" + result.stdout + "\n")
-            f.write("STDERR:\n" + result.stderr + "\n")
-        print(f"[FFMPEG] Soundtrack FFmpeg log saved to {log_path}")
-        # --- END: Save FFmpeg debug output ---
-        if result.returncode != 0:
-            print(f"[FFMPEG] FFmpeg failed with code {result.returncode}")
-            raise RuntimeError(f"FFmpeg failed: {result.stderr}")
-        print(f"[FFMPEG] Soundtrack successfully mixed to {output_video}")
-    except Exception as e:
-        print(f"[FFMPEG] Error running FFmpeg: {e}")
-        raise
+        clip = VideoFileClip(path)
+        if offset > 0:
+            clip = clip.subclipped(min(offset, max(clip.duration - 1.0 / 25, 0)))
+    clip = clip.with_start(t1)
+    return clip.with_end(t2)
+
+def build_caption_clip(text, t1, t2, style, width, height):
+    """MoviePy caption clip for one timed caption, positioned per style["vertical_align"]."""
+    if CAPTION_RENDERER == "pillow":
+        # Cached RGBA bitmap; the alpha channel becomes the clip mask
+        text_clip = ImageClip(get_caption_array(
+            text,
+            style["font"],
+            style["fontsize"],
+            style["fontcolor"],
+            style["stroke_color"],
+            style["stroke_width"],
+            style["text_max_width"],
+        ))
+    else:
+        text_clip = TextClip(
+            text=text,
+            font_size=style["fontsize"],
+            color=style["fontcolor"],
+            font=style["font"],
+            stroke_width=style["stroke_width"],
+            stroke_color=style["stroke_color"],
+            method="caption",
+            size=(style["text_max_width"], None)
+        )
+    # --- Position logic ---
+    if style["vertical_align"] == "center":
+        text_clip = text_clip.with_position("center")
+    else:  # "bottom"
+        text_clip = text_clip.with_position((
+            (width - text_clip.w) // 2,
+            height - text_clip.h - style["margin"]
+        ))
+    text_clip = text_clip.with_start(t1)
+    return text_clip.with_end(t2)
+
+def build_audio_track(audio_clips, final_duration, disable_audio=False, soundtrack_file=None, soundtrack_volume=0.1):
+    """
+    Narration and looping soundtrack mixed as one lazy MoviePy audio clip, written by the
+    main encode. Silence is implicit: CompositeAudioClip yields zeros where no layer plays.
+    Returns None when there is nothing to play.
+    """
+    layers = [] if disable_audio else list(audio_clips)
+    if soundtrack_file:
+        if not os.path.exists(soundtrack_file):
+            print(f"[AUDIO] Soundtrack file does not exist: {soundtrack_file}")
+        else:
+            soundtrack = AudioFileClip(soundtrack_file).with_effects([
+                afx.AudioLoop(duration=final_duration),
+                afx.MultiplyVolume(soundtrack_volume),
+            ])
+            # Same levels as the ffmpeg backend, whose amix scales both of its inputs
+            # (narration or silence, soundtrack) by 1/2
+            layers = [clip.with_effects([afx.MultiplyVolume(0.5)]) for clip in layers + [soundtrack]]
+    if not layers:
+        return None
+    return CompositeAudioClip(layers).with_duration(final_duration)
 
 def get_output_media(
     audio_file_path,
@@ -194,9 +227,22 @@ def get_output_media(
     background_video_file=None,
     caption_font="LuckiestGuy-Regular.ttf",   # <-- new parameter
     caption_vertical_align="bottom",
-    caption_margin=80
+    caption_margin=80,
+    render_backend=None,
+    caption_mode=None,
+    subtitle_files=False,
+    output_file="rendered_video.mp4",
+    work_dir=None,
+    ffreport=None
 ):
     print("Rendering video...")
+    # Shut down and cleaned up in the finally below, whether or not the render succeeds
+    prefetcher = None
+    normalizer = None
+    prepared_images = {}
+    burn_ass_file = None
+    # Media this render uses stays pinned in the store until it finishes
+    media_lease = get_media_store().lease()
     try:
         """
         CPU-optimized preset options:
@@ -204,8 +250,12 @@ def get_output_media(
         - superfast: Very fast encoding
         - veryfast: Good balance of speed/quality
         - medium: Better quality, slower encoding
+
+        Intermediate files go to work_dir (the job workspace; system temp dir if None).
+        ffreport is the FFREPORT value for this render's ffmpeg processes (the process
+        environment's if None).
         """
-        OUTPUT_FILE_NAME = "rendered_video.mp4"
+        OUTPUT_FILE_NAME = output_file
         magick_path = get_program_path("magick")
         print(magick_path)
         if magick_path:
@@ -221,24 +271,34 @@ def get_output_media(
         else:
             width, height = 1920, 1080
 
-        visual_clips = []
+        render_backend = render_backend or RENDER_BACKEND
+        if render_backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unsupported render backend: {render_backend}")
+        use_ffmpeg = render_backend == "ffmpeg"
+        print(f"[RENDER] Backend: {render_backend}")
+        caption_mode = caption_mode or CAPTION_MODE
+        if caption_mode not in CAPTION_MODES:
+            raise ValueError(f"Unsupported caption mode: {caption_mode}")
+
+        # Background timeline as (t1, t2, local path, kind); kind is video/image/loop/color
+        segments = []
 
         # If a background video file is provided, use it for the entire duration
         if background_video_file and os.path.exists(background_video_file):
             print(f"[BG VIDEO] Using uploaded background video: {background_video_file}")
-            # Determine duration from audio
-            audio_clip = AudioFileClip(audio_file_path)
-            video_clip = VideoFileClip(background_video_file)
-            # Loop or trim video to match audio duration
-            duration = audio_clip.duration
-            if video_clip.duration < duration:
-                n_loops = int(duration // video_clip.duration) + 1
-                video_clip = concatenate_videoclips([video_clip] * n_loops)
-            # video_clip = video_clip.subclip(0, duration)
-            video_clip = video_clip.subclipped(0, duration)
-            video_clip = video_clip.with_audio(None)  # Remove original audio
-            visual_clips = [video_clip]
+            # Looped and trimmed to the final duration when the clips are built
+            segments.append((0, float("inf"), background_video_file, "loop"))
         else:
+            # Download every distinct URL up front; the loop below picks up each path as it lands
+            prefetcher = prefetch_background_media(
+                background_video_data,
+                lambda url, suffix="": media_lease.fetch(url, fetch_remote_file, suffix=suffix),
+                get_media_suffix,
+            )
+            if NORMALIZE_CLIPS and not use_ffmpeg:
+                # Trim/scale/resample each clip to its window in parallel so the composite
+                # only decodes small, uniform inputs (the ffmpeg backend scales in its graph)
+                normalizer = ClipNormalizer(width, height)
             for idx, entry in enumerate(background_video_data):
                 # Support both [interval, url] and [interval, url, is_photo]
                 if len(entry) == 3:
@@ -249,113 +309,47 @@ def get_output_media(
 
                 if media_url is None:
                     print(f"NO MEDIA URL for segment {t1}-{t2}, using black background.")
-                    black_clip = ColorClip(size=(width, height), color=(0, 0, 0)).with_duration(t2 - t1)
-                    black_clip = black_clip.with_start(t1)
-                    black_clip = black_clip.with_end(t2)
-                    visual_clips.append(black_clip)
-                    print(f"Inserted black background for segment {t1}-{t2}")
+                    segments.append((t1, t2, None, "color"))
                     continue
 
-                print(f"Attempting to download and process image: {media_url}")
-                # Use correct file extension for image files
-                ext = get_extension_from_url(media_url) if (is_photo or media_url.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'))) else ""
-                media_filename = tempfile.NamedTemporaryFile(delete=False, suffix=ext).name
-                download_file(media_url, media_filename)
-                try:
-                    if is_photo or media_url.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')):
-                        print(f"Processing image for segment {t1}-{t2}: {media_url}")
-                        resize_and_pad_image(media_filename, width, height)  # Use dynamic width/height
-                        image_clip = ImageClip(media_filename).set_duration(t2 - t1)
-                        image_clip = image_clip.with_start(t1)
-                        image_clip = image_clip.with_end(t2)
-                        visual_clips.append(image_clip)
-                        print(f"Used image fallback for segment {t1}-{t2}: {media_url}")
-                    else:
-                        # Handle as video
-                        video_clip = VideoFileClip(media_filename)
-                        video_clip = video_clip.with_start(t1)
-                        video_clip = video_clip.with_end(t2)
-                        visual_clips.append(video_clip)
-                except Exception as exc:
-                    print(f"Failed to open media for segment {t1}-{t2}: {media_url}")
-                    print(f"Error: {exc}")
-                    continue
+                print(f"Waiting for prefetched media: {media_url}")
+                media_filename = prefetcher.result(media_url)
+                if is_photo or is_image_url(media_url):
+                    print(f"Processing image for segment {t1}-{t2}: {media_url}")
+                    if not use_ffmpeg and media_filename not in prepared_images:
+                        # Stored originals are shared across jobs: resize into a job-local copy,
+                        # once per URL even if it repeats across merged segments
+                        try:
+                            resized_filename = tempfile.NamedTemporaryFile(delete=False, suffix=get_media_suffix(media_url, True), dir=work_dir).name
+                            resize_and_pad_image(media_filename, width, height, output_filename=resized_filename)  # Use dynamic width/height
+                            prepared_images[media_filename] = resized_filename
+                        except Exception as exc:
+                            print(f"Failed to open media for segment {t1}-{t2}: {media_url}")
+                            print(f"Error: {exc}")
+                            continue
+                    segments.append((t1, t2, prepared_images.get(media_filename, media_filename), "image"))
+                else:
+                    if normalizer is not None:
+                        normalizer.submit(media_filename, t2 - t1)
+                    segments.append((t1, t2, media_filename, "video"))
+
+            if normalizer is not None:
+                segments = [
+                    (t1, t2, normalizer.result(path, t2 - t1) if kind == "video" else path, kind)
+                    for t1, t2, path, kind in segments
+                ]
 
         audio_clips = []
         audio_file_clip = AudioFileClip(audio_file_path)
         audio_clips.append(audio_file_clip)
         moviepy_duration = audio_file_clip.duration
 
-        # --- Use wave module for WAV files ---
-        wave_duration = None
-        try:
-            import wave
-            with wave.open(audio_file_path, 'rb') as wf:
-                frames = wf.getnframes()
-                rate = wf.getframerate()
-                wave_duration = frames / float(rate)
-                print(f"WAVE module audio duration: {wave_duration}")
-        except Exception as e:
-            print(f"Could not get wave audio duration: {e}")
-
-        # --- Use ffprobe ---
-        ffmpeg_duration = None
-        try:
-            import subprocess
-            ffprobe_cmd = [
-                "ffprobe", "-v", "error", "-show_entries",
-                "format=duration", "-of",
-                "default=noprint_wrappers=1:nokey=1", audio_file_path
-            ]
-            ffprobe_out = subprocess.check_output(ffprobe_cmd).decode().strip()
-            ffmpeg_duration = float(ffprobe_out)
-            print(f"FFmpeg-reported audio duration: {ffmpeg_duration}")
-        except Exception as e:
-            print(f"Could not get ffmpeg audio duration: {e}")
-
-        # --- Use pydub ---
-        pydub_duration = None
-        try:
-            from pydub import AudioSegment
-            audio = AudioSegment.from_file(audio_file_path)
-            pydub_duration = len(audio) / 1000.0
-            print(f"Pydub audio duration: {pydub_duration}")
-        except Exception as e:
-            print(f"Could not get pydub audio duration: {e}")
-
-        # --- Use audioread ---
-        audioread_duration = None
-        try:
-            import audioread
-            with audioread.audio_open(audio_file_path) as f:
-                audioread_duration = f.duration
-                print(f"Audioread audio duration: {audioread_duration}")
-        except Exception as e:
-            print(f"Could not get audioread audio duration: {e}")
-
-        # --- Use mutagen ---
-        mutagen_duration = None
-        try:
-            from mutagen import File as MutagenFile
-            mfile = MutagenFile(audio_file_path)
-            if mfile is not None and mfile.info is not None:
-                mutagen_duration = mfile.info.length
-                print(f"Mutagen audio duration: {mutagen_duration}")
-        except Exception as e:
-            print(f"Could not get mutagen audio duration: {e}")
-
-        # --- Use the maximum duration ---
-        durations = [
-            moviepy_duration, wave_duration, ffmpeg_duration,
-            pydub_duration, audioread_duration, mutagen_duration
-        ]
-        durations = [d for d in durations if d]
-        if durations:
-            audio_duration = max(durations)
-            print(f"Using max audio duration: {audio_duration}")
-        else:
-            audio_duration = moviepy_duration
-            print(f"Falling back to MoviePy audio duration: {audio_duration}")
+        # --- One cached probe (WAV header or a single ffprobe) instead of decoding the file again ---
+        probed_duration = get_media_duration(audio_file_path)
+        print(f"Probed audio duration: {probed_duration}, MoviePy audio duration: {moviepy_duration}")
+        durations = [d for d in (moviepy_duration, probed_duration) if d]
+        audio_duration = max(durations) if durations else moviepy_duration
+        print(f"Using max audio duration: {audio_duration}")
 
         # --- Ensure last caption extends to audio end ---
         if timed_captions and audio_duration:
@@ -389,117 +383,127 @@ def get_output_media(
         else:
             text_max_width = width
 
+        # Soft subtitles keep the visible colors even when burned captions are disabled
+        subtitle_colors = dict(fontcolor=fontcolor, stroke_color=stroke_color)
+
         # If captions are "disabled", make them fully transparent using RGBA
         if disable_captions:
             fontcolor = "rgba(0,0,0,0)"
             stroke_color = "rgba(0,0,0,0)"
 
-        # After visual_clips are created, get video height for caption positioning
-        video_height = height  # Use dynamic height for caption positioning
-
-        for (t1, t2), text in timed_captions:
-            # Ensure no caption ends after audio
-            t2 = min(t2, audio_file_clip.duration)
-            text_clip = TextClip(
-                text=text,
-                font_size=fontsize,
-                color=fontcolor,
-                font=font,
-                stroke_width=stroke_width,
-                stroke_color=stroke_color,
-                method="caption",
-                size=(text_max_width, None)
-            )
-            # --- Position logic ---
-            if caption_vertical_align == "center":
-                text_clip = text_clip.with_position("center")
-            else:  # "bottom"
-                text_clip = text_clip.with_position(
-                    lambda txt: (
-                        (width - text_clip.w) // 2,
-                        video_height - text_clip.h - caption_margin
-                    )
-                )
-            text_clip = text_clip.with_start(t1)
-            text_clip = text_clip.with_end(t2)
-            visual_clips.append(text_clip)
         # --- Set video duration to audio duration plus a small buffer ---
         buffer = 0.5  # seconds, to ensure no cutoff
         if 'audio_duration' in locals() and audio_duration:
             final_duration = audio_duration + buffer
         else:
-            final_duration = max([clip.end for clip in visual_clips])
-        video = CompositeVideoClip(visual_clips)
-
-        # --- Ensure an audio track is present for FFmpeg mixing ---
-        need_silent_audio = False
-        if soundtrack_file:
-            # If disable_audio or audio_clips is empty, we need to add silent audio
-            if disable_audio or not audio_clips:
-                need_silent_audio = True
-
-        if need_silent_audio:
-            print("[AUDIO] Adding silent audio track for soundtrack mixing...")
-            fps = 44100
-            silent_audio = np.zeros(int(final_duration * fps), dtype=np.float32)
-            silent_clip = AudioArrayClip(silent_audio, fps=fps)
-            video = video.with_duration(final_duration)
-            video.audio = silent_clip
-        elif audio_clips and not disable_audio:
-            audio = CompositeAudioClip(audio_clips)
-            video = video.with_duration(final_duration)
-            video.audio = audio
-        else:
-            video = video.with_duration(final_duration)
-            video = video.without_audio()
-
-        # --- Write MoviePy output (captions always burned in) ---
-        temp_video_file = "temp_moviepy_output.mp4"
-        video.write_videofile(
-            temp_video_file,
-            codec='libx264',
-            audio_codec='aac' if (not disable_audio or soundtrack_file) else None,
-            fps=25,
-            preset=preset,
-            ffmpeg_params=[
-                '-threads', os.environ.get('FFMPEG_THREADS', '8'),
-                '-preset', 'ultrafast',
-                '-crf', '28',
-                '-pix_fmt', 'yuv420p',
-                '-movflags', '+faststart',
-                '-max_muxing_queue_size', '1024'
-            ]
+            final_duration = max([t2 for _, t2, _, _ in segments if t2 != float("inf")] or [0])
+
+        caption_style = dict(
+            font=font,
+            fontsize=fontsize,
+            fontcolor=fontcolor,
+            stroke_color=stroke_color,
+            stroke_width=stroke_width,
+            text_max_width=text_max_width,
+            vertical_align=caption_vertical_align,
+            margin=caption_margin,
+            caption_mode=caption_mode,
         )
-
-        # --- If soundtrack is provided, use FFmpeg to mix it in ---
-        OUTPUT_FILE_NAME = "rendered_video.mp4"
-        if soundtrack_file:
-            print(f"[DEBUG] Checking soundtrack file: {soundtrack_file}")
-            if not os.path.exists(soundtrack_file):
-                print(f"[ERROR] Soundtrack file does not exist: {soundtrack_file}")
+        # Ensure no caption ends after audio
+        captions = [((t1, min(t2, audio_file_clip.duration)), text) for (t1, t2), text in timed_captions]
+
+        # --- Soft subtitle sidecars (<output>.ass / <output>.srt) ---
+        if subtitle_files and captions:
+            subtitle_base = os.path.splitext(OUTPUT_FILE_NAME)[0]
+            write_ass(captions, dict(caption_style, **subtitle_colors), width, height, subtitle_base + ".ass")
+            write_srt(captions, subtitle_base + ".srt")
+            print(f"[SUBTITLES] Wrote {subtitle_base}.ass and {subtitle_base}.srt")
+
+        # --- ASS burn-in: one subtitle script instead of one overlay per caption ---
+        if caption_mode == "ass" and captions and not disable_captions and render_backend != "parallel":
+            burn_ass_file = write_ass(
+                captions, caption_style, width, height,
+                tempfile.NamedTemporaryFile(delete=False, suffix=".ass", dir=work_dir).name
+            )
+            print(f"[SUBTITLES] Burning {len(captions)} captions with libass from {burn_ass_file}")
+        video_filters = [ass_filter(burn_ass_file, font)] if burn_ass_file else []
+
+        if use_ffmpeg or render_backend == "parallel":
+            # Captions, backgrounds and audio (narration + soundtrack) rendered outside the
+            # single-process MoviePy composite. Disabled captions are transparent in MoviePy,
+            # so simply leave them out here
+            if disable_captions:
+                captions = []
+            extra_kwargs = dict(work_dir=work_dir, ffreport=ffreport)
+            if use_ffmpeg:
+                render_func = render_with_ffmpeg
+                if burn_ass_file:
+                    captions = []
+                    extra_kwargs["video_filters"] = video_filters
             else:
-                print(f"[DEBUG] Soundtrack file size: {os.path.getsize(soundtrack_file)} bytes")
-            print(f"[DEBUG] About to call add_soundtrack_ffmpeg with: {soundtrack_file}")
-            output_with_soundtrack = OUTPUT_FILE_NAME.replace(".mp4", "_with_soundtrack.mp4")
-            try:
-                add_soundtrack_ffmpeg(
-                    input_video=temp_video_file,
-                    soundtrack=soundtrack_file,
-                    output_video=output_with_soundtrack,
-                    volume=soundtrack_volume
-                )
-                print(f"Soundtrack mixed video saved to {output_with_soundtrack}")
-                # Overwrite rendered_video.mp4 with the new file for UI compatibility
-                shutil.move(output_with_soundtrack, OUTPUT_FILE_NAME)
-                print(f"Renamed {output_with_soundtrack} to {OUTPUT_FILE_NAME} for UI compatibility")
-            except Exception as e:
-                print(f"Failed to mix soundtrack with FFmpeg: {e}")
-                shutil.move(temp_video_file, OUTPUT_FILE_NAME)
+                # Each chunk burns its own time-shifted ASS script (see render_chunk)
+                render_func = render_parallel
+            render_func(
+                OUTPUT_FILE_NAME,
+                segments,
+                captions,
+                caption_style,
+                width,
+                height,
+                final_duration,
+                audio_file_path=audio_file_path,
+                disable_audio=disable_audio,
+                soundtrack_file=soundtrack_file,
+                soundtrack_volume=soundtrack_volume,
+                preset=preset,
+                **extra_kwargs,
+            )
         else:
+            visual_clips = []
+            for t1, t2, path, kind in segments:
+                try:
+                    visual_clips.append(build_segment_clip(t1, min(t2, final_duration), path, kind, width, height))
+                except Exception as exc:
+                    print(f"Failed to open media for segment {t1}-{t2}: {path}")
+                    print(f"Error: {exc}")
+            if caption_mode == "overlay":
+                for (t1, t2), text in captions:
+                    visual_clips.append(build_caption_clip(text, t1, t2, caption_style, width, height))
+            video = CompositeVideoClip(visual_clips).with_duration(final_duration)
+
+            # --- Narration + soundtrack mixed in the same encode (no second ffmpeg pass) ---
+            audio = build_audio_track(audio_clips, final_duration, disable_audio, soundtrack_file, soundtrack_volume)
+            if audio is not None:
+                video = video.with_audio(audio)
+            else:
+                video = video.without_audio()
+
+            # --- Write MoviePy output (captions always burned in) ---
+            temp_video_file = tempfile.NamedTemporaryFile(
+                delete=False, prefix="temp_moviepy_output_", suffix=".mp4", dir=work_dir
+            ).name
+            with ffreport_environ(ffreport):
+                video.write_videofile(
+                    temp_video_file,
+                    temp_audiofile_path=os.path.dirname(temp_video_file),
+                    codec='libx264',
+                    audio_codec='aac' if audio is not None else None,
+                    fps=25,
+                    preset=preset,
+                    ffmpeg_params=[
+                        '-threads', os.environ.get('FFMPEG_THREADS', '8'),
+                        '-preset', 'ultrafast',
+                        '-crf', '28',
+                        '-pix_fmt', 'yuv420p',
+                        '-movflags', '+faststart',
+                        '-max_muxing_queue_size', '1024'
+                    ] + (['-vf', ','.join(video_filters)] if video_filters else [])
+                )
+
             shutil.move(temp_video_file, OUTPUT_FILE_NAME)
 
         # --- FFmpeg log handling ---
-        ffmpeg_log_src = "/app/tmp/ffmpeg_report.log"
+        ffmpeg_log_src = ffreport_path(ffreport) or "/app/tmp/ffmpeg_report.log"
         ffmpeg_log_dir = "exports/logs/ffmpeg"
         if os.path.exists(ffmpeg_log_src):
             os.makedirs(ffmpeg_log_dir, exist_ok=True)
@@ -512,12 +516,20 @@ def get_output_media(
             except Exception as e:
                 print(f"Failed to move FFmpeg log: {e}")
 
-        # Clean up downloaded files
-        for (t1, t2), media_url in background_video_data:
-            media_filename = tempfile.NamedTemporaryFile(delete=False).name
-            os.remove(media_filename)
-
         return OUTPUT_FILE_NAME
     except Exception as e:
         print(f"Error rendering video: {e}")
         raise
+    finally:
+        # Clean up downloaded files; pools are stopped on failure too
+        if normalizer is not None:
+            normalizer.shutdown()
+        if prefetcher is not None:
+            prefetcher.shutdown()
+            print(f"[MEDIA STORE] Stats: {get_media_store().stats()}")
+        media_lease.release()
+        for resized_filename in prepared_images.values():
+            if os.path.exists(resized_filename):
+                os.remove(resized_filename)
+        if burn_ass_file and os.path.exists(burn_ass_file):
+            os.remove(burn_ass_file)
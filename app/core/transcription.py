@@ -0,0 +1,174 @@
+"""
+Cached Whisper transcription.
+
+The raw transcribe_timestamped output is stored as JSON keyed by
+(audio SHA-256, model, language, options), so re-rendering the same narration
+with other caption settings only re-runs getCaptionsWithTime on top of it.
+
+With TRANSCRIBE_VAD the audio is converted once to 16 kHz mono, the speech
+spans found by the energy VAD are cut out and joined with short silences, and
+only that goes into Whisper; word and segment times are mapped back onto the
+original timeline afterwards.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from bisect import bisect_right
+from functools import lru_cache
+
+from app.utils.media_store import MediaStore
+from app.utils.media_probe import get_media_duration
+from app.core.whisper_models import get_whisper_model, model_key
+from app.core.chunked_transcription import (
+    transcribe_chunked, TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP,
+    TRANSCRIBE_PARALLEL_MIN_SECONDS, TRANSCRIBE_WORKERS,
+)
+
+TRANSCRIPT_CACHE = str(os.environ.get("TRANSCRIPT_CACHE", "true")).lower() in ("true", "1", "yes")
+TRANSCRIPT_CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR", "temp/transcripts")
+TRANSCRIPT_CACHE_MAX_MB = int(os.environ.get("TRANSCRIPT_CACHE_MAX_MB", "256"))
+HASH_CHUNK_SIZE = 1024 * 1024
+TRANSCRIBE_VAD = str(os.environ.get("TRANSCRIBE_VAD", "true")).lower() in ("true", "1", "yes")
+# Context kept around each speech span, and silence put between the kept spans
+TRANSCRIBE_VAD_PAD_MS = int(os.environ.get("TRANSCRIBE_VAD_PAD_MS", "200"))
+TRANSCRIBE_VAD_GAP_MS = int(os.environ.get("TRANSCRIBE_VAD_GAP_MS", "300"))
+
+
+@lru_cache(maxsize=256)
+def _file_sha256(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_sha256(path):
+    """SHA-256 of the file contents, memoized per (path, mtime, size)."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return _file_sha256(path, st.st_mtime_ns, st.st_size)
+
+
+def transcript_cache_key(audio_hash, model, language=None, options=None):
+    raw = json.dumps([audio_hash, list(model), language, options or {}], sort_keys=True)
+    return "transcript:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+_transcript_store = None
+
+
+def get_transcript_store():
+    global _transcript_store
+    if _transcript_store is None:
+        _transcript_store = MediaStore(root=TRANSCRIPT_CACHE_DIR, max_bytes=TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024)
+    return _transcript_store
+
+
+# --- Speech trimming ---
+
+def to_original_time(t, timeline, prefer_next=False):
+    """
+    Map time t in the trimmed audio back to the original. timeline is
+    [(compact start, original start, length), ...]; a time in an inserted gap maps to the
+    end of the span before it, or with prefer_next (word starts) to the start of the next one.
+    """
+    starts = [entry[0] for entry in timeline]
+    k = max(0, bisect_right(starts, t) - 1)
+    compact_start, original_start, length = timeline[k]
+    offset = t - compact_start
+    if offset > length and prefer_next and k + 1 < len(timeline):
+        return timeline[k + 1][1]
+    return original_start + min(max(offset, 0.0), length)
+
+
+def remap_transcript(result, timeline):
+    """Copy of a transcribe_timestamped result with every word and segment time on the original timeline."""
+    segments = []
+    for segment in result.get("segments", []):
+        words = []
+        for word in segment.get("words", []):
+            start = to_original_time(word["start"], timeline, prefer_next=True)
+            end = to_original_time(word["end"], timeline)
+            words.append(dict(word, start=round(start, 3), end=round(max(start, end), 3)))
+        start = to_original_time(segment["start"], timeline, prefer_next=True)
+        end = to_original_time(segment["end"], timeline)
+        segments.append(dict(segment, start=round(start, 3), end=round(max(start, end), 3), words=words))
+    return dict(result, segments=segments)
+
+
+def _transcribe_speech(audio_filename, model, language, options):
+    from app.core.vad import VAD_SAMPLE_RATE, open_speech_audio, detect_speech, compact_speech, write_wav
+
+    workdir = tempfile.mkdtemp(prefix="transcribe_vad_")
+    try:
+        samples = open_speech_audio(audio_filename, workdir)
+        spans = detect_speech(samples, VAD_SAMPLE_RATE)
+        speech, timeline = compact_speech(
+            samples, spans, pad=TRANSCRIBE_VAD_PAD_MS / 1000, gap=TRANSCRIBE_VAD_GAP_MS / 1000,
+        )
+        del samples
+        if not timeline:
+            print(f"[TRANSCRIBE] No speech found in {audio_filename}")
+            return {"text": "", "segments": [], "language": language}
+        speech_duration = len(speech) / VAD_SAMPLE_RATE
+        print(f"[TRANSCRIBE] Speech is {speech_duration:.1f}s of {timeline[-1][1] + timeline[-1][2]:.1f}s "
+              f"in {len(timeline)} spans")
+        if speech_duration >= TRANSCRIBE_PARALLEL_MIN_SECONDS and TRANSCRIBE_WORKERS > 1:
+            path = write_wav(os.path.join(workdir, "speech.wav"), speech)
+            speech_spans = [(compact_start, compact_start + length) for compact_start, _, length in timeline]
+            result = transcribe_chunked(path, speech_duration, model, language, options, speech_spans=speech_spans)
+        else:
+            # Whisper takes 16 kHz float32 samples directly and skips its own ffmpeg decode
+            from whisper_timestamped import transcribe_timestamped
+            result = transcribe_timestamped(get_whisper_model(*model), speech, language=language, **options)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return remap_transcript(result, timeline)
+
+
+def _run_transcription(audio_filename, model, language, options, chunked_duration=None):
+    if TRANSCRIBE_VAD:
+        return _transcribe_speech(audio_filename, model, language, options)
+    if chunked_duration:
+        return transcribe_chunked(audio_filename, chunked_duration, model, language, options)
+    from whisper_timestamped import transcribe_timestamped
+    return transcribe_timestamped(get_whisper_model(*model), audio_filename, language=language, **options)
+
+
+def transcribe(audio_filename, model_size=None, language=None, **options):
+    """
+    transcribe_timestamped result for audio_filename ({"text", "segments": [{"words": [...]}], ...}),
+    served from the transcript cache when the same audio was transcribed with the same settings.
+    """
+    model = model_key(model_size)
+    options.setdefault("verbose", False)
+    options.setdefault("fp16", model[2] == "fp16")
+    # Long narrations are split on silences and transcribed in a process pool
+    duration = get_media_duration(audio_filename)
+    chunked_duration = duration if (
+        duration and duration >= TRANSCRIBE_PARALLEL_MIN_SECONDS and TRANSCRIBE_WORKERS > 1
+    ) else None
+    if not TRANSCRIPT_CACHE:
+        return _run_transcription(audio_filename, model, language, options, chunked_duration)
+
+    key_options = dict(options)
+    if TRANSCRIBE_VAD:
+        key_options.update(vad_pad_ms=TRANSCRIBE_VAD_PAD_MS, vad_gap_ms=TRANSCRIBE_VAD_GAP_MS)
+    if chunked_duration:
+        key_options.update(chunk_seconds=TRANSCRIBE_CHUNK_SECONDS, chunk_overlap=TRANSCRIBE_CHUNK_OVERLAP)
+    key = transcript_cache_key(audio_sha256(audio_filename), model, language, key_options)
+    store = get_transcript_store()
+
+    def run(_key, output):
+        print(f"[TRANSCRIBE] Transcribing {audio_filename} with {model}")
+        result = _run_transcription(audio_filename, model, language, options, chunked_duration)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+
+    # A hit skips Whisper entirely; only getCaptionsWithTime runs on top of the stored result
+    with open(store.fetch(key, run, suffix=".json"), "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,129 @@
+"""
+Sentence-level TTS helpers.
+
+The script is split into sentences that are synthesized independently, and the
+per-sentence WAVs (all normalized to the same rate, channels and sample width)
+are stitched back together in script order. WavStitcher appends each sentence
+to the narration as soon as it and every sentence before it are ready, so the
+narration is written while later sentences are still being synthesized.
+Stitching reports where each sentence starts and ends in the narration.
+
+Sentences are cached by tts_cache_key, so an edited script only re-synthesizes
+the sentences that changed.
+"""
+
+import re
+import json
+import wave
+import hashlib
+import unicodedata
+
+STITCH_BLOCK_FRAMES = 64 * 1024
+# A sentence ends at . ! ? (optionally followed by closing quotes/brackets) and whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\'”’)\]]*\s+')
+
+
+def split_sentences(text):
+    """Non-empty sentences of text, in order, with their end punctuation."""
+    sentences = []
+    start = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        sentences.append(text[start:match.end()].strip())
+        start = match.end()
+    sentences.append(text[start:].strip())
+    return [s for s in sentences if s]
+
+
+def normalize_text(text):
+    """NFC text with runs of whitespace collapsed; spacing alone does not change the speech."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def tts_cache_key(provider, voice, rate, text, audio_format):
+    """Cache key of the audio_format audio that (provider, voice, rate) makes of text."""
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    raw = json.dumps([provider, voice, rate, audio_format, text_hash])
+    return "tts:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def wav_params(path):
+    """(channels, sample width, rate) of a PCM WAV."""
+    with wave.open(path, "rb") as wf:
+        return wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+
+
+class WavStitcher:
+    """
+    Appends PCM WAVs with identical parameters to output_filename in index order.
+    add(index, path) may be called in any order; a WAV is copied as soon as every
+    lower index has been. offsets holds (start, end) in seconds per copied WAV.
+    """
+
+    def __init__(self, output_filename):
+        self.output_filename = output_filename
+        self.offsets = []
+        self._out = None
+        self._params = None
+        self._frames_written = 0
+        self._ready = {}
+
+    @property
+    def pending(self):
+        """Indexes added but still waiting for an earlier one."""
+        return sorted(self._ready)
+
+    def add(self, index, path):
+        self._ready[index] = path
+        while len(self.offsets) in self._ready:
+            self._append(self._ready.pop(len(self.offsets)))
+
+    def _append(self, path):
+        with wave.open(path, "rb") as wf:
+            current = (wf.getnchannels(), wf.getsampwidth(), wf.getframerate())
+            if self._params is None:
+                self._params = current
+                self._out = wave.open(self.output_filename, "wb")
+                self._out.setnchannels(current[0])
+                self._out.setsampwidth(current[1])
+                self._out.setframerate(current[2])
+            elif current != self._params:
+                raise ValueError(f"{path}: {current} does not match {self._params}")
+            # Copied block by block; streamed WAV headers can overstate the frame count,
+            # so count what was actually read
+            frame_bytes = current[0] * current[1]
+            frames = 0
+            while True:
+                data = wf.readframes(STITCH_BLOCK_FRAMES)
+                data = data[:len(data) // frame_bytes * frame_bytes]
+                if not data:
+                    break
+                self._out.writeframes(data)
+                frames += len(data) // frame_bytes
+        rate = self._params[2]
+        self.offsets.append((self._frames_written / rate, (self._frames_written + frames) / rate))
+        self._frames_written += frames
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def stitch_wavs(paths, output_filename):
+    """
+    Concatenate PCM WAVs with identical parameters into output_filename.
+    Returns [(start, end), ...] in seconds for each input. Raises ValueError on mismatched parameters.
+    """
+    if not paths:
+        raise ValueError("Nothing to stitch")
+    with WavStitcher(output_filename) as stitcher:
+        for i, path in enumerate(paths):
+            stitcher.add(i, path)
+    return stitcher.offsets
@@ -0,0 +1,112 @@
+"""
+Process-wide Whisper model registry.
+
+Models are keyed by (model_size, device, dtype), loaded lazily on first use and
+shared by every job in the process (CLI run or warm worker). Each load reports
+its time and memory footprint.
+
+dtype "int8" is a CPU-only mode: the fp32 model's Linear layers (attention
+projections and MLPs, most of Whisper's weights and FLOPs) are swapped for
+dynamically quantized int8 ones. See benchmarks/bench_whisper_quantization.py
+for what it costs in accuracy on a given corpus.
+"""
+
+import os
+import time
+import resource
+import threading
+
+WHISPER_MODEL_SIZE = os.environ.get("WHISPER_MODEL_SIZE", "base")
+# "cpu", "cuda" or empty for cuda when available
+WHISPER_DEVICE = os.environ.get("WHISPER_DEVICE", "")
+# "fp32", "fp16" (only pays off on GPU) or "int8" (dynamic quantization, CPU only)
+WHISPER_DTYPE = os.environ.get("WHISPER_DTYPE", "fp32")
+# Torch intra-op threads for Whisper, independent of OMP_NUM_THREADS; 0 keeps torch's default
+WHISPER_THREADS = int(os.environ.get("WHISPER_THREADS", "0"))
+# Comma-separated model sizes the warm worker loads at start-up
+WHISPER_PRELOAD = [size.strip() for size in os.environ.get("WHISPER_PRELOAD", WHISPER_MODEL_SIZE).split(",") if size.strip()]
+
+_models = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _default_device():
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _model_bytes(model):
+    # Quantized Linear weights live in packed params, not parameters(), so walk the state dict
+    total = 0
+    for value in model.state_dict().values():
+        for t in value if isinstance(value, tuple) else (value,):
+            if hasattr(t, "element_size"):
+                total += t.numel() * t.element_size()
+    return total
+
+
+def _quantize_int8(model):
+    import torch
+
+    # whisper's Linear subclass only adds a dtype cast for fp16; quantize_dynamic swaps exact nn.Linear types
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def model_key(model_size=None, device=None, dtype=None):
+    return (model_size or WHISPER_MODEL_SIZE, device or WHISPER_DEVICE or _default_device(), dtype or WHISPER_DTYPE)
+
+
+def get_whisper_model(model_size=None, device=None, dtype=None):
+    """Shared whisper_timestamped model for (model_size, device, dtype), loaded on first use."""
+    key = model_key(model_size, device, dtype)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        if key in _models:
+            return _models[key]
+        size, device, dtype = key
+        if dtype == "int8" and device != "cpu":
+            raise ValueError(f"int8 Whisper runs on cpu only, not {device}")
+        from whisper_timestamped import load_model
+
+        if WHISPER_THREADS:
+            import torch
+            torch.set_num_threads(WHISPER_THREADS)
+        started = time.perf_counter()
+        model = load_model(size, device=device)
+        if dtype == "fp16":
+            model = model.half()
+        elif dtype == "int8":
+            model = _quantize_int8(model)
+        elif dtype != "fp32":
+            raise ValueError(f"Unsupported Whisper dtype: {dtype}")
+        model.eval()
+        _stats[key] = {
+            "load_seconds": round(time.perf_counter() - started, 3),
+            "weights_mb": round(_model_bytes(model) / (1024 * 1024), 1),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        }
+        print(f"[WHISPER] Loaded {key}: {_stats[key]}")
+        _models[key] = model
+        return model
+
+
+def preload_whisper_models(model_sizes=None, device=None, dtype=None):
+    """Load the given model sizes (default WHISPER_PRELOAD) ahead of the first job."""
+    for size in model_sizes or WHISPER_PRELOAD:
+        get_whisper_model(size, device, dtype)
+
+
+def whisper_model_stats():
+    """{(model_size, device, dtype): {load_seconds, weights_mb, peak_rss_mb}} for loaded models."""
+    return dict(_stats)
@@ -7,22 +7,31 @@ from app.services.pexels_service import generate_video_url
 from app.services.pexels_diversity import generate_video_url_diverse
 from app.core.render import get_output_media
 from app.core.search_generator import getVideoSearchQueriesTimed, merge_empty_intervals
+from app.utils.job_workspace import JobWorkspace
 
 import asyncio
 
 app = FastAPI()
 
+
+@app.on_event("shutdown")
+async def close_clients():
+    await kokoro_client.close()
+
+
 @app.post("/generate-video")
 async def generate_video(topic: str):
-    SAMPLE_FILE_NAME = "audio_tts.wav"
+    # Kept for the caller to fetch the video; purged after JOB_MAX_AGE_HOURS
+    job = JobWorkspace(cleanup="never")
+    SAMPLE_FILE_NAME = job.path("audio_tts.wav")
     VIDEO_SERVER = "pexel"
 
     response = generate_script(topic)
     print("script: {}".format(response))
 
-    await generate_audio(response, SAMPLE_FILE_NAME)
+    sentence_offsets = await generate_audio(response, SAMPLE_FILE_NAME)
 
-    timed_captions = generate_timed_captions(SAMPLE_FILE_NAME)
+    timed_captions = generate_timed_captions(SAMPLE_FILE_NAME, known_text=response, sentence_offsets=sentence_offsets)
     print(timed_captions)
 
     search_terms = getVideoSearchQueriesTimed(response, timed_captions)
@@ -49,7 +58,10 @@ async def generate_video(topic: str):
     background_video_urls_merged = merge_empty_intervals(background_video_urls_for_merge)
 
     if background_video_urls_merged is not None:
-        video = get_output_media(SAMPLE_FILE_NAME, timed_captions, background_video_urls_merged, VIDEO_SERVER)
+        video = get_output_media(
+            SAMPLE_FILE_NAME, timed_captions, background_video_urls_merged, VIDEO_SERVER,
+            output_file=job.path("rendered_video.mp4"), work_dir=job.dir
+        )
         print(video)
         return {"status": "success", "video": video}
     else:
@@ -1,20 +1,57 @@
 """Kokoro Service TTS client implementation."""
 
 import os
+import asyncio
 import aiohttp
 import json
 import hashlib
 import shutil
+import tempfile
 from typing import Dict, List, Optional, Any, Union
 from loguru import logger
 from pathlib import Path
 
+KOKORO_MAX_CONNECTIONS = int(os.environ.get("KOKORO_MAX_CONNECTIONS", "8"))
+KOKORO_TIMEOUT = float(os.environ.get("KOKORO_TIMEOUT", "300"))
+KOKORO_CONNECT_TIMEOUT = float(os.environ.get("KOKORO_CONNECT_TIMEOUT", "10"))
+# Retries after a 5xx or connection error, waiting KOKORO_BACKOFF * 2**attempt seconds
+KOKORO_RETRIES = int(os.environ.get("KOKORO_RETRIES", "3"))
+KOKORO_BACKOFF = float(os.environ.get("KOKORO_BACKOFF", "0.5"))
+# Audio is written to disk in chunks of this size as it arrives
+KOKORO_CHUNK_BYTES = 64 * 1024
+
+RETRYABLE_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+
 class KokoroServiceClient:
-    """Client for Kokoro Service TTS API."""
+    """Client for Kokoro Service TTS API.
+
+    Holds one pooled aiohttp session (keep-alive connections, at most max_connections)
+    for as long as the event loop it was opened on; call close() on shutdown.
+    """
     
-    def __init__(self, base_url: str = "http://kokoro_service:8880"):
+    def __init__(
+        self,
+        base_url: str = "http://kokoro_service:8880",
+        max_connections: int = KOKORO_MAX_CONNECTIONS,
+        timeout: float = KOKORO_TIMEOUT,
+        connect_timeout: float = KOKORO_CONNECT_TIMEOUT,
+        retries: int = KOKORO_RETRIES,
+        backoff: float = KOKORO_BACKOFF,
+    ):
         """Initialize the Kokoro Service client."""
         self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self._metrics = {
+            "requests": 0, "retries": 0, "failures": 0,
+            "sessions_opened": 0, "connections_opened": 0, "connections_reused": 0,
+            "bytes_streamed": 0,
+        }
         
         # Update path to look in config directory
         kokoro_voices_path = Path(__file__).parent.parent.parent.parent / "config" / "data" / "kokoro_voices.json"
@@ -81,77 +118,162 @@ class KokoroServiceClient:
         
         return formatted_voices
     
-    async def create_speech(
-        self,
-        text: str,
-        voice: str = "af_heart",
-        response_format: str = "wav",
-        speed: float = 1.0
-    ) -> Optional[bytes]:
-        """Generate speech using Kokoro Service."""
-        try:
-            # Start with the basic payload that worked in our test
-            payload = {
-                "input": text,
-                "voice": voice,
-                "response_format": "wav",  # Ensure Kokoro returns WAV audio
-                "speed": speed
-            }
-            
-            # Add optional parameters if they differ from defaults
-            if response_format != "wav":
-                payload["response_format"] = response_format
-            
-            if speed != 1.0:
-                payload["speed"] = speed
-                
-            logger.info(f"Sending TTS request to Kokoro Service for voice: {voice}")
-            logger.debug(f"Payload: {json.dumps(payload)}")
-            
-            async with aiohttp.ClientSession() as session:
+    def metrics(self) -> Dict[str, int]:
+        """Request, retry and connection reuse counters since the client was created."""
+        return dict(self._metrics)
+
+    def _count(self, name):
+        async def handler(session, context, params):
+            self._metrics[name] += 1
+        return handler
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is loop:
+            return self._session
+        if self._session is not None and not self._session.closed:
+            # Opened on an event loop that has since finished; its connections cannot be reused here
+            logger.warning("Kokoro session belongs to another event loop, opening a new one")
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._count("connections_opened"))
+        trace.on_connection_reuseconn.append(self._count("connections_reused"))
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=self.timeout,
+            trace_configs=[trace],
+        )
+        self._session_loop = loop
+        self._metrics["sessions_opened"] += 1
+        return self._session
+
+    async def close(self):
+        """Close the pooled session and its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def _stream_to_file(self, response: aiohttp.ClientResponse, output_path: str):
+        # Flushed per chunk, so readers can start on the partial file
+        with open(output_path, "wb") as f:
+            async for chunk in response.content.iter_chunked(KOKORO_CHUNK_BYTES):
+                f.write(chunk)
+                f.flush()
+                self._metrics["bytes_streamed"] += len(chunk)
+
+    async def _write_audio(self, session: aiohttp.ClientSession, response: aiohttp.ClientResponse, output_path: str) -> bool:
+        content_type = response.headers.get('Content-Type', '')
+        logger.debug(f"Response content type: {content_type}")
+
+        if 'application/json' in content_type:
+            response_data = await response.json()
+
+            if "audio" in response_data:
+                # Base64 inside a JSON body cannot be streamed; decode it whole
+                import base64
+                with open(output_path, "wb") as f:
+                    f.write(base64.b64decode(response_data["audio"]))
+                return True
+            elif "download_link" in response_data:
+                async with session.get(response_data["download_link"]) as dl_response:
+                    if dl_response.status == 200:
+                        await self._stream_to_file(dl_response, output_path)
+                        return True
+                    logger.error(f"Failed to download audio: {dl_response.status}")
+                    return False
+            else:
+                logger.error("Response doesn't contain audio data or download link")
+                return False
+        else:
+            logger.info(f"Streaming audio from Kokoro Service to {output_path}")
+            await self._stream_to_file(response, output_path)
+            return True
+
+    def _speech_payload(self, text: str, voice: str, response_format: str, speed: float) -> Dict[str, Any]:
+        # Start with the basic payload that worked in our test
+        payload = {
+            "input": text,
+            "voice": voice,
+            "response_format": "wav",  # Ensure Kokoro returns WAV audio
+            "speed": speed
+        }
+        
+        # Add optional parameters if they differ from defaults
+        if response_format != "wav":
+            payload["response_format"] = response_format
+        
+        if speed != 1.0:
+            payload["speed"] = speed
+        return payload
+
+    async def _request_speech(self, payload: Dict[str, Any], handle_response):
+        """POST payload with retries; handle_response(session, response) turns a 200 into the result (None on failure)."""
+        logger.info(f"Sending TTS request to Kokoro Service for voice: {payload['voice']}")
+        logger.debug(f"Payload: {json.dumps(payload)}")
+
+        session = await self._get_session()
+        for attempt in range(self.retries + 1):
+            self._metrics["requests"] += 1
+            try:
                 async with session.post(
                     f"{self.base_url}/v1/audio/speech",
                     json=payload
                 ) as response:
                     if response.status == 200:
-                        # Check content type to determine format
-                        content_type = response.headers.get('Content-Type', '')
-                        logger.debug(f"Response content type: {content_type}")
-                        
-                        if 'application/json' in content_type:
-                            # Process as JSON
-                            response_data = await response.json()
-                            
-                            if "audio" in response_data:
-                                # Base64 encoded audio
-                                import base64
-                                audio_b64 = response_data["audio"]
-                                return base64.b64decode(audio_b64)
-                            elif "download_link" in response_data:
-                                # Download from link
-                                download_url = response_data["download_link"]
-                                
-                                async with session.get(download_url) as dl_response:
-                                    if dl_response.status == 200:
-                                        return await dl_response.read()
-                                    else:
-                                        logger.error(f"Failed to download audio: {dl_response.status}")
-                                        return None
-                            else:
-                                logger.error("Response doesn't contain audio data or download link")
-                                return None
-                        else:
-                            # Return the direct audio bytes
-                            logger.info("Received direct audio data from Kokoro Service")
-                            return await response.read()
-                    else:
-                        error_text = await response.text()
+                        return await handle_response(session, response)
+                    error_text = await response.text()
+                    if response.status < 500:
                         logger.error(f"Failed to generate speech: {response.status} - {error_text}")
+                        self._metrics["failures"] += 1
                         return None
+                    error = f"{response.status} - {error_text}"
+            except RETRYABLE_ERRORS as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt < self.retries:
+                delay = self.backoff * 2 ** attempt
+                self._metrics["retries"] += 1
+                logger.warning(f"Kokoro request failed ({error}), retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        logger.error(f"Failed to generate speech after {self.retries + 1} attempts: {error}")
+        self._metrics["failures"] += 1
+        return None
 
+    async def save_speech(
+        self,
+        text: str,
+        output_path: str,
+        voice: str = "af_heart",
+        response_format: str = "wav",
+        speed: float = 1.0
+    ) -> bool:
+        """Generate speech and stream it into output_path as it arrives; False on failure."""
+        try:
+            payload = self._speech_payload(text, voice, response_format, speed)
+            return bool(await self._request_speech(
+                payload, lambda session, response: self._write_audio(session, response, output_path)
+            ))
         except Exception as e:
             logger.exception(f"Error generating speech with Kokoro Service: {e}")
-            return None
+            return False
+
+    async def create_speech(
+        self,
+        text: str,
+        voice: str = "af_heart",
+        response_format: str = "wav",
+        speed: float = 1.0
+    ) -> Optional[bytes]:
+        """Generate speech using Kokoro Service; the whole audio in memory (see save_speech)."""
+        # Same streaming path as save_speech, through a temporary file
+        fd, output_path = tempfile.mkstemp(prefix="kokoro_", suffix=f".{response_format}")
+        os.close(fd)
+        try:
+            if not await self.save_speech(text, output_path, voice, response_format, speed):
+                return None
+            with open(output_path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(output_path)
 
 
 # Create a singleton instance for reuse
@@ -2,7 +2,7 @@ import os
 import requests
 import json
 from app.utils.helpers import log_response, LOG_TYPE_PEXEL  # Updated from utility.utils
-from app.utils.pg_cache import ensure_cache_table, get_cached_response, insert_cache  # <-- Add this import
+from app.utils.pg_cache import get_cached_response, insert_cache
 
 PEXELS_API_KEY = os.environ.get('PEXELS_API_KEY')
 
@@ -21,6 +21,24 @@ def contains_negative_keyword(text):
             return True
     return False
 
+# Only what getBestVideo / getBestVideoDiverse and their logs read
+VIDEO_FIELDS = ("id", "url", "alt", "tags", "location", "width", "height", "duration")
+VIDEO_FILE_FIELDS = ("id", "quality", "file_type", "width", "height", "fps", "link")
+
+def project_video_search(json_data):
+    """Search response reduced to the fields video selection uses, for caching."""
+    videos = []
+    for video in json_data.get("videos", []):
+        projected = {field: video[field] for field in VIDEO_FIELDS if field in video}
+        user = video.get("user") or {}
+        projected["user"] = {field: user[field] for field in ("id", "name") if field in user}
+        projected["video_files"] = [
+            {field: video_file[field] for field in VIDEO_FILE_FIELDS if field in video_file}
+            for video_file in video.get("video_files", [])
+        ]
+        videos.append(projected)
+    return {"videos": videos}
+
 def search_videos(query_string, orientation_landscape=True, video_name=None, theme=None, topic=None, aspect_ratio=None):
     print(f"Searching for Pexels videos... Query: {query_string}")
     try:
@@ -41,15 +59,17 @@ def search_videos(query_string, orientation_landscape=True, video_name=None, the
             "per_page": 15
         }
 
-        # Minimal cache integration
-        ensure_cache_table()
-        cached = get_cached_response(video_name, theme, topic, aspect_ratio, query_string)
+        # Cached per request, shared by every video that makes the same search
+        cached = get_cached_response(params["query"], params["orientation"], params["per_page"])
         if cached:
             return cached
 
         response = requests.get(url, headers=headers, params=params)
         json_data = response.json()
-        insert_cache(video_name, theme, topic, aspect_ratio, query_string, json_data)
+        if response.ok and "videos" in json_data:
+            # Errors and rate-limit bodies are not cached
+            json_data = project_video_search(json_data)
+            insert_cache(params["query"], params["orientation"], params["per_page"], json_data)
         return json_data
     except Exception as e:
         print(f"Error searching Pexels videos: {e}")
@@ -0,0 +1,78 @@
+"""
+Streaming HTTP downloads.
+
+Files are streamed to disk in fixed-size chunks, so memory stays flat regardless
+of file size. An interrupted transfer is resumed with a Range request, and the
+final size is checked against what the server announced.
+"""
+
+import os
+import time
+
+import requests
+
+# Streaming download settings: fixed buffer per chunk, retries resume with HTTP Range
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+DOWNLOAD_MAX_RETRIES = int(os.environ.get("DOWNLOAD_MAX_RETRIES", "3"))
+DOWNLOAD_TIMEOUT = (10, 60)  # (connect, read) seconds
+
+
+class IncompleteDownloadError(IOError):
+    pass
+
+
+def _content_range_total(content_range):
+    # "bytes 1000-9999/10000" -> 10000
+    try:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total != "*" else None
+    except (IndexError, ValueError):
+        return None
+
+
+def fetch_remote_file(url, filename, chunk_size=None, max_retries=None):
+    """
+    Stream url to filename in fixed-size chunks so memory stays flat regardless of file size.
+    Interrupted transfers are resumed with a Range request; the final size is checked
+    against Content-Length (or the Content-Range total).
+    """
+    chunk_size = chunk_size or DOWNLOAD_CHUNK_SIZE
+    max_retries = DOWNLOAD_MAX_RETRIES if max_retries is None else max_retries
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+    expected_size = None
+    for attempt in range(max_retries + 1):
+        offset = os.path.getsize(filename) if os.path.exists(filename) else 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+        try:
+            with requests.get(url, headers=request_headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if offset and response.status_code == 416 and expected_size == offset:
+                    return  # Already complete
+                response.raise_for_status()
+                if offset and response.status_code == 206:
+                    mode = 'ab'
+                    expected_size = _content_range_total(response.headers.get("Content-Range", "")) or expected_size
+                    print(f"[DOWNLOAD] Resuming {url} at byte {offset}")
+                else:
+                    # Fresh transfer (or server ignored Range): start over
+                    mode = 'wb'
+                    content_length = response.headers.get("Content-Length")
+                    # Content-Length is the encoded size when the body is compressed
+                    if content_length and not response.headers.get("Content-Encoding"):
+                        expected_size = int(content_length)
+                with open(filename, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+            size = os.path.getsize(filename)
+            if expected_size is not None and size != expected_size:
+                raise IncompleteDownloadError(f"Got {size} of {expected_size} bytes for {url}")
+            return
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, IncompleteDownloadError) as e:
+            if attempt >= max_retries:
+                raise
+            print(f"[DOWNLOAD] Attempt {attempt + 1} for {url} failed ({e}), retrying...")
+            time.sleep(min(2 ** attempt, 10))
@@ -0,0 +1,120 @@
+"""
+Per-job working directories.
+
+Every render job gets its own directory under JOB_ROOT for TTS audio, uploads,
+intermediate encodes, subtitle scripts, the ffmpeg report and the output video,
+so several jobs can run side by side on one host without clobbering each other.
+
+Cleanup policy (JOB_CLEANUP):
+- "always": remove the directory when the job ends
+- "on_success": keep it after a failure for debugging (default)
+- "never": keep it
+Directories older than JOB_MAX_AGE_HOURS are purged whenever a new workspace is
+created, so crashed jobs are cleaned up too.
+"""
+
+import os
+import time
+import uuid
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+
+JOB_ROOT = os.environ.get("JOB_ROOT", "temp/jobs")
+JOB_CLEANUP = os.environ.get("JOB_CLEANUP", "on_success")
+JOB_MAX_AGE_HOURS = float(os.environ.get("JOB_MAX_AGE_HOURS", "24"))
+JOB_CLEANUP_POLICIES = ("always", "on_success", "never")
+
+
+def purge_stale_jobs(root=None, max_age_hours=None):
+    """Remove job directories under root not modified for max_age_hours. Returns how many were removed."""
+    root = root or JOB_ROOT
+    max_age_hours = JOB_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+class JobWorkspace:
+    """
+    A job directory with a cleanup policy. Use as a context manager, or call
+    cleanup(success) when the job ends:
+
+        with JobWorkspace() as job:
+            get_output_media(..., output_file=job.path("rendered_video.mp4"), work_dir=job.dir)
+    """
+
+    def __init__(self, job_id=None, root=None, cleanup=None):
+        root = root or JOB_ROOT
+        self.cleanup_policy = cleanup or JOB_CLEANUP
+        if self.cleanup_policy not in JOB_CLEANUP_POLICIES:
+            raise ValueError(f"Unsupported job cleanup policy: {self.cleanup_policy}")
+        purge_stale_jobs(root)
+        self.job_id = job_id or f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.dir = os.path.abspath(os.path.join(root, self.job_id))
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def ffreport_env(self, level=32):
+        """FFREPORT value that sends ffmpeg reports of this job into its directory."""
+        return f"file={self.path('ffmpeg_report.log')}:level={level}"
+
+    def cleanup(self, success=True):
+        if self.cleanup_policy == "always" or (self.cleanup_policy == "on_success" and success):
+            shutil.rmtree(self.dir, ignore_errors=True)
+            print(f"[JOB] Removed workspace {self.dir}")
+        else:
+            print(f"[JOB] Kept workspace {self.dir}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup(success=exc_type is None)
+        return False
+
+
+def ffreport_path(value=None):
+    """Report file named by an FFREPORT value ("file=/path/report.log:level=32"), or None."""
+    value = os.environ.get("FFREPORT", "") if value is None else value
+    for part in value.split(":"):
+        if part.startswith("file="):
+            return part[len("file="):]
+    return None
+
+
+def ffmpeg_env(ffreport=None):
+    """Environment for an ffmpeg subprocess reporting per the FFREPORT value ffreport; None (inherit) without one."""
+    return dict(os.environ, FFREPORT=ffreport) if ffreport else None
+
+
+@contextmanager
+def ffreport_environ(ffreport=None):
+    """
+    Set FFREPORT for the ffmpeg processes MoviePy starts (it takes no env), and restore
+    it afterwards so a warm worker does not carry one job's report into the next.
+    """
+    if not ffreport:
+        yield
+        return
+    previous = os.environ.get("FFREPORT")
+    os.environ["FFREPORT"] = ffreport
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("FFREPORT", None)
+        else:
+            os.environ["FFREPORT"] = previous
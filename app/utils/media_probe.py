@@ -0,0 +1,107 @@
+"""
+Cached media probing.
+
+One probe per file: PCM WAVs are read from their header, everything else goes
+through a single ffprobe call. Results are cached by (path, mtime, size), so
+caption, render and soundtrack code can all ask for durations without spawning
+more processes or decoding the file again.
+"""
+
+import os
+import json
+import wave
+import subprocess
+from functools import lru_cache
+
+MEDIA_PROBE_CACHE_SIZE = int(os.environ.get("MEDIA_PROBE_CACHE_SIZE", "512"))
+
+
+def _probe_wav_header(path):
+    with wave.open(path, "rb") as wf:
+        rate = wf.getframerate()
+        return {
+            "format": "wav",
+            "duration": wf.getnframes() / float(rate),
+            "streams": [{
+                "type": "audio",
+                "codec": f"pcm_s{8 * wf.getsampwidth()}le" if wf.getsampwidth() > 1 else "pcm_u8",
+                "sample_rate": rate,
+                "channels": wf.getnchannels(),
+            }],
+        }
+
+
+def _frame_rate(value):
+    # ffprobe reports rates as "30000/1001"
+    try:
+        num, den = value.split("/")
+        return float(num) / float(den) if float(den) else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def _probe_ffprobe(path):
+    cmd = ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()[-500:]}")
+    data = json.loads(result.stdout or "{}")
+    fmt = data.get("format", {})
+    streams = []
+    for stream in data.get("streams", []):
+        info = {"type": stream.get("codec_type"), "codec": stream.get("codec_name")}
+        if info["type"] == "audio":
+            info["sample_rate"] = int(stream.get("sample_rate") or 0) or None
+            info["channels"] = stream.get("channels")
+        elif info["type"] == "video":
+            info["width"] = stream.get("width")
+            info["height"] = stream.get("height")
+            info["fps"] = _frame_rate(stream.get("avg_frame_rate"))
+        streams.append(info)
+    durations = [float(d) for d in [fmt.get("duration")] + [s.get("duration") for s in data.get("streams", [])] if d]
+    return {
+        "format": fmt.get("format_name"),
+        # Longest of container and stream durations (some containers under-report)
+        "duration": max(durations) if durations else None,
+        "streams": streams,
+    }
+
+
+@lru_cache(maxsize=MEDIA_PROBE_CACHE_SIZE)
+def _probe_cached(path, mtime_ns, size):
+    try:
+        info = _probe_wav_header(path)
+    except Exception:
+        # Not a PCM WAV (or float WAV, which the wave module rejects)
+        info = _probe_ffprobe(path)
+    info["path"] = path
+    info["size"] = size
+    for stream in info["streams"]:
+        info.setdefault(f"{stream['type']}_codec", stream["codec"])
+    return info
+
+
+def probe_media(path):
+    """
+    Probe a media file -> dict with path, size, format, duration (seconds or None),
+    streams (type, codec and audio/video parameters), audio_codec and video_codec.
+    Raises if the file is missing or cannot be probed.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    info = _probe_cached(path, st.st_mtime_ns, st.st_size)
+    # Callers get their own copy; the cached entry stays untouched
+    return dict(info, streams=[dict(stream) for stream in info["streams"]])
+
+
+def get_media_duration(path):
+    """Duration in seconds from the cached probe, or None if the file cannot be probed."""
+    try:
+        return probe_media(path)["duration"]
+    except Exception as e:
+        print(f"[PROBE] Could not probe {path}: {e}")
+        return None
+
+
+def clear_probe_cache():
+    _probe_cached.cache_clear()
@@ -0,0 +1,343 @@
+import os
+import re
+import fcntl
+import shutil
+import hashlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Persistent on-disk cache for downloaded stock media (Pexels clips and photos)
+MEDIA_STORE_DIR = os.environ.get("MEDIA_STORE_DIR", "temp/media_store")
+MEDIA_STORE_MAX_MB = int(os.environ.get("MEDIA_STORE_MAX_MB", "5120"))
+# Other processes share the directory; re-read it at most this often to see their files
+MEDIA_STORE_RESCAN_SECONDS = float(os.environ.get("MEDIA_STORE_RESCAN_SECONDS", "600"))
+
+# https://videos.pexels.com/video-files/<video id>/<video id>-<quality>.mp4?<signature>
+PEXELS_VIDEO_FILE_RE = re.compile(r"^/video-files/(\d+)/([^/]+)$")
+
+
+def media_key(url):
+    """
+    Stable cache key for a media URL.
+    Pexels video files are keyed by their video-file name so signed/tracking query
+    strings do not cause misses; everything else is keyed by the full URL.
+    """
+    parsed = urlparse(url)
+    if parsed.netloc.endswith("videos.pexels.com"):
+        match = PEXELS_VIDEO_FILE_RE.match(parsed.path)
+        if match:
+            return f"pexels-video-file:{match.group(2)}"
+    return f"url:{url}"
+
+
+class MediaStore:
+    """
+    Content-addressed, size-capped local media cache with LRU eviction.
+    - Files are named by the SHA-256 of media_key(url), so any job can find them.
+    - Writes go to a unique .part file and are renamed into place (atomic).
+    - A file's mtime is its last-access time; hits touch it, eviction removes the oldest.
+    - An in-memory index (path -> last use, size) and running total make eviction free
+      of directory walks; the directory is re-read every MEDIA_STORE_RESCAN_SECONDS.
+    - Pinned paths (see lease()) are never evicted while a job is still using them.
+      A pin is also a <file>.<pid>-<store>.lease file, so stores in other processes
+      sharing the directory skip it too (leases of dead processes are cleared).
+      Pinning and eviction take a lock file (flock) on the directory, so a file
+      cannot be evicted between another process finding it and pinning it.
+    - With auto_evict=False writes never evict; the owner calls evict() when done.
+    """
+
+    def __init__(self, root=MEDIA_STORE_DIR, max_bytes=MEDIA_STORE_MAX_MB * 1024 * 1024,
+                 auto_evict=True, rescan_seconds=MEDIA_STORE_RESCAN_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.auto_evict = auto_evict
+        self.rescan_seconds = rescan_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+        self._index = {}
+        self._total = 0
+        self._scanned_at = None
+        self._pins = {}
+        self._lease_tag = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock_path = os.path.join(root, ".lock")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, url, suffix=""):
+        digest = hashlib.sha256(media_key(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + suffix)
+
+    def get(self, url, suffix="", pin=False):
+        """Return the cached path for url (and mark it recently used), or None. pin=True pins it (see unpin)."""
+        path = self.path_for(url, suffix)
+        with self._lock, self._dir_lock(exclusive=False):
+            # Under the locks so no eviction (here or in another process) removes the file
+            # between the check and the pin
+            try:
+                os.utime(path, None)
+                size = os.path.getsize(path)
+            except OSError:
+                self.misses += 1
+                return None
+            self._record(path, size)
+            if pin:
+                self._pin(path)
+            self.hits += 1
+        return path
+
+    def fetch(self, url, download_func, suffix="", pin=False):
+        """
+        Return a local path for url, downloading it with download_func(url, filename)
+        into the store on a miss. pin=True pins it (see unpin).
+        """
+        path = self.get(url, suffix, pin=pin)
+        if path:
+            print(f"[MEDIA STORE] HIT {url}")
+            return path
+        print(f"[MEDIA STORE] MISS {url}")
+        path = self.path_for(url, suffix)
+        size = self._write(path, lambda part_path: download_func(url, part_path), pin=pin)
+        with self._lock:
+            self.bytes_downloaded += size
+        if self.auto_evict:
+            self.evict(keep=path)
+        return path
+
+    def put(self, url, source_path, suffix="", pin=False):
+        """Copy an already produced file into the store under url and return the stored path."""
+        path = self.path_for(url, suffix)
+        self._write(path, lambda part_path: shutil.copyfile(source_path, part_path), pin=pin)
+        if self.auto_evict:
+            self.evict(keep=path)
+        return path
+
+    def _write(self, path, write_func, pin=False):
+        # write_func fills a unique .part file that is renamed into place; returns the size
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if pin:
+            # Pinned before it lands, so no process can evict it in between
+            with self._lock, self._dir_lock(exclusive=False):
+                self._pin(path)
+        part_path = f"{path}.{uuid.uuid4().hex}.part"
+        try:
+            write_func(part_path)
+            size = os.path.getsize(part_path)
+            os.replace(part_path, path)
+        except BaseException:
+            if pin:
+                self.unpin(path)
+            raise
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        with self._lock:
+            self._record(path, size)
+        return size
+
+    # --- Index (callers hold self._lock) ---
+
+    def _record(self, path, size, last_used=None):
+        previous = self._index.get(path)
+        self._total += size - (previous[1] if previous else 0)
+        self._index[path] = (time.time() if last_used is None else last_used, size)
+
+    def _forget(self, path):
+        previous = self._index.pop(path, None)
+        if previous:
+            self._total -= previous[1]
+
+    def _rescan(self):
+        index = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith((".part", ".lease")) or name == ".lock":
+                    continue
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                index[full] = (st.st_mtime, st.st_size)
+        # Uses recorded by this process since the walk started are newer than the disk
+        for path, (last_used, size) in self._index.items():
+            if path in index and last_used > index[path][0]:
+                index[path] = (last_used, index[path][1])
+        self._index = index
+        self._total = sum(size for _, size in index.values())
+        self._scanned_at = time.monotonic()
+
+    def _rescan_if_stale(self):
+        if self._scanned_at is None or time.monotonic() - self._scanned_at >= self.rescan_seconds:
+            self._rescan()
+
+    # --- Pins (callers hold self._lock) ---
+
+    @contextmanager
+    def _dir_lock(self, exclusive):
+        # Shared while pinning, exclusive while evicting; across every process on the directory
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _lease_path(self, path):
+        return f"{path}.{self._lease_tag}.lease"
+
+    def _pin(self, path):
+        count = self._pins.get(path, 0)
+        if not count:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(self._lease_path(path), "w").close()
+        self._pins[path] = count + 1
+
+    def _leased_elsewhere(self, path):
+        """True when another store (in any live process) holds a lease on path; stale leases are removed."""
+        directory, name = os.path.split(path)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return False
+        leased = False
+        for lease in names:
+            if not (lease.startswith(name + ".") and lease.endswith(".lease")):
+                continue
+            try:
+                pid = int(lease[len(name) + 1:].split("-", 1)[0])
+                os.kill(pid, 0)
+                leased = True
+            except ValueError:
+                continue
+            except PermissionError:
+                leased = True  # Alive, owned by another user
+            except ProcessLookupError:
+                try:
+                    os.remove(os.path.join(directory, lease))
+                except OSError:
+                    pass
+        return leased
+
+    def pin(self, url, suffix=""):
+        """Pin the path for url, whether or not it exists yet (e.g. before another process writes it)."""
+        path = self.path_for(url, suffix)
+        with self._lock, self._dir_lock(exclusive=False):
+            self._pin(path)
+        return path
+
+    def unpin(self, path):
+        """Release one pin taken by pin() or get/fetch/put(pin=True)."""
+        with self._lock:
+            count = self._pins.get(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+                return
+            if self._pins.pop(path, None) is not None:
+                try:
+                    os.remove(self._lease_path(path))
+                except OSError:
+                    pass
+
+    def lease(self):
+        """A MediaLease: everything fetched through it stays pinned until it is released."""
+        return MediaLease(self)
+
+    def total_bytes(self):
+        with self._lock:
+            self._rescan_if_stale()
+            return self._total
+
+    def evict(self, keep=None):
+        """Delete least-recently-used files no store has pinned until the store fits in max_bytes."""
+        with self._lock:
+            self._rescan_if_stale()
+            if self._total <= self.max_bytes:
+                return
+            with self._dir_lock(exclusive=True):
+                self._evict_locked(keep)
+
+    def _evict_locked(self, keep):
+        for path, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._total <= self.max_bytes:
+                break
+            if path == keep or path in self._pins or self._leased_elsewhere(path):
+                continue
+            try:
+                os.remove(path)
+                self.evictions += 1
+                print(f"[MEDIA STORE] Evicted {path} ({size} bytes)")
+            except FileNotFoundError:
+                pass  # Already evicted by another process
+            except OSError as e:
+                print(f"[MEDIA STORE] Failed to evict {path}: {e}")
+                continue
+            self._forget(path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes_downloaded": self.bytes_downloaded,
+                "bytes_stored": self._total,
+                "pinned": len(self._pins),
+            }
+
+
+class MediaLease:
+    """
+    Pins every path a job gets from a MediaStore until release(), so other fetches
+    cannot evict a file the job is still rendering from. Thread-safe; a context manager.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._paths = []
+        self._lock = threading.Lock()
+
+    def _hold(self, path):
+        if path:
+            with self._lock:
+                self._paths.append(path)
+        return path
+
+    def get(self, url, suffix=""):
+        return self._hold(self.store.get(url, suffix, pin=True))
+
+    def pin(self, url, suffix=""):
+        return self._hold(self.store.pin(url, suffix))
+
+    def fetch(self, url, download_func, suffix=""):
+        return self._hold(self.store.fetch(url, download_func, suffix, pin=True))
+
+    def put(self, url, source_path, suffix=""):
+        return self._hold(self.store.put(url, source_path, suffix, pin=True))
+
+    def release(self):
+        with self._lock:
+            paths, self._paths = self._paths, []
+        for path in paths:
+            self.store.unpin(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+_media_store = None
+_media_store_lock = threading.Lock()
+
+
+def get_media_store():
+    """Process-wide MediaStore configured from MEDIA_STORE_DIR / MEDIA_STORE_MAX_MB."""
+    global _media_store
+    with _media_store_lock:
+        if _media_store is None:
+            _media_store = MediaStore()
+        return _media_store
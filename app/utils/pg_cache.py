@@ -1,50 +1,286 @@
+"""
+Postgres cache of Pexels search responses.
+
+Rows are keyed by the normalized request (query, orientation, per_page, page)
+under a unique primary key, so the same search made for any video hits, and are
+upserted with an expiry time. Expired rows are never served and are deleted in
+batches by a background purge thread.
+
+Connections come from one ThreadedConnectionPool per process (re-created after a
+fork, so warm worker children never share sockets). The schema is created and
+migrated once per process, on first use, under an advisory lock so concurrent
+workers do not race. Lookups and inserts are timed; see pg_cache_stats().
+A cache that cannot reach Postgres behaves as a miss instead of failing the search.
+"""
+
 import os
-import psycopg2
 import json
-from datetime import datetime
+import time
+import threading
+from contextlib import contextmanager
 
-def get_pg_conn():
-    return psycopg2.connect(
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "8"))
+PG_CONNECT_TIMEOUT = int(os.getenv("PG_CONNECT_TIMEOUT", "5"))
+PEXELS_CACHE_TTL_HOURS = float(os.getenv("PEXELS_CACHE_TTL_HOURS", "168"))
+# 0 disables the background purge
+PEXELS_CACHE_PURGE_MINUTES = float(os.getenv("PEXELS_CACHE_PURGE_MINUTES", "60"))
+PURGE_BATCH_ROWS = 1000
+# Arbitrary constant for pg_advisory_xact_lock around migrations
+SCHEMA_LOCK_ID = 0x7065786C
+
+# (version, SQL), applied in order; never edit an applied entry, append a new one
+MIGRATIONS = [
+    (1, """
+        CREATE TABLE IF NOT EXISTS pexels_cache (
+            id SERIAL PRIMARY KEY,
+            video_name TEXT NOT NULL,
+            theme TEXT,
+            topic TEXT,
+            aspect_ratio TEXT,
+            query TEXT,
+            response JSONB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    # Per-video rows keyed on the raw query never hit across videos; start over keyed on the request
+    (2, """
+        DROP TABLE IF EXISTS pexels_cache;
+        CREATE TABLE IF NOT EXISTS pexels_search_cache (
+            query TEXT NOT NULL,
+            orientation TEXT NOT NULL,
+            per_page INTEGER NOT NULL,
+            page INTEGER NOT NULL,
+            response JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (query, orientation, per_page, page)
+        );
+        CREATE INDEX IF NOT EXISTS pexels_search_cache_expires_at ON pexels_search_cache (expires_at);
+    """),
+]
+
+_pool = None
+_pool_pid = None
+_schema_ready = False
+_purge_stop = None
+_lock = threading.Lock()
+_stats = {
+    "lookups": 0, "hits": 0, "lookup_seconds": 0.0, "lookup_max_seconds": 0.0,
+    "inserts": 0, "insert_seconds": 0.0, "insert_max_seconds": 0.0,
+    "errors": 0, "pools_opened": 0, "purged": 0,
+}
+
+
+def connection_params():
+    return dict(
         dbname=os.getenv("POSTGRES_DB"),
         user=os.getenv("POSTGRES_USER"),
         password=os.getenv("POSTGRES_PASSWORD"),
         host=os.getenv("POSTGRES_HOST"),
         port=os.getenv("POSTGRES_PORT"),
+        connect_timeout=PG_CONNECT_TIMEOUT,
     )
 
-def ensure_cache_table():
-    with get_pg_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS pexels_cache (
-                    id SERIAL PRIMARY KEY,
-                    video_name TEXT NOT NULL,
-                    theme TEXT,
-                    topic TEXT,
-                    aspect_ratio TEXT,
-                    query TEXT,
-                    response JSONB,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            conn.commit()
 
-def get_cached_response(video_name, theme, topic, aspect_ratio, query):
-    with get_pg_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT response FROM pexels_cache
-                WHERE video_name=%s AND theme=%s AND topic=%s AND aspect_ratio=%s AND query=%s
-                ORDER BY created_at DESC LIMIT 1
-            """, (video_name, theme, topic, aspect_ratio, query))
-            row = cur.fetchone()
-            return row[0] if row else None
-
-def insert_cache(video_name, theme, topic, aspect_ratio, query, response):
-    with get_pg_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO pexels_cache (video_name, theme, topic, aspect_ratio, query, response)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (video_name, theme, topic, aspect_ratio, query, json.dumps(response)))
+def get_pg_conn():
+    """A new unpooled connection (scripts and benchmarks); the cache uses get_pool()."""
+    return psycopg2.connect(**connection_params())
+
+
+def get_pool():
+    """This process's connection pool, opened (and the schema migrated) on first use."""
+    global _pool, _pool_pid, _purge_stop
+    if _pool is not None and _pool_pid == os.getpid() and _schema_ready:
+        return _pool
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # A pool inherited through fork is left alone: its sockets belong to the parent,
+            # and the parent's purge thread did not survive the fork
+            _pool = ThreadedConnectionPool(PG_POOL_MIN, PG_POOL_MAX, **connection_params())
+            _pool_pid = os.getpid()
+            _stats["pools_opened"] += 1
+            print(f"[PG CACHE] Opened pool of {PG_POOL_MIN}-{PG_POOL_MAX} connections")
+            if PEXELS_CACHE_PURGE_MINUTES > 0:
+                _purge_stop = threading.Event()
+                threading.Thread(target=_purge_loop, args=(_purge_stop,), name="pg-cache-purge", daemon=True).start()
+    init_schema()
+    return _pool
+
+
+def close_pool():
+    global _pool, _pool_pid, _purge_stop
+    with _lock:
+        if _purge_stop is not None:
+            _purge_stop.set()
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _pool_pid = None
+        _purge_stop = None
+
+
+@contextmanager
+def pg_connection():
+    """Borrow a pooled connection; committed on success, rolled back on error."""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        # A broken connection is discarded instead of going back to the pool
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def init_schema():
+    """Apply pending MIGRATIONS once per process."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _lock:
+        if _schema_ready:
+            return
+        conn = _pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+                """)
+                cur.execute("SELECT version FROM schema_migrations")
+                applied = {row[0] for row in cur.fetchall()}
+                for version, sql in MIGRATIONS:
+                    if version not in applied:
+                        print(f"[PG CACHE] Applying migration {version}")
+                        cur.execute(sql)
+                        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
             conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            _pool.putconn(conn, close=bool(conn.closed))
+        _schema_ready = True
+
+
+def ensure_cache_table():
+    """Kept for callers of the old API; the schema is set up once when the pool opens."""
+    get_pool()
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+@contextmanager
+def _timed(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            _stats[f"{name}s"] += 1
+            _stats[f"{name}_seconds"] += elapsed
+            _stats[f"{name}_max_seconds"] = max(_stats[f"{name}_max_seconds"], elapsed)
+
+
+def pg_cache_stats():
+    """Counters plus average lookup/insert latency in milliseconds."""
+    with _lock:
+        stats = dict(_stats)
+    for name in ("lookup", "insert"):
+        count = stats[f"{name}s"]
+        stats[f"{name}_avg_ms"] = round(stats[f"{name}_seconds"] / count * 1000, 2) if count else 0.0
+    return stats
+
+
+def normalize_query(query):
+    """Case and spacing do not change a Pexels search."""
+    return " ".join(str(query).lower().split())
+
+
+def get_cached_response(query, orientation, per_page, page=1):
+    """Unexpired cached response for the search request, or None."""
+    try:
+        with _timed("lookup"), pg_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT response FROM pexels_search_cache
+                    WHERE query=%s AND orientation=%s AND per_page=%s AND page=%s
+                      AND expires_at > CURRENT_TIMESTAMP
+                """, (normalize_query(query), orientation, per_page, page))
+                row = cur.fetchone()
+    except psycopg2.Error as e:
+        _count("errors")
+        print(f"[PG CACHE] Lookup failed, treating as a miss: {e}")
+        return None
+    if row:
+        _count("hits")
+    return row[0] if row else None
+
+
+def insert_cache(query, orientation, per_page, response, page=1, ttl_hours=None):
+    """Store (or replace) the response to the search request for ttl_hours (default PEXELS_CACHE_TTL_HOURS)."""
+    ttl_hours = PEXELS_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+    try:
+        with _timed("insert"), pg_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO pexels_search_cache (query, orientation, per_page, page, response, expires_at)
+                    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+                    ON CONFLICT (query, orientation, per_page, page) DO UPDATE
+                    SET response = EXCLUDED.response,
+                        created_at = EXCLUDED.created_at,
+                        expires_at = EXCLUDED.expires_at
+                """, (normalize_query(query), orientation, per_page, page, json.dumps(response), ttl_hours * 3600))
+    except psycopg2.Error as e:
+        _count("errors")
+        print(f"[PG CACHE] Insert failed: {e}")
+
+
+def purge_expired(batch_rows=PURGE_BATCH_ROWS):
+    """Delete expired rows in batches (short transactions); returns how many were deleted."""
+    deleted = 0
+    while True:
+        with pg_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM pexels_search_cache WHERE ctid IN (
+                        SELECT ctid FROM pexels_search_cache
+                        WHERE expires_at <= CURRENT_TIMESTAMP LIMIT %s
+                    )
+                """, (batch_rows,))
+                count = cur.rowcount
+        deleted += count
+        if count < batch_rows:
+            break
+    with _lock:
+        _stats["purged"] += deleted
+    return deleted
+
+
+def _purge_loop(stop):
+    # Once right away (a CLI job may not live for a whole interval), then every interval
+    while True:
+        try:
+            deleted = purge_expired()
+            if deleted:
+                print(f"[PG CACHE] Purged {deleted} expired rows")
+        except Exception as e:
+            print(f"[PG CACHE] Purge failed: {e}")
+        if stop.wait(PEXELS_CACHE_PURGE_MINUTES * 60):
+            return
@@ -0,0 +1,262 @@
+"""
+Warm job worker.
+
+Runs `python -m app.worker`: forks JOB_WORKER_PROCESSES children that each import
+the heavy stack (torch, whisper_timestamped, moviepy, openai, nltk) once and then
+take jobs from a local multiprocessing.connection socket. A job is the same argv
+app.py accepts plus environment overrides; its stdout/stderr lines are streamed
+back to the client followed by a return code, so callers can treat it like a
+subprocess (see WorkerJob). Processes a job forks (render and transcription
+pools) write to the worker's own stdout/stderr, not the client's socket.
+
+Requests are pickled, so anyone holding the key can run code in the worker: it
+refuses to start without JOB_WORKER_AUTHKEY, and clients without it fall back to
+a plain app.py process.
+"""
+
+import os
+import sys
+import signal
+import argparse
+import traceback
+import multiprocessing
+from multiprocessing.connection import Client, Listener
+
+JOB_WORKER = str(os.environ.get("JOB_WORKER", "false")).lower() in ("true", "1", "yes")
+JOB_WORKER_ADDRESS = os.environ.get("JOB_WORKER_ADDRESS", "127.0.0.1:6001")
+JOB_WORKER_PROCESSES = int(os.environ.get("JOB_WORKER_PROCESSES", "1"))
+# No default: a well-known key would let any local process run code in the worker
+JOB_WORKER_AUTHKEY = os.environ.get("JOB_WORKER_AUTHKEY", "").encode("utf-8") or None
+# Seconds a worker gets to exit after SIGTERM before it is killed
+JOB_WORKER_STOP_TIMEOUT = 10
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+# --- Worker side ---
+
+# Real stdout/stderr while a job has them redirected to the client; restored in forked children
+_job_saved_streams = None
+
+
+def _restore_streams_in_child():
+    # Pools a job starts (parallel render, chunked transcription) are forked with the job's
+    # writer as stdout/stderr; sharing the client socket between processes would interleave
+    # sends and replay any partial line buffered at fork time, so children log locally
+    if _job_saved_streams is not None:
+        sys.stdout, sys.stderr = _job_saved_streams
+
+
+os.register_at_fork(after_in_child=_restore_streams_in_child)
+
+
+class _ConnectionWriter:
+    """File-like object that forwards complete lines to the client (from the process that created it only)."""
+
+    def __init__(self, conn, fallback=None):
+        self.conn = conn
+        self.buffer = ""
+        self.pid = os.getpid()
+        self.fallback = fallback or sys.__stderr__
+
+    def write(self, text):
+        if os.getpid() != self.pid:
+            # A forked child still holding a reference (e.g. a handler bound to the old sys.stderr)
+            return self.fallback.write(text)
+        self.buffer += text
+        # tqdm redraws with \r; treat it as a line end so progress reaches the client
+        while True:
+            cut = min((i for i in (self.buffer.find("\n"), self.buffer.find("\r")) if i >= 0), default=-1)
+            if cut < 0:
+                break
+            line, self.buffer = self.buffer[:cut], self.buffer[cut + 1:]
+            if line:
+                self.conn.send({"line": line})
+        return len(text)
+
+    def flush(self):
+        if os.getpid() != self.pid:
+            self.fallback.flush()
+            return
+        if self.buffer:
+            self.conn.send({"line": self.buffer})
+            self.buffer = ""
+
+    def isatty(self):
+        return False
+
+
+def warm_up():
+    """Import everything a job needs and load the Whisper models so the first stage starts immediately."""
+    import app.cli  # noqa: F401  (pulls in moviepy, openai, edge_tts, nltk)
+    # Warm-up only: app.cli imports Whisper lazily, but every job transcribes
+    import whisper_timestamped  # noqa: F401  (and torch)
+    from app.core.whisper_models import preload_whisper_models
+    preload_whisper_models()
+    # Open this worker's Postgres pool (migrating the schema if needed) for all its jobs
+    try:
+        from app.utils.pg_cache import get_pool
+        get_pool()
+    except Exception as e:
+        print(f"[WORKER] Postgres cache not ready, jobs will retry it: {e}")
+    print(f"[WORKER {os.getpid()}] Ready")
+
+
+def run_cli_job(argv):
+    from app.cli import build_parser, run_job
+    run_job(build_parser().parse_args(argv))
+
+
+def run_worker_job(conn, request, job_func=run_cli_job):
+    """Run one job request {"argv": [...], "env": {...}} with job_func(argv), output streamed over conn."""
+    global _job_saved_streams
+    saved_env = dict(os.environ)
+    saved_streams = sys.stdout, sys.stderr
+    writer = _ConnectionWriter(conn, fallback=saved_streams[1])
+    returncode = 0
+    try:
+        os.environ.update(request.get("env") or {})
+        _job_saved_streams = saved_streams
+        sys.stdout = sys.stderr = writer
+        job_func(request["argv"])
+    except SystemExit as e:
+        # argparse errors and explicit exits
+        returncode = e.code if isinstance(e.code, int) else 1
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        writer.flush()
+        sys.stdout, sys.stderr = saved_streams
+        _job_saved_streams = None
+        os.environ.clear()
+        os.environ.update(saved_env)
+    conn.send({"returncode": returncode})
+
+
+def _serve(listener, warm_up_func, job_func):
+    # The parent stops workers with SIGTERM; exit through SystemExit so finally blocks run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    warm_up_func()
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            print(f"[WORKER {os.getpid()}] Failed to accept connection: {e}")
+            continue
+        with conn:
+            try:
+                request = conn.recv()
+                print(f"[WORKER {os.getpid()}] Job: {request.get('argv')}")
+                run_worker_job(conn, request, job_func)
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                print(f"[WORKER {os.getpid()}] Client went away")
+
+
+def serve(address=None, processes=None, authkey=None, warm_up_func=warm_up, job_func=run_cli_job):
+    """Bind the job socket and fork the worker processes, which all accept on it."""
+    authkey = authkey or JOB_WORKER_AUTHKEY
+    if not authkey:
+        raise SystemExit("[WORKER] JOB_WORKER_AUTHKEY is not set; refusing to accept pickled jobs without a secret key")
+    listener = Listener(parse_address(address or JOB_WORKER_ADDRESS), authkey=authkey)
+    processes = processes or JOB_WORKER_PROCESSES
+    print(f"[WORKER] Listening on {address or JOB_WORKER_ADDRESS} with {processes} processes")
+    ctx = multiprocessing.get_context("fork")
+    # Not daemonic: jobs start process pools (clip normalization, parallel render, chunked
+    # transcription), and daemonic processes may not have children. They are stopped below instead.
+    workers = [ctx.Process(target=_serve, args=(listener, warm_up_func, job_func)) for _ in range(processes)]
+    previous_sigterm = signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        stop_workers(workers)
+        listener.close()
+        signal.signal(signal.SIGTERM, previous_sigterm)
+
+
+def stop_workers(workers, timeout=JOB_WORKER_STOP_TIMEOUT):
+    """SIGTERM every live worker, then kill the ones still running after timeout seconds."""
+    for worker in workers:
+        if worker.is_alive():
+            worker.terminate()
+    for worker in workers:
+        if worker.pid is not None:
+            worker.join(timeout)
+        if worker.is_alive():
+            worker.kill()
+            worker.join()
+
+
+# --- Client side ---
+
+class _StreamReader:
+    def __init__(self, job):
+        self.job = job
+
+    def readline(self):
+        line = self.job._next_line()
+        return "" if line is None else line + "\n"
+
+    def read(self):
+        lines = []
+        while (line := self.job._next_line()) is not None:
+            lines.append(line + "\n")
+        return "".join(lines)
+
+
+class WorkerJob:
+    """
+    A job running on the warm worker, with the subset of the Popen interface the
+    UI uses: stdout.readline(), stdout.read(), poll() and returncode.
+    """
+
+    def __init__(self, argv, env=None, address=None, authkey=None):
+        self.conn = Client(parse_address(address or JOB_WORKER_ADDRESS), authkey=authkey or JOB_WORKER_AUTHKEY)
+        self.conn.send({"argv": list(argv), "env": dict(env or {})})
+        self.returncode = None
+        self.stdout = _StreamReader(self)
+
+    def _next_line(self):
+        if self.returncode is not None:
+            return None
+        try:
+            message = self.conn.recv()
+        except EOFError:
+            self.returncode = 1
+            return "Error: worker connection closed"
+        if "returncode" in message:
+            self.returncode = message["returncode"]
+            self.conn.close()
+            return None
+        return message["line"]
+
+    def poll(self):
+        return self.returncode
+
+
+def submit_job(argv, env=None, address=None):
+    """WorkerJob for argv, or None if the worker is disabled or not reachable."""
+    if not JOB_WORKER:
+        return None
+    if not JOB_WORKER_AUTHKEY:
+        print("[WORKER] JOB_WORKER_AUTHKEY is not set; running the job in a new process")
+        return None
+    try:
+        return WorkerJob(argv, env=env, address=address)
+    except (ConnectionRefusedError, FileNotFoundError, OSError, multiprocessing.AuthenticationError) as e:
+        print(f"[WORKER] Worker unavailable at {address or JOB_WORKER_ADDRESS}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm worker that runs app.py jobs without a cold start.")
+    parser.add_argument("--address", type=str, default=JOB_WORKER_ADDRESS, help="host:port to listen on")
+    parser.add_argument("--processes", type=int, default=JOB_WORKER_PROCESSES, help="Number of worker processes")
+    cli_args = parser.parse_args()
+    serve(cli_args.address, cli_args.processes)
@@ -0,0 +1,99 @@
+"""
+Word timing of known-script alignment vs Whisper.
+
+Usage: python -m benchmarks.bench_caption_alignment --corpus narrations/ [--model-size base]
+
+Every audio file in --corpus needs the script it speaks in a .txt file next to
+it (e.g. narrations rendered by generate_audio). Each clip is captioned both ways:
+align_known_text (VAD speech spans, no Whisper) and transcribe (Whisper word
+timestamps, taken as the reference). Words are matched in order on their
+normalized text. Reports the mean, median and p90 absolute start/end error of
+the aligned words in milliseconds, how many words could be matched, and the time
+each method took. CAPTION_ALIGNMENT defaults to "transcribe" until these numbers
+show alignment is close enough.
+"""
+
+import argparse
+import difflib
+import os
+import re
+import statistics
+import time
+
+from app.core.caption_alignment import align_known_text
+from app.core.transcription import transcribe
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg")
+
+
+def normalize_word(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def result_words(result):
+    return [w for segment in result["segments"] for w in segment.get("words", [])]
+
+
+def matched_errors(aligned, reference):
+    """[(start error, end error), ...] in seconds for words matched between the two results."""
+    a = [normalize_word(w["text"]) for w in aligned]
+    b = [normalize_word(w["text"]) for w in reference]
+    errors = []
+    for block in difflib.SequenceMatcher(a=a, b=b, autojunk=False).get_matching_blocks():
+        for k in range(block.size):
+            ours, ref = aligned[block.a + k], reference[block.b + k]
+            errors.append((abs(ours["start"] - ref["start"]), abs(ours["end"] - ref["end"])))
+    return errors
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True, help="Directory of narrations, each with its script in a .txt file")
+    parser.add_argument("--model-size", type=str, default=None)
+    args = parser.parse_args()
+
+    clips = sorted(
+        os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+        if name.lower().endswith(AUDIO_EXTENSIONS) and os.path.exists(os.path.join(args.corpus, os.path.splitext(name)[0] + ".txt"))
+    )
+    if not clips:
+        parser.error(f"No audio files with a .txt script in {args.corpus}")
+
+    errors = []
+    total_words = 0
+    align_seconds = whisper_seconds = 0.0
+    for clip in clips:
+        with open(os.path.splitext(clip)[0] + ".txt", "r", encoding="utf-8") as f:
+            text = f.read()
+        started = time.perf_counter()
+        aligned = result_words(align_known_text(clip, text))
+        align_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        reference = result_words(transcribe(clip, model_size=args.model_size, language="en"))
+        whisper_seconds += time.perf_counter() - started
+        clip_errors = matched_errors(aligned, reference)
+        errors += clip_errors
+        total_words += len(aligned)
+        if clip_errors:
+            print(f"{os.path.basename(clip)}: {len(clip_errors)}/{len(aligned)} words matched, "
+                  f"mean start error {statistics.mean(e[0] for e in clip_errors) * 1000:.0f} ms")
+
+    if not errors:
+        print("No words matched between alignment and Whisper")
+        return
+    print(f"\n{len(clips)} clips, {len(errors)}/{total_words} words matched")
+    print(f"{'edge':>6} {'mean ms':>8} {'median ms':>10} {'p90 ms':>7}")
+    for name, index in (("start", 0), ("end", 1)):
+        values = [e[index] for e in errors]
+        print(f"{name:>6} {statistics.mean(values) * 1000:>8.0f} {statistics.median(values) * 1000:>10.0f} "
+              f"{percentile(values, 0.9) * 1000:>7.0f}")
+    print(f"align {align_seconds:.1f}s, whisper {whisper_seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
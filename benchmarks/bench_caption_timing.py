@@ -0,0 +1,64 @@
+"""
+Caption timing engine vs the original linear-scan getCaptionsWithTime.
+
+Usage: python -m benchmarks.bench_caption_timing [--words 1000,10000,100000,250000] [--legacy-max-words 20000]
+
+Builds synthetic transcripts (Whisper-shaped, ~6 characters per word, sentence
+punctuation every few words) and times both implementations. The original is
+quadratic, so it only runs up to --legacy-max-words; where both run, the outputs
+are checked for equality.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from app.core.caption_timing import build_captions
+from tests.test_caption_timing import legacy_captions_with_time
+
+VOCAB = ["video", "caption", "the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog",
+         "timing", "engine", "works", "fast", "end.", "really?", "yes!", "don't", "co-op", "2024"]
+
+
+def make_transcript(n_words, seed=0):
+    rng = random.Random(seed)
+    words = [rng.choice(VOCAB) for _ in range(n_words)]
+    t = 0.0
+    entries = []
+    for word in words:
+        t += rng.uniform(0.15, 0.45)
+        entries.append({"text": word, "start": round(t - 0.1, 3), "end": round(t, 3)})
+    segments = [{"words": entries[i:i + 12]} for i in range(0, len(entries), 12)]
+    return {"text": " " + " ".join(words), "segments": segments}
+
+
+def timed(func, *args, **kwargs):
+    # The original prints progress lines; keep them out of the table
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=str, default="1000,10000,100000,250000")
+    parser.add_argument("--legacy-max-words", type=int, default=20000)
+    parser.add_argument("--caption-size", type=int, default=25)
+    args = parser.parse_args()
+
+    print(f"{'words':>8} {'captions':>9} {'index s':>9} {'original s':>11} {'speed-up':>9} {'identical':>10}")
+    for n_words in [int(n) for n in args.words.split(",")]:
+        analysis = make_transcript(n_words)
+        captions, new_time = timed(build_captions, analysis, maxCaptionSize=args.caption_size)
+        if n_words <= args.legacy_max_words:
+            expected, old_time = timed(legacy_captions_with_time, analysis, maxCaptionSize=args.caption_size)
+            print(f"{n_words:>8} {len(captions):>9} {new_time:>9.3f} {old_time:>11.3f} {old_time / new_time:>9.1f} {str(captions == expected):>10}")
+        else:
+            print(f"{n_words:>8} {len(captions):>9} {new_time:>9.3f} {'-':>11} {'-':>9} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
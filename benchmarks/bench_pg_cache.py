@@ -0,0 +1,103 @@
+"""
+Connect-per-call vs pooled Postgres cache access.
+
+Usage: POSTGRES_HOST=localhost POSTGRES_PORT=5432 POSTGRES_DB=... POSTGRES_USER=... POSTGRES_PASSWORD=... \\
+       python -m benchmarks.bench_pg_cache [--queries 200] [--threads 1,4]
+
+Replays a job-like pattern (look up every query, insert the misses, look them up
+again) against the database in POSTGRES_*: once the old way, with a new
+psycopg2.connect and a CREATE TABLE IF NOT EXISTS per search, and once through
+the pooled app.utils.pg_cache. Rows are written under a throwaway video name and
+deleted afterwards. The baseline uses the old per-video table under a throwaway
+name (migration 2 dropped pexels_cache), dropped again when the run ends.
+Reports wall time and per-operation latency.
+"""
+
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils import pg_cache
+
+LEGACY_TABLE = f"bench_pexels_cache_{uuid.uuid4().hex[:8]}"
+RESPONSE = {"videos": [{"id": i, "duration": 10, "video_files": [{"link": f"https://example.com/{i}.mp4"}]} for i in range(15)]}
+
+
+# --- The pre-pool implementation, kept here as the baseline ---
+
+def legacy_search(video_name, query):
+    conn = pg_cache.get_pg_conn()
+    with conn, conn.cursor() as cur:
+        cur.execute(pg_cache.MIGRATIONS[0][1].replace("pexels_cache", LEGACY_TABLE))
+    conn.close()
+    conn = pg_cache.get_pg_conn()
+    with conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT response FROM {LEGACY_TABLE}
+            WHERE video_name=%s AND theme=%s AND topic=%s AND aspect_ratio=%s AND query=%s
+            ORDER BY created_at DESC LIMIT 1
+        """, (video_name, "bench", "bench", "landscape", query))
+        row = cur.fetchone()
+    conn.close()
+    if row:
+        return row[0]
+    conn = pg_cache.get_pg_conn()
+    with conn, conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {LEGACY_TABLE} (video_name, theme, topic, aspect_ratio, query, response)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (video_name, "bench", "bench", "landscape", query, json.dumps(RESPONSE)))
+    conn.close()
+    return RESPONSE
+
+
+def pooled_search(video_name, query):
+    query = f"{video_name} {query}"
+    cached = pg_cache.get_cached_response(query, "landscape", 15)
+    if cached:
+        return cached
+    pg_cache.insert_cache(query, "landscape", 15, RESPONSE)
+    return RESPONSE
+
+
+def run(search, queries, threads):
+    video_name = f"bench-{uuid.uuid4().hex}"
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        # First pass misses and inserts, second pass hits
+        for _ in range(2):
+            list(pool.map(lambda q: search(video_name, q), queries))
+    elapsed = time.perf_counter() - started
+    with pg_cache.pg_connection() as conn, conn.cursor() as cur:
+        if search is legacy_search:
+            cur.execute(f"DELETE FROM {LEGACY_TABLE} WHERE video_name=%s", (video_name,))
+        else:
+            cur.execute("DELETE FROM pexels_search_cache WHERE query LIKE %s", (video_name + " %",))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=str, default="1,4")
+    args = parser.parse_args()
+
+    pg_cache.get_pool()
+    queries = [f"query {i}" for i in range(args.queries)]
+    operations = args.queries * 2
+    print(f"{'mode':>8} {'threads':>8} {'wall s':>8} {'ms/search':>10}")
+    try:
+        for threads in [int(t) for t in args.threads.split(",")]:
+            for name, search in (("legacy", legacy_search), ("pooled", pooled_search)):
+                elapsed = run(search, queries, threads)
+                print(f"{name:>8} {threads:>8} {elapsed:>8.2f} {elapsed / operations * 1000:>10.2f}")
+    finally:
+        with pg_cache.pg_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {LEGACY_TABLE}")
+    print(f"Pooled cache stats: {pg_cache.pg_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare the MoviePy and native ffmpeg render backends on synthetic inputs.
+
+Usage: python -m benchmarks.bench_render_backends [--segments 12] [--seconds 30] [--aspect-ratio portrait]
+
+Generates test clips/photos/narration with ffmpeg, serves them over a local HTTP
+server (so the normal download + media store path is exercised), renders the same
+job with both backends and reports wall time, output duration, size and the PSNR
+between the two outputs.
+"""
+
+import argparse
+import functools
+import http.server
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+
+def make_inputs(workdir, segments, seconds):
+    sizes = ["1920x1080", "3840x2160", "1280x720", "1080x1920"]
+    rates = [25, 30, 24, 60]
+    media = []
+    for i in range(segments):
+        if i % 4 == 3:
+            name = f"photo_{i}.jpg"
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i",
+                            f"testsrc2=size={sizes[i % len(sizes)]}", "-frames:v", "1",
+                            os.path.join(workdir, name)], check=True)
+        else:
+            name = f"clip_{i}.mp4"
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i",
+                            f"testsrc=size={sizes[i % len(sizes)]}:rate={rates[i % len(rates)]}:duration={seconds / segments + 2}",
+                            "-c:v", "libx264", "-preset", "ultrafast", os.path.join(workdir, name)], check=True)
+        media.append(name)
+    narration = os.path.join(workdir, "narration.wav")
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i",
+                    f"sine=frequency=440:duration={seconds}", "-ac", "1", "-ar", "24000", narration], check=True)
+    return media, narration
+
+
+def serve(directory):
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def probe_duration(path):
+    out = subprocess.check_output(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                                   "-of", "default=noprint_wrappers=1:nokey=1", path])
+    return float(out.decode().strip())
+
+
+def psnr(a, b):
+    result = subprocess.run(["ffmpeg", "-i", a, "-i", b, "-lavfi", "psnr", "-f", "null", "-"],
+                            capture_output=True, text=True)
+    lines = [l for l in result.stderr.splitlines() if "PSNR" in l]
+    return lines[-1].split("PSNR", 1)[1].strip() if lines else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=12)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--aspect-ratio", default="landscape", choices=["landscape", "portrait", "square"])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_render_")
+    os.environ["MEDIA_STORE_DIR"] = os.path.join(workdir, "media_store")
+    from app.core.render import get_output_media
+
+    media, narration = make_inputs(workdir, args.segments, args.seconds)
+    server = serve(workdir)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    step = args.seconds / args.segments
+    background = [[[i * step, (i + 1) * step], f"{base_url}/{name}"] for i, name in enumerate(media)]
+    captions = [((i * step, (i + 1) * step), f"Benchmark caption number {i}") for i in range(args.segments)]
+
+    results = {}
+    for backend in ("moviepy", "ffmpeg"):
+        start = time.perf_counter()
+        output = get_output_media(narration, list(captions), background, "pexel",
+                                  aspect_ratio=args.aspect_ratio, render_backend=backend)
+        elapsed = time.perf_counter() - start
+        kept = os.path.join(workdir, f"rendered_{backend}.mp4")
+        shutil.move(output, kept)
+        results[backend] = (elapsed, kept)
+    server.shutdown()
+
+    print("\nbackend   wall(s)  duration(s)  size(MB)")
+    for backend, (elapsed, path) in results.items():
+        print(f"{backend:8} {elapsed:8.2f} {probe_duration(path):12.2f} {os.path.getsize(path) / 1e6:9.2f}")
+    speedup = results["moviepy"][0] / results["ffmpeg"][0]
+    print(f"speedup (moviepy/ffmpeg): {speedup:.2f}x")
+    print(f"PSNR ffmpeg vs moviepy: {psnr(results['ffmpeg'][1], results['moviepy'][1])}")
+    print(f"outputs kept in {workdir}")
+
+
+if __name__ == "__main__":
+    main()
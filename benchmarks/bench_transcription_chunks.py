@@ -0,0 +1,77 @@
+"""
+Scaling of chunked parallel transcription with chunk length and worker count.
+
+Usage: python -m benchmarks.bench_transcription_chunks --audio narration.wav [--minutes 10]
+       [--chunk-seconds 60,120,300] [--workers 1,2,4,8] [--model-size base]
+
+Builds a long narration by looping --audio up to --minutes, transcribes it once
+in a single process as the baseline and then with every (chunk length, workers)
+combination. Reports wall time, speed-up and how
+many words differ from the baseline.
+"""
+
+import argparse
+import difflib
+import os
+import subprocess
+import tempfile
+import time
+
+from app.core.chunked_transcription import transcribe_chunked
+from app.core.whisper_models import get_whisper_model, model_key
+from app.utils.media_probe import get_media_duration
+
+
+def make_long_audio(source, minutes, output):
+    duration = get_media_duration(source)
+    copies = max(1, int(minutes * 60 // duration))
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-stream_loop", str(copies - 1), "-i", source,
+        "-ac", "1", "-ar", "16000", output,
+    ], check=True)
+    return output
+
+
+def words_of(result):
+    return [w["text"] for segment in result["segments"] for w in segment["words"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", required=True, help="Speech sample to repeat")
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--chunk-seconds", type=str, default="60,120,300")
+    parser.add_argument("--workers", type=str, default=",".join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1)))
+    parser.add_argument("--model-size", type=str, default=None)
+    args = parser.parse_args()
+
+    model = model_key(args.model_size)
+    with tempfile.TemporaryDirectory(prefix="bench_transcribe_") as workdir:
+        audio = make_long_audio(args.audio, args.minutes, os.path.join(workdir, "long.wav"))
+        duration = get_media_duration(audio)
+        print(f"Audio: {duration / 60:.1f} min, model {model}, {os.cpu_count()} CPUs")
+
+        from whisper_timestamped import transcribe_timestamped
+        started = time.perf_counter()
+        baseline = transcribe_timestamped(get_whisper_model(*model), audio, verbose=False, fp16=False)
+        baseline_time = time.perf_counter() - started
+        baseline_words = words_of(baseline)
+        print(f"{'chunk s':>8} {'workers':>8} {'chunks':>7} {'wall s':>8} {'speed-up':>9} {'word diff':>10}")
+        print(f"{'-':>8} {1:>8} {1:>7} {baseline_time:>8.1f} {1.0:>9.2f} {0:>10}")
+
+        for chunk_seconds in [float(c) for c in args.chunk_seconds.split(",")]:
+            for workers in [int(w) for w in args.workers.split(",")]:
+                started = time.perf_counter()
+                result = transcribe_chunked(
+                    audio, duration, model, options=dict(verbose=False, fp16=False),
+                    chunk_seconds=chunk_seconds, workers=workers,
+                )
+                elapsed = time.perf_counter() - started
+                matcher = difflib.SequenceMatcher(a=baseline_words, b=words_of(result), autojunk=False)
+                changed = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+                n_chunks = max(1, int(round(duration / chunk_seconds)))
+                print(f"{chunk_seconds:>8.0f} {workers:>8} {n_chunks:>7} {elapsed:>8.1f} {baseline_time / elapsed:>9.2f} {changed:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Accuracy vs latency of the Whisper CPU inference modes.
+
+Usage: python -m benchmarks.bench_whisper_quantization --corpus clips/ [--model-size base]
+       [--dtypes fp32,int8] [--threads 2,4,8]
+
+Transcribes every audio file in --corpus (sorted, so the corpus is fixed) with each
+(dtype, threads) combination on CPU. A clip's reference is the .txt file next to it
+when there is one, otherwise the fp32 transcript. Reports model load time, weight
+size, total transcription time, real-time factor and word error rate against the
+references.
+"""
+
+import argparse
+import os
+import re
+import time
+
+from app.core import whisper_models
+from app.utils.media_probe import get_media_duration
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg")
+
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance over the reference length."""
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(reference)
+
+
+def transcribe_corpus(clips, model):
+    from whisper_timestamped import transcribe_timestamped
+
+    texts = []
+    started = time.perf_counter()
+    for clip in clips:
+        result = transcribe_timestamped(model, clip, language="en", verbose=False, fp16=False)
+        texts.append(result["text"])
+    return texts, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True, help="Directory of audio clips, optionally with .txt references")
+    parser.add_argument("--model-size", type=str, default=None)
+    parser.add_argument("--dtypes", type=str, default="fp32,int8")
+    parser.add_argument("--threads", type=str, default=str(os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    import torch
+
+    clips = sorted(
+        os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+        if name.lower().endswith(AUDIO_EXTENSIONS)
+    )
+    if not clips:
+        parser.error(f"No audio files in {args.corpus}")
+    audio_seconds = sum(get_media_duration(clip) or 0 for clip in clips)
+    references = {}
+    for clip in clips:
+        txt = os.path.splitext(clip)[0] + ".txt"
+        if os.path.exists(txt):
+            with open(txt, "r", encoding="utf-8") as f:
+                references[clip] = normalize_words(f.read())
+    size = args.model_size or whisper_models.WHISPER_MODEL_SIZE
+    print(f"Corpus: {len(clips)} clips, {audio_seconds:.0f}s of audio, {len(references)} with references, model {size}")
+
+    dtypes = args.dtypes.split(",")
+    if "fp32" in dtypes:
+        # fp32 first: its transcripts stand in for missing references
+        dtypes.remove("fp32")
+        dtypes.insert(0, "fp32")
+    print(f"{'dtype':>6} {'threads':>8} {'load s':>7} {'weights MB':>11} {'total s':>8} {'RTF':>6} {'WER %':>6}")
+    for dtype in dtypes:
+        key = (size, "cpu", dtype)
+        model = whisper_models.get_whisper_model(*key)
+        stats = whisper_models.whisper_model_stats()[key]
+        # Warm-up so one-off allocations and kernel selection are not timed
+        transcribe_corpus(clips[:1], model)
+        for threads in [int(t) for t in args.threads.split(",")]:
+            torch.set_num_threads(threads)
+            texts, elapsed = transcribe_corpus(clips, model)
+            if dtype == "fp32":
+                for clip, text in zip(clips, texts):
+                    references.setdefault(clip, normalize_words(text))
+            scored = [(references[clip], normalize_words(text)) for clip, text in zip(clips, texts) if clip in references]
+            total_words = sum(len(ref) for ref, _ in scored) or 1
+            wer = sum(word_error_rate(ref, hyp) * len(ref) for ref, hyp in scored) / total_words if scored else float("nan")
+            print(f"{dtype:>6} {threads:>8} {stats['load_seconds']:>7.1f} {stats['weights_mb']:>11.1f} "
+                  f"{elapsed:>8.1f} {elapsed / audio_seconds:>6.2f} {wer * 100:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime
 
+from app.utils.job_workspace import JobWorkspace
+from app.worker import submit_job
+
 st.set_page_config(
     page_title="Text-To-Video AI", 
     page_icon="🎬", 
@@ -21,6 +24,12 @@ st.set_page_config(
 load_dotenv()
 LOG4UI = os.getenv("log4UI", "true").lower() == "true"
 
+# Uploads of this browser session live in their own workspace (purged after JOB_MAX_AGE_HOURS),
+# so concurrent sessions never overwrite each other's files
+if "upload_workspace" not in st.session_state:
+    st.session_state["upload_workspace"] = JobWorkspace(cleanup="never")
+upload_workspace = st.session_state["upload_workspace"]
+
 # Move API keys to sidebar
 with st.sidebar:
     st.header("API Settings")
@@ -88,7 +97,7 @@ uploaded_bg_video = st.file_uploader(
 bg_video_path = None
 if uploaded_bg_video is not None:
     try:
-        bg_video_path = os.path.join(os.getcwd(), "background_uploaded.mp4")
+        bg_video_path = upload_workspace.path("background_uploaded.mp4")
         # Remove if a directory exists at this path
         if os.path.isdir(bg_video_path):
             import shutil
@@ -133,7 +142,7 @@ uploaded_soundtrack = st.file_uploader(
 soundtrack_path = None
 if uploaded_soundtrack is not None:
     try:
-        soundtrack_path = os.path.join(os.getcwd(), "audio_soundtrack_uploaded.wav")
+        soundtrack_path = upload_workspace.path("audio_soundtrack_uploaded.wav")
         # Defensive: If a directory exists at this path, remove it
         if os.path.isdir(soundtrack_path):
             import shutil
@@ -448,7 +457,7 @@ if st.button("Generate Video"):
         st.stop()
     else:
         st.session_state["theme_validation_msg"] = ""
-    
+
     # Validate title
     if not st.session_state["video_title_input"].strip():
         st.session_state["validation_msg"] = "Title is required."
@@ -528,13 +537,9 @@ if st.button("Generate Video"):
             st.experimental_rerun()
         else:
             st.session_state["validation_msg"] = ""
-            # Save uploaded audio to disk
-            audio_save_path = "audio_uploaded.wav"
-            with open(audio_save_path, "wb") as f:
-                f.write(uploaded_audio.read())
+            # --audio-file is added once the job directory exists
             input_args = [
                 "python", "app.py",
-                "--audio-file", audio_save_path,
                 "--theme", st.session_state.get("theme_input", "Add video theme"),
                 "--aspect-ratio", st.session_state["aspect_ratio"],
                 "--title", st.session_state["video_title_input"],
@@ -572,6 +577,17 @@ if st.button("Generate Video"):
         download_log_placeholder.empty()
 
     if not st.session_state["validation_msg"]:
+        # Every run renders in its own job directory (TTS audio, intermediates, output video);
+        # created only now so runs stopped by validation leave nothing behind
+        job = JobWorkspace()
+        output_path = Path(job.path("rendered_video.mp4"))
+        if selected_tab == "Upload Audio":
+            # Save uploaded audio to disk
+            audio_save_path = job.path("audio_uploaded.wav")
+            with open(audio_save_path, "wb") as f:
+                f.write(uploaded_audio.read())
+            input_args[2:2] = ["--audio-file", audio_save_path]
+        input_args += ["--job-dir", job.dir, "--output-file", str(output_path)]
         os.environ["VOICE_PROVIDER"] = voice_provider
         os.environ["VOICE_ID"] = voice_id
         os.environ["SPEECH_RATE"] = str(speech_rate)
@@ -584,15 +600,23 @@ if st.button("Generate Video"):
 
         with st.spinner("Generating your video... This might take a while."):
             try:
-                process = subprocess.Popen(
-                    input_args,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True,
-                    env=sub_proc  # <-- renamed from env to sub_proc
-                )
+                # Warm worker (JOB_WORKER=true) skips interpreter start-up and model loading;
+                # fall back to a fresh app.py process if it is disabled or not running
+                process = submit_job(input_args[2:], env={
+                    "VOICE_PROVIDER": voice_provider,
+                    "VOICE_ID": voice_id,
+                    "SPEECH_RATE": str(speech_rate),
+                })
+                if process is None:
+                    process = subprocess.Popen(
+                        input_args,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        text=True,
+                        bufsize=1,
+                        universal_newlines=True,
+                        env=sub_proc  # <-- renamed from env to sub_proc
+                    )
                 progress = 0
                 while True:
                     line = process.stdout.readline()
@@ -670,21 +694,22 @@ if st.button("Generate Video"):
                         log_placeholder.markdown(log_html, unsafe_allow_html=True)  # <-- always update this one placeholder
                 # --- Final status and video output ---
                 if process.returncode == 0:
-                    output_file = Path("rendered_video.mp4")
+                    output_file = output_path
                     if output_file.exists():
                         st.success("Video generated successfully!")
-                        video_placeholder.video(str(output_file))
+                        # Held in memory so the job directory can be cleaned up right away
+                        video_bytes = output_file.read_bytes()
+                        video_placeholder.video(video_bytes)
                         # --- Use sanitized, incremented filename for download only ---
                         user_title = st.session_state["video_title_input"]
                         safe_title = sanitize_title_for_filename(user_title)
                         download_name = get_incremented_download_name(safe_title)
-                        with open(output_file, "rb") as file:
-                            st.download_button(
-                                label="Download Video",
-                                data=file,
-                                file_name=download_name,
-                                mime="video/mp4"
-                            )
+                        st.download_button(
+                            label="Download Video",
+                            data=video_bytes,
+                            file_name=download_name,
+                            mime="video/mp4"
+                        )
                         if LOG4UI:
                             status_placeholder.success("Video generation complete!")
                             progress_placeholder.progress(1.0)
@@ -732,5 +757,7 @@ if st.button("Generate Video"):
                             file_name=log_path.name,
                             mime="application/json"
                         )
+            finally:
+                job.cleanup(success=output_path.exists())
 
 
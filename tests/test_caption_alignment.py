@@ -0,0 +1,28 @@
+from app.core.caption_alignment import align_known_text, align_words_to_speech
+
+
+def test_words_fill_speech_spans_and_skip_pauses():
+    words = ["Hello", "world.", "Next", "one."]
+    aligned = align_words_to_speech(words, [(0.5, 2.5), (3.5, 5.5)])
+    assert [w["text"] for w in aligned] == words
+    assert aligned[0]["start"] == 0.5
+    assert aligned[-1]["end"] == 5.5
+    for prev, cur in zip(aligned, aligned[1:]):
+        assert prev["end"] <= cur["start"] + 1e-9
+    # Nothing is placed inside the pause between the spans
+    assert all(not (2.5 < w["start"] < 3.5) for w in aligned)
+
+
+def test_aligned_result_has_transcription_shape():
+    result = align_known_text("unused.wav", "One two three.", spans=[(0.0, 1.5)])
+    assert result["text"] == "One two three."
+    assert [w["text"] for w in result["segments"][0]["words"]] == ["One", "two", "three."]
+
+
+def test_sentences_are_aligned_within_their_offsets():
+    sentences = [{"text": "One two.", "start": 0.0, "end": 1.0}, {"text": "Three.", "start": 1.0, "end": 3.0}]
+    result = align_known_text("unused.wav", "One two. Three.", spans=[(0.2, 2.0)], sentences=sentences)
+    words = result["segments"][0]["words"]
+    assert [w["text"] for w in words] == ["One", "two.", "Three."]
+    assert (words[0]["start"], words[1]["end"]) == (0.2, 1.0)
+    assert (words[2]["start"], words[2]["end"]) == (1.0, 2.0)
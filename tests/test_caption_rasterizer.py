@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from app.core import caption_rasterizer
+from app.core.caption_rasterizer import caption_cache_key, get_caption_array, load_font, render_caption_image, wrap_caption_lines
+from app.utils.media_store import MediaStore
+
+FONT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "fonts", "LuckiestGuy-Regular.ttf")
+# text, font, fontsize, fontcolor, stroke_color, stroke_width, max_width
+CAPTION = ("Hello world", FONT, 40, "yellow", "black", 2, 600)
+TEXT = "the quick brown fox jumps over the lazy dog while the narrator keeps on talking"
+
+
+@pytest.fixture
+def caption_store(tmp_path, monkeypatch):
+    store = MediaStore(root=str(tmp_path), max_bytes=64 * 1024 * 1024)
+    monkeypatch.setattr(caption_rasterizer, "_caption_store", store)
+    get_caption_array.cache_clear()
+    yield store
+    get_caption_array.cache_clear()
+
+
+@pytest.mark.parametrize("index, value", [
+    (0, "Hello there"),
+    (1, "DejaVuSans-Bold"),
+    (2, 41),
+    (3, "white"),
+    (4, "blue"),
+    (5, 3),
+    (6, 601),
+])
+def test_cache_key_covers_every_style_field(index, value):
+    changed = CAPTION[:index] + (value,) + CAPTION[index + 1:]
+    assert caption_cache_key(*changed) != caption_cache_key(*CAPTION)
+    assert caption_cache_key(*CAPTION) == caption_cache_key(*CAPTION)
+
+
+def test_disk_hit_returns_the_same_bitmap(caption_store, monkeypatch):
+    first = get_caption_array(*CAPTION)
+    assert first.dtype == np.uint8 and first.shape[1:] == (600, 4)
+    assert not first.flags.writeable
+    assert first[..., 3].any()
+    # A fresh process: nothing in memory, the PNG on disk is decoded instead of rasterized
+    get_caption_array.cache_clear()
+    monkeypatch.setattr(caption_rasterizer, "render_caption_image", lambda *args: pytest.fail("rasterized on a disk hit"))
+    second = get_caption_array(*CAPTION)
+    assert second is not first
+    assert np.array_equal(second, first)
+    assert caption_store.stats()["hits"] == 1
+    # Memory hit: the very same array
+    assert get_caption_array(*CAPTION) is second
+
+
+@pytest.mark.parametrize("max_width", [200, 400, 900])
+def test_wrapped_lines_fit_text_max_width(max_width):
+    font = load_font(FONT, 40)
+    lines = wrap_caption_lines(TEXT, FONT, 40, max_width)
+    assert " ".join(lines).split() == TEXT.split()
+    for line in lines:
+        assert font.getlength(line) <= max_width
+    # Greedy: the next line's first word would not have fit
+    for line, following in zip(lines, lines[1:]):
+        assert font.getlength(f"{line} {following.split()[0]}") > max_width
+    image = render_caption_image(TEXT, FONT, 40, "yellow", "black", 2, max_width)
+    assert image.mode == "RGBA" and image.width == max_width
+    ascent, descent = font.getmetrics()
+    assert image.height == (ascent + descent + 4) * len(lines)
+
+
+def test_word_wider_than_max_width_gets_its_own_line():
+    assert wrap_caption_lines("a supercalifragilistic b", FONT, 40, 120) == ["a", "supercalifragilistic", "b"]
@@ -0,0 +1,137 @@
+"""
+Golden tests for the caption timing engine: build_captions must match the original
+linear-scan getCaptionsWithTime (kept below as the reference) exactly.
+"""
+
+import random
+import re
+
+from app.core.caption_timing import CaptionTimingIndex, build_captions, cleanWord
+
+
+# Reference: the original linear-scan helpers and getCaptionsWithTime (verbatim, minus logging)
+def getTimestampMapping(whisper_analysis):
+    index = 0
+    locationToTimestamp = {}
+    for segment in whisper_analysis['segments']:
+        for word in segment['words']:
+            newIndex = index + len(word['text']) + 1
+            locationToTimestamp[(index, newIndex)] = word['end']
+            index = newIndex
+    return locationToTimestamp
+
+
+def interpolateTimeFromDict(word_position, d):
+    for key, value in d.items():
+        if key[0] <= word_position <= key[1]:
+            return value
+    return None
+
+
+def legacy_captions_with_time(
+    whisper_analysis,
+    maxCaptionSize=30,
+    preserve_punctuation=True,
+    split_on_sentences=False  # Not needed for this logic
+):
+    wordLocationToTime = getTimestampMapping(whisper_analysis)
+    position = 0
+    start_time = 0
+    CaptionsPairs = []
+    text = whisper_analysis['text']
+
+    # Find sentence boundaries (start indices in the text)
+    sentence_endings = [m.end() for m in re.finditer(r'[.!?]', text)]
+    sentence_starts = [0] + [i+1 for i in sentence_endings if i+1 < len(text)]
+    sentence_starts_set = set(sentence_starts)
+
+    words = text.split()
+    idx_in_text = 0
+    chunk_words = []
+    chunk_start_in_text = 0
+
+    for i, word in enumerate(words):
+        # Find the index of this word in the original text
+        idx_in_text = text.find(word, idx_in_text)
+        # If this word is the start of a sentence (except for the first word), and we already have words in chunk, flush the chunk
+        if i > 0 and idx_in_text in sentence_starts_set and chunk_words:
+            # End the current caption at the previous word (end of previous sentence)
+            caption = " ".join(chunk_words) if preserve_punctuation else cleanWord(" ".join(chunk_words))
+            position += len(caption) + 1
+            end_time = interpolateTimeFromDict(position, wordLocationToTime)
+            if end_time:
+                CaptionsPairs.append(((start_time, end_time), caption))
+                start_time = end_time
+            chunk_words = []
+            chunk_start_in_text = idx_in_text
+        chunk_words.append(word)
+        # If adding the next word would exceed maxCaptionSize, flush the chunk
+        if (i + 1 < len(words)):
+            next_word = words[i+1]
+            # Check if next word is the start of a sentence
+            next_idx_in_text = text.find(next_word, idx_in_text + len(word))
+            if len(" ".join(chunk_words + [next_word])) > maxCaptionSize or (next_idx_in_text in sentence_starts_set and chunk_words):
+                caption = " ".join(chunk_words) if preserve_punctuation else cleanWord(" ".join(chunk_words))
+                position += len(caption) + 1
+                end_time = interpolateTimeFromDict(position, wordLocationToTime)
+                if end_time:
+                    CaptionsPairs.append(((start_time, end_time), caption))
+                    start_time = end_time
+                chunk_words = []
+                chunk_start_in_text = next_idx_in_text
+    # Add any remaining words as the last caption
+    if chunk_words:
+        caption = " ".join(chunk_words) if preserve_punctuation else cleanWord(" ".join(chunk_words))
+        position += len(caption) + 1
+        end_time = interpolateTimeFromDict(position, wordLocationToTime)
+        if end_time:
+            CaptionsPairs.append(((start_time, end_time), caption))
+            start_time = end_time
+
+    return CaptionsPairs
+
+
+def _transcript(words, seed=0, zero_first=False):
+    rng = random.Random(seed)
+    t = 0.0
+    entries = []
+    for n, word in enumerate(words):
+        t += rng.uniform(0.05, 0.6)
+        entries.append({"text": word, "start": t - 0.05, "end": 0.0 if (zero_first and n == 0) else round(t, 3)})
+    # Split into a few segments like Whisper does
+    segments = [{"words": entries[i:i + 7]} for i in range(0, len(entries), 7)]
+    return {"text": " " + " ".join(words), "segments": segments}
+
+
+def _random_words(n, seed):
+    rng = random.Random(seed)
+    vocab = ["a", "an", "the", "cat", "sat", "on", "mat", "Hello", "world", "it's", "don't", "co-op", "42",
+             "end.", "Why?", "Stop!", "so...", "U.S.", "\"quoted\"", "e.g.", "aa", "aaa", "caf\u00e9", "x"]
+    return [rng.choice(vocab) for _ in range(n)]
+
+
+def test_golden_simple_sentences():
+    analysis = _transcript("Hello world. This is a test of the caption engine! Does it work?".split())
+    assert build_captions(analysis, maxCaptionSize=15) == legacy_captions_with_time(analysis, maxCaptionSize=15)
+    assert [text for _, text in build_captions(analysis, maxCaptionSize=15)] == [
+        "Hello world.", "This is a test", "of the caption", "engine!", "Does it work?",
+    ]
+
+
+def test_matches_reference_on_random_transcripts():
+    for seed in range(40):
+        words = _random_words(random.Random(seed).randint(1, 120), seed)
+        analysis = _transcript(words, seed, zero_first=seed % 5 == 0)
+        for size in (5, 12, 25, 30):
+            for punctuation in (True, False):
+                expected = legacy_captions_with_time(analysis, maxCaptionSize=size, preserve_punctuation=punctuation)
+                assert build_captions(analysis, maxCaptionSize=size, preserve_punctuation=punctuation) == expected
+
+
+def test_index_matches_linear_lookup_on_boundaries():
+    analysis = _transcript(_random_words(50, 7), 7)
+    mapping = getTimestampMapping(analysis)
+    index = CaptionTimingIndex(analysis)
+    last = max(end for _, end in mapping)
+    for position in range(0, last + 3):
+        assert index.time_at(position) == interpolateTimeFromDict(position, mapping)
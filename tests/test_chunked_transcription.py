@@ -0,0 +1,28 @@
+from app.core.chunked_transcription import merge_chunk_results, plan_chunks
+
+
+def test_chunks_cut_in_silence_gaps():
+    spans = [(0, 55), (57, 118), (121, 190), (192, 260)]
+    chunks = plan_chunks(260, spans, chunk_seconds=120)
+    assert chunks[0] == (0.0, 119.5)
+    assert chunks[-1][1] == 260
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_overlapping_words_are_kept_once_with_global_times():
+    first = {"segments": [{"words": [
+        {"text": "one", "start": 0.0, "end": 0.5},
+        {"text": "two", "start": 9.6, "end": 10.2},
+        {"text": "three", "start": 10.4, "end": 10.9},
+    ]}]}
+    # Second window starts 1s before its cut at 10.0
+    second = {"segments": [{"words": [
+        {"text": "two", "start": 0.6, "end": 1.2},
+        {"text": "three", "start": 1.4, "end": 1.9},
+        {"text": "four", "start": 3.0, "end": 3.5},
+    ]}]}
+    merged = merge_chunk_results([((0.0, 10.0), 0.0, first), ((10.0, 20.0), 9.0, second)])
+    words = [w for segment in merged["segments"] for w in segment["words"]]
+    assert [w["text"] for w in words] == ["one", "two", "three", "four"]
+    assert words[-1]["start"] == 12.0
+    assert merged["text"] == "one two three four"
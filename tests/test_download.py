@@ -0,0 +1,74 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.utils import download
+from app.utils.download import IncompleteDownloadError, fetch_remote_file
+
+BODY = bytes(range(256)) * 40
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Set per test: "resume", "bad_total" or "ignore_range"
+    mode = "resume"
+    ranges = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        type(self).ranges.append(range_header)
+        if range_header is None:
+            # First attempt: announce the whole body, send half of it and hang up
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY[:len(BODY) // 2])
+            self.close_connection = True
+            return
+        if self.mode == "ignore_range":
+            self._send(200, BODY)
+            return
+        start = int(range_header.split("=")[1].rstrip("-"))
+        rest = BODY[start:] + (b"extra" if self.mode == "bad_total" else b"")
+        self._send(206, rest, {"Content-Range": f"bytes {start}-{len(BODY) - 1}/{len(BODY)}"})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    monkeypatch.setattr(download.time, "sleep", lambda seconds: None)
+    _StubHandler.ranges = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch(server, mode, tmp_path, max_retries=1):
+    _StubHandler.mode = mode
+    target = tmp_path / "media.mp4"
+    fetch_remote_file(f"http://127.0.0.1:{server.server_port}/media.mp4", str(target), chunk_size=1024, max_retries=max_retries)
+    return target
+
+
+@pytest.mark.parametrize("mode", ["resume", "ignore_range"])
+def test_truncated_download_is_completed(stub_server, tmp_path, mode):
+    target = _fetch(stub_server, mode, tmp_path)
+    assert target.read_bytes() == BODY
+    assert _StubHandler.ranges == [None, f"bytes={len(BODY) // 2}-"]
+
+
+def test_size_mismatch_is_rejected(stub_server, tmp_path):
+    with pytest.raises(IncompleteDownloadError):
+        _fetch(stub_server, "bad_total", tmp_path)
@@ -0,0 +1,142 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from app.core import ffmpeg_render
+from app.core.ffmpeg_render import build_audio_graph, build_ffmpeg_command, plan_background_segments
+
+INF = float("inf")
+STYLE = {
+    "font": "DejaVuSans-Bold", "fontsize": 50, "fontcolor": "yellow", "stroke_color": "black",
+    "stroke_width": 2, "text_max_width": 1600, "vertical_align": "bottom", "margin": 80,
+}
+AUDIO_FORMAT = "aformat=sample_rates=44100:channel_layouts=stereo"
+
+
+@pytest.mark.parametrize("segments, final_duration, expected", [
+    # Gaps (leading, inner and trailing) become black
+    ([(1, 2, "a", "video")], 4, [(0, 1, None, "color"), (1, 2, "a", "video"), (2, 4, None, "color")]),
+    ([], 3, [(0, 3, None, "color")]),
+    # Overlaps are clipped to where the previous segment ended, in start order
+    ([(2, 5, "b", "video"), (0, 3, "a", "video")], 5, [(0, 3, "a", "video"), (3, 5, "b", "video")]),
+    # Nothing past final_duration
+    ([(0, 3, "a", "video"), (3, 10, "b", "video"), (6, 8, "c", "video")], 5, [(0, 3, "a", "video"), (3, 5, "b", "video")]),
+    ([(0, INF, "upload.mp4", "loop")], 4, [(0, 4, "upload.mp4", "loop")]),
+    # Segments swallowed by an earlier one are dropped; sub-millisecond gaps are not filled
+    ([(0, 4, "a", "video"), (1, 3, "b", "video"), (4.0005, 6, "c", "image")], 6,
+     [(0, 4, "a", "video"), (4.0005, 6, "c", "image")]),
+])
+def test_plan_background_segments(segments, final_duration, expected):
+    assert plan_background_segments(segments, final_duration) == expected
+
+
+def _filters(cmd):
+    return cmd[cmd.index("-filter_complex") + 1].split(";")
+
+
+def test_inputs_per_segment_kind_and_black_filler():
+    segments = [(0, 2, "photo.jpg", "image"), (2, 4, "bg.mp4", "loop"), (5, 7, "clip.mp4", "video")]
+    cmd = build_ffmpeg_command("out.mp4", segments, [], STYLE, 1920, 1080, 7)
+    assert cmd[:cmd.index("-filter_complex")] == [
+        "ffmpeg", "-y", "-hide_banner",
+        "-loop", "1", "-framerate", "25", "-t", "2.000", "-i", "photo.jpg",
+        "-stream_loop", "-1", "-i", "bg.mp4",
+        "-i", "clip.mp4",
+    ]
+    filters = _filters(cmd)
+    assert [f.split("]", 1)[0] + "]" for f in filters[:2] + filters[3:4]] == ["[0:v]", "[1:v]", "[2:v]"]
+    assert filters[2] == "color=c=black:s=1920x1080:r=25:d=1.000,setsar=1[v2]"
+    assert filters[0].endswith("tpad=stop_mode=clone:stop_duration=2.000,trim=duration=2.000,setpts=PTS-STARTPTS[v0]")
+    assert filters[4] == "[v0][v1][v2][v3]concat=n=4:v=1:a=0[bg]"
+    # No captions and no audio: the background goes straight out, silent
+    assert cmd[cmd.index("-map") + 1] == "[bg]"
+    assert "-an" in cmd
+    assert cmd[-3:] == ["-t", "7.000", "out.mp4"]
+
+
+@pytest.mark.parametrize("vertical_align, top", [("bottom", "1080-{}-80"), ("center", "(1080-{})/2")])
+def test_caption_drawtext_windows_and_textfiles(tmp_path, monkeypatch, vertical_align, top):
+    # One line per "|" so the layout does not depend on font metrics
+    monkeypatch.setattr(ffmpeg_render, "wrap_caption_lines", lambda text, font, fontsize, max_width: text.split("|"))
+    caption_dir = tmp_path / "it's captions"
+    caption_dir.mkdir()
+    captions = [((0, 1.5), "Hello|world"), ((1.5, 3.25), "50%: it's {done}, ok")]
+    cmd = build_ffmpeg_command(
+        "out.mp4", [(0, 4, "clip.mp4", "video")], captions, dict(STYLE, vertical_align=vertical_align),
+        1920, 1080, 4, caption_text_dir=str(caption_dir),
+    )
+    drawtexts = [f for f in _filters(cmd) if f.startswith("[bg]drawtext")][0]
+    assert drawtexts.endswith("[vout]")
+    assert drawtexts.count("drawtext=") == 3
+    escaped_dir = str(caption_dir).replace("'", "'\\''")
+    # Line height is 1.2 x fontsize; the block of lines sits on the margin or the middle
+    for c, n, block, y, window in [(0, 0, 120, 0, "0.000,1.500"), (0, 1, 120, 60, "0.000,1.500"),
+                                   (1, 0, 60, 0, "1.500,3.250")]:
+        assert f"textfile='{escaped_dir}/caption_{c}_{n}.txt'" in drawtexts
+        assert f"y={top.format(block)}+{y}:enable='between(t,{window})'" in drawtexts
+    # Caption text is only ever in the files, verbatim
+    assert (caption_dir / "caption_1_0.txt").read_text(encoding="utf-8") == "50%: it's {done}, ok"
+    assert "50%" not in drawtexts
+    assert "font='DejaVuSans-Bold'" in drawtexts
+    assert cmd[cmd.index("-map") + 1] == "[vout]"
+
+
+def test_extra_video_filters_follow_captions():
+    cmd = build_ffmpeg_command("out.mp4", [], [], STYLE, 640, 360, 2, video_filters=["ass='subs.ass'"])
+    assert _filters(cmd)[-1] == "[bg]ass='subs.ass'[vsub]"
+    assert cmd[cmd.index("-map") + 1] == "[vsub]"
+
+
+@pytest.mark.parametrize("narration, disable_audio, soundtrack, expected", [
+    ("narration.wav", False, None, (
+        ["-i", "narration.wav"],
+        [f"[1:a]{AUDIO_FORMAT},apad=whole_dur=5.000[narr]"],
+        "narr",
+    )),
+    ("narration.wav", True, None, ([], [], None)),
+    (None, False, None, ([], [], None)),
+    # A missing soundtrack file is skipped
+    ("narration.wav", False, "missing.mp3", (
+        ["-i", "narration.wav"],
+        [f"[1:a]{AUDIO_FORMAT},apad=whole_dur=5.000[narr]"],
+        "narr",
+    )),
+    ("narration.wav", False, "SOUNDTRACK", (
+        ["-i", "narration.wav", "-stream_loop", "-1", "-i", "SOUNDTRACK"],
+        [
+            f"[1:a]{AUDIO_FORMAT},apad=whole_dur=5.000[narr]",
+            f"[2:a]{AUDIO_FORMAT},volume=0.1,atrim=duration=5.000[st]",
+            "[narr][st]amix=inputs=2:duration=first:dropout_transition=2[aout]",
+        ],
+        "aout",
+    )),
+    # Narration disabled: the soundtrack is mixed over silence
+    ("narration.wav", True, "SOUNDTRACK", (
+        ["-stream_loop", "-1", "-i", "SOUNDTRACK"],
+        [
+            "anullsrc=r=44100:cl=stereo,atrim=duration=5.000[narr]",
+            f"[1:a]{AUDIO_FORMAT},volume=0.1,atrim=duration=5.000[st]",
+            "[narr][st]amix=inputs=2:duration=first:dropout_transition=2[aout]",
+        ],
+        "aout",
+    )),
+])
+def test_audio_graph(tmp_path, narration, disable_audio, soundtrack, expected):
+    if soundtrack == "SOUNDTRACK":
+        soundtrack = str(tmp_path / "soundtrack.mp3")
+        open(soundtrack, "wb").close()
+        expected = tuple(
+            [soundtrack if a == "SOUNDTRACK" else a for a in part] if isinstance(part, list) else part
+            for part in expected
+        )
+    assert build_audio_graph(1, 5, narration, disable_audio, soundtrack) == expected
+
+
+def test_audio_is_mapped_when_present():
+    cmd = build_ffmpeg_command("out.mp4", [], [], STYLE, 640, 360, 2, audio_file_path="narration.wav")
+    assert cmd[cmd.index("-i") + 1] == "narration.wav"
+    assert "[0:a]" in cmd[cmd.index("-filter_complex") + 1]
+    maps = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-map"]
+    assert maps == ["[bg]", "[narr]"]
+    assert "-an" not in cmd
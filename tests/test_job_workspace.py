@@ -0,0 +1,35 @@
+import os
+
+from app.utils.job_workspace import JobWorkspace, ffmpeg_env, ffreport_environ, ffreport_path, purge_stale_jobs
+
+
+def test_jobs_get_separate_dirs_and_failed_jobs_are_kept(tmp_path):
+    with JobWorkspace(root=str(tmp_path), cleanup="on_success") as ok:
+        other = JobWorkspace(root=str(tmp_path), cleanup="on_success")
+        assert ok.dir != other.dir
+        open(ok.path("rendered_video.mp4"), "wb").close()
+    assert not os.path.exists(ok.dir)
+    other.cleanup(success=False)
+    assert os.path.isdir(other.dir)
+
+
+def test_stale_jobs_are_purged(tmp_path):
+    job = JobWorkspace(root=str(tmp_path), cleanup="never")
+    os.utime(job.dir, (0, 0))
+    assert purge_stale_jobs(str(tmp_path), max_age_hours=1) == 1
+    assert not os.path.exists(job.dir)
+
+
+def test_ffreport_path():
+    assert ffreport_path("file=/jobs/a/ffmpeg_report.log:level=32") == "/jobs/a/ffmpeg_report.log"
+    assert ffreport_path("") is None
+
+
+def test_job_ffreport_does_not_leak_into_the_process_environment(monkeypatch):
+    monkeypatch.setenv("FFREPORT", "level=32")
+    value = "file=/jobs/a/ffmpeg_report.log:level=32"
+    assert ffmpeg_env(value)["FFREPORT"] == value
+    assert ffmpeg_env(None) is None
+    with ffreport_environ(value):
+        assert os.environ["FFREPORT"] == value
+    assert os.environ["FFREPORT"] == "level=32"
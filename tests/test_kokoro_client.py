@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+pytest.importorskip("loguru")
+
+from app.services.kokoro_service import KokoroServiceClient
+
+AUDIO = b"RIFF" + b"\x00" * 64
+
+
+async def start_stub(failures):
+    """Kokoro stand-in that answers 503 to the first `failures` requests and WAV bytes after that."""
+    calls = []
+
+    async def speech(request):
+        calls.append(await request.json())
+        if len(calls) <= failures:
+            return web.Response(status=503, text="busy")
+        return web.Response(body=AUDIO, content_type="audio/wav")
+
+    async def linked(request):
+        calls.append(await request.json())
+        return web.json_response({"download_link": f"http://{request.host}/download"})
+
+    async def download(request):
+        response = web.StreamResponse(headers={"Content-Type": "audio/wav"})
+        await response.prepare(request)
+        for _ in range(4):
+            await response.write(AUDIO)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/audio/speech", speech)
+    app.router.add_post("/linked/v1/audio/speech", linked)
+    app.router.add_get("/download", download)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", calls
+
+
+def test_retries_and_reuses_connections():
+    async def scenario():
+        runner, url, calls = await start_stub(failures=1)
+        client = KokoroServiceClient(base_url=url, retries=2, backoff=0.01)
+        try:
+            assert await client.create_speech("Hello.") == AUDIO
+            assert await client.create_speech("Again.") == AUDIO
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return client.metrics(), calls
+
+    metrics, calls = asyncio.run(scenario())
+    assert len(calls) == 3
+    assert metrics["retries"] == 1
+    assert metrics["failures"] == 0
+    assert metrics["sessions_opened"] == 1
+    assert metrics["connections_opened"] == 1
+    assert metrics["connections_reused"] == 2
+
+
+def test_gives_up_after_retries():
+    async def scenario():
+        runner, url, calls = await start_stub(failures=10)
+        client = KokoroServiceClient(base_url=url, retries=2, backoff=0.01)
+        try:
+            return await client.create_speech("Hello."), client.metrics(), calls
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    audio, metrics, calls = asyncio.run(scenario())
+    assert audio is None
+    assert len(calls) == 3
+    assert metrics["failures"] == 1
+
+
+def test_save_speech_streams_to_file(tmp_path):
+    async def scenario():
+        runner, url, calls = await start_stub(failures=0)
+        direct = KokoroServiceClient(base_url=url)
+        linked = KokoroServiceClient(base_url=url + "/linked")
+        try:
+            assert await direct.save_speech("Hello.", str(tmp_path / "direct.wav"))
+            assert await linked.save_speech("Hello.", str(tmp_path / "linked.wav"))
+        finally:
+            await direct.close()
+            await linked.close()
+            await runner.cleanup()
+        return direct.metrics(), linked.metrics()
+
+    direct, linked = asyncio.run(scenario())
+    assert (tmp_path / "direct.wav").read_bytes() == AUDIO
+    assert (tmp_path / "linked.wav").read_bytes() == AUDIO * 4
+    assert direct["bytes_streamed"] == len(AUDIO)
+    assert linked["bytes_streamed"] == len(AUDIO) * 4
@@ -0,0 +1,27 @@
+import threading
+
+from app.core.media_prefetch import prefetch_background_media
+
+
+def test_prefetch_collapses_duplicate_urls():
+    calls = []
+    lock = threading.Lock()
+
+    def fake_fetch(url, suffix):
+        with lock:
+            calls.append(url)
+        return f"/cache/{url.rsplit('/', 1)[-1]}{suffix}"
+
+    data = [
+        [[0, 2], "https://example.com/a.mp4"],
+        [[2, 4], "https://example.com/a.mp4"],
+        [[4, 6], None],
+        [[6, 8], "https://example.com/b", True],
+    ]
+    prefetcher = prefetch_background_media(data, fake_fetch, lambda url, is_photo: ".jpg" if is_photo else "")
+    try:
+        assert prefetcher.result("https://example.com/a.mp4") == "/cache/a.mp4"
+        assert prefetcher.result("https://example.com/b") == "/cache/b.jpg"
+        assert sorted(calls) == ["https://example.com/a.mp4", "https://example.com/b"]
+    finally:
+        prefetcher.shutdown()
@@ -0,0 +1,33 @@
+import os
+import wave
+
+from app.utils import media_probe
+from app.utils.media_probe import probe_media, get_media_duration
+
+
+def _write_wav(path, seconds, rate=16000):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\x00\x00" * int(seconds * rate))
+
+
+def test_wav_probe_is_cached_until_file_changes(tmp_path):
+    media_probe.clear_probe_cache()
+    path = tmp_path / "a.wav"
+    _write_wav(path, 1.5)
+    info = probe_media(str(path))
+    assert info["duration"] == 1.5
+    assert info["audio_codec"] == "pcm_s16le"
+    assert info["size"] == os.path.getsize(path)
+    probe_media(str(path))
+    assert media_probe._probe_cached.cache_info().hits == 1
+
+    _write_wav(path, 2.0)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert get_media_duration(str(path)) == 2.0
+
+
+def test_missing_file_has_no_duration(tmp_path):
+    assert get_media_duration(str(tmp_path / "missing.wav")) is None
@@ -0,0 +1,102 @@
+import os
+import subprocess
+
+from app.utils.media_store import MediaStore, media_key
+
+
+def _writer(payload):
+    def download(url, filename):
+        with open(filename, "wb") as f:
+            f.write(payload)
+    return download
+
+
+def _make_file(path, size):
+    path.write_bytes(b"s" * size)
+    return path
+
+
+def test_pexels_video_key_ignores_query_string():
+    a = "https://videos.pexels.com/video-files/123/123-hd_1920_1080_25fps.mp4?token=a"
+    b = "https://videos.pexels.com/video-files/123/123-hd_1920_1080_25fps.mp4?token=b"
+    assert media_key(a) == media_key(b)
+    assert media_key("https://images.pexels.com/photos/1/a.jpeg?w=1") != media_key("https://images.pexels.com/photos/1/a.jpeg?w=2")
+
+
+def test_fetch_hits_after_first_download(tmp_path):
+    store = MediaStore(root=str(tmp_path), max_bytes=1024)
+    first = store.fetch("https://example.com/a.mp4", _writer(b"x" * 10), suffix=".mp4")
+    second = store.fetch("https://example.com/a.mp4", _writer(b"never"), suffix=".mp4")
+    assert first == second
+    with open(first, "rb") as f:
+        assert f.read() == b"x" * 10
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+    assert not [n for _, _, files in os.walk(tmp_path) for n in files if n.endswith(".part")]
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    store = MediaStore(root=str(tmp_path), max_bytes=250)
+    a = store.fetch("https://example.com/a", _writer(b"a" * 100))
+    b = store.fetch("https://example.com/b", _writer(b"b" * 100))
+    os.utime(a, (1, 1))
+    os.utime(b, (2, 2))
+    store.get("https://example.com/a")  # a becomes most recently used
+    c = store.fetch("https://example.com/c", _writer(b"c" * 100))
+    assert os.path.exists(a)
+    assert not os.path.exists(b)
+    assert os.path.exists(c)
+    assert store.stats()["evictions"] == 1
+    assert store.total_bytes() <= 250
+
+
+def test_put_copies_a_produced_file(tmp_path):
+    store = MediaStore(root=str(tmp_path / "store"), max_bytes=1024)
+    source = tmp_path / "sentence.wav"
+    source.write_bytes(b"w" * 10)
+    path = store.put("tts:abc", str(source), suffix=".wav")
+    assert path == store.get("tts:abc", suffix=".wav")
+    with open(path, "rb") as f:
+        assert f.read() == b"w" * 10
+    assert source.exists()
+
+
+def test_leased_files_are_not_evicted_until_released(tmp_path):
+    store = MediaStore(root=str(tmp_path), max_bytes=150)
+    with store.lease() as lease:
+        a = lease.fetch("https://example.com/a", _writer(b"a" * 100))
+        b = store.fetch("https://example.com/b", _writer(b"b" * 100))
+        assert os.path.exists(a)
+        assert store.stats()["pinned"] == 1
+    assert os.path.exists(b)
+    store.fetch("https://example.com/c", _writer(b"c" * 100))
+    assert not os.path.exists(a)
+    assert not os.path.exists(b)
+    assert store.total_bytes() == 100
+
+
+def test_leases_are_honoured_by_other_stores_on_the_directory(tmp_path):
+    # Two stores on one directory stand in for two worker processes
+    ours = MediaStore(root=str(tmp_path), max_bytes=150)
+    theirs = MediaStore(root=str(tmp_path), max_bytes=150)
+    lease = ours.lease()
+    clip = lease.pin("clip", suffix=".mp4")
+    theirs.put("clip", str(_make_file(tmp_path / "src", 100)), suffix=".mp4")
+    theirs.fetch("https://example.com/b", _writer(b"b" * 100))
+    theirs.fetch("https://example.com/c", _writer(b"c" * 100))
+    assert os.path.exists(clip)
+    lease.release()
+    theirs.evict()
+    assert not os.path.exists(clip)
+
+
+def test_leases_of_dead_processes_are_cleared(tmp_path):
+    store = MediaStore(root=str(tmp_path), max_bytes=150)
+    a = store.fetch("https://example.com/a", _writer(b"a" * 100))
+    process = subprocess.Popen(["true"])
+    process.wait()
+    stale = f"{a}.{process.pid}-deadbeef.lease"
+    open(stale, "w").close()
+    store.fetch("https://example.com/b", _writer(b"b" * 100))
+    assert not os.path.exists(a)
+    assert not os.path.exists(stale)
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from app.core.parallel_render import split_timeline
+
+
+def _segments(*edges):
+    return [(t1, t2, f"clip{i}.mp4", "video") for i, (t1, t2) in enumerate(zip(edges[:-1], edges[1:]))]
+
+
+@pytest.mark.parametrize("segments, final_duration, n_chunks, expected", [
+    (_segments(0, 3, 6, 9, 12), 12, 4, [(0, 3), (3, 6), (6, 9), (9, 12)]),
+    (_segments(0, 3, 6, 9, 12), 12, 2, [(0, 6), (6, 12)]),
+    # Never more chunks than segment boundaries allow
+    (_segments(0, 3, 6, 9, 12), 12, 8, [(0, 3), (3, 6), (6, 9), (9, 12)]),
+    # Uneven segments: the cut nearest the even split wins
+    (_segments(0, 1, 2, 7, 10), 10, 2, [(0, 7), (7, 10)]),
+    # A gap becomes black filler, and its edges are boundaries too
+    ([(0, 2, "a.mp4", "video"), (5, 10, "b.mp4", "video")], 10, 2, [(0, 5), (5, 10)]),
+    # Boundaries snap to the 25 fps frame grid
+    (_segments(0, 3.33, 8), 8, 2, [(0, 3.32), (3.32, 8)]),
+    # One looped upload has no boundaries: cut evenly
+    ([(0, float("inf"), "upload.mp4", "loop")], 12, 4, [(0, 3), (3, 6), (6, 9), (9, 12)]),
+    ([(0, 5, "a.mp4", "video")], 5, 1, [(0, 5)]),
+])
+def test_split_timeline(segments, final_duration, n_chunks, expected):
+    chunks = split_timeline(segments, final_duration, n_chunks)
+    assert chunks == [(pytest.approx(a), pytest.approx(b)) for a, b in expected]
+    # Whole duration, in order, no gaps or overlaps
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == final_duration
+    assert all(a[1] == b[0] and a[0] < a[1] for a, b in zip(chunks, chunks[1:]))
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("requests")
+
+from app.services.pexels_service import project_video_search
+from app.utils.pg_cache import normalize_query
+
+
+def test_queries_normalize_to_one_key():
+    assert normalize_query("  Ocean   Waves ") == normalize_query("ocean waves")
+
+
+def test_projection_keeps_only_selection_fields():
+    video = {
+        "id": 1, "url": "https://www.pexels.com/video/1/", "width": 1920, "height": 1080, "duration": 12,
+        "image": "https://images.pexels.com/1.jpg", "avg_color": None,
+        "user": {"id": 7, "name": "Ann", "url": "https://www.pexels.com/@ann"},
+        "video_files": [{"id": 2, "quality": "hd", "file_type": "video/mp4", "width": 1920, "height": 1080,
+                         "fps": 25, "link": "https://videos.pexels.com/2.mp4", "size": 123}],
+        "video_pictures": [{"id": 3, "picture": "https://images.pexels.com/3.jpg", "nr": 0}],
+    }
+    projected = project_video_search({"page": 1, "per_page": 15, "total_results": 1, "videos": [video]})
+    assert projected == {"videos": [{
+        "id": 1, "url": "https://www.pexels.com/video/1/", "width": 1920, "height": 1080, "duration": 12,
+        "user": {"id": 7, "name": "Ann"},
+        "video_files": [{"id": 2, "quality": "hd", "file_type": "video/mp4", "width": 1920, "height": 1080,
+                         "fps": 25, "link": "https://videos.pexels.com/2.mp4"}],
+    }]}
@@ -0,0 +1,35 @@
+from app.core.transcription import to_original_time, remap_transcript
+
+# Speech at 2-4s and 10-11s of the original, joined with a 0.3s gap
+TIMELINE = [(0.0, 2.0, 2.0), (2.3, 10.0, 1.0)]
+
+
+def test_times_map_back_to_their_span():
+    assert to_original_time(0.5, TIMELINE) == 2.5
+    assert to_original_time(2.8, TIMELINE) == 10.5
+    assert to_original_time(5.0, TIMELINE) == 11.0
+
+
+def test_times_in_the_gap_snap_to_a_span_edge():
+    assert to_original_time(2.1, TIMELINE) == 4.0
+    assert to_original_time(2.1, TIMELINE, prefer_next=True) == 10.0
+
+
+def test_remap_transcript():
+    result = {
+        "text": " Hello there. Bye.",
+        "language": "en",
+        "segments": [
+            {"start": 0.1, "end": 2.2, "text": " Hello there.", "words": [
+                {"text": "Hello", "start": 0.1, "end": 0.6},
+                {"text": "there.", "start": 0.7, "end": 2.2},
+            ]},
+            {"start": 2.15, "end": 2.9, "text": " Bye.", "words": [{"text": "Bye.", "start": 2.15, "end": 2.9}]},
+        ],
+    }
+    remapped = remap_transcript(result, TIMELINE)
+    assert remapped["text"] == result["text"]
+    first, second = remapped["segments"]
+    assert [(w["start"], w["end"]) for w in first["words"]] == [(2.1, 2.6), (2.7, 4.0)]
+    assert (second["start"], second["end"]) == (10.0, 10.6)
+    assert second["words"][0]["start"] == 10.0
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from app.core.ass_subtitles import ass_color, ass_timestamp, build_ass, srt_timestamp, write_srt
+
+STYLE = {
+    "font": "DejaVuSans-Bold", "fontsize": 48, "fontcolor": "yellow", "stroke_color": "black",
+    "stroke_width": 2, "text_max_width": 1600, "vertical_align": "bottom", "margin": 80,
+}
+
+
+@pytest.mark.parametrize("color, expected", [
+    ("yellow", "&H0000FFFF"),
+    ("#ff0000", "&H000000FF"),
+    ("#0000ff", "&H00FF0000"),
+    ("#11223380", "&H7F332211"),
+    ("rgba(0,0,0,0)", "&HFF000000"),
+])
+def test_ass_color_is_alpha_bgr(color, expected):
+    assert ass_color(color) == expected
+
+
+@pytest.mark.parametrize("seconds, ass, srt", [
+    (0, "0:00:00.00", "00:00:00,000"),
+    (-0.5, "0:00:00.00", "00:00:00,000"),
+    (1.5, "0:00:01.50", "00:00:01,500"),
+    (59.9996, "0:01:00.00", "00:01:00,000"),
+    (3661.5, "1:01:01.50", "01:01:01,500"),
+])
+def test_timestamps_round_and_carry(seconds, ass, srt):
+    assert ass_timestamp(seconds) == ass
+    assert srt_timestamp(seconds) == srt
+
+
+def test_ass_escapes_override_braces_backslashes_and_newlines():
+    script = build_ass([((0, 1.5), "a {b}\nc\\d")], STYLE, 1920, 1080)
+    assert script.rstrip("\n").splitlines()[-1] == "Dialogue: 0,0:00:00.00,0:00:01.50,Default,,0,0,0,,a (b)\\Nc\\\\d"
+
+
+def test_srt_keeps_line_breaks_but_not_blank_lines(tmp_path):
+    path = write_srt([((0, 1), "{a}\n\nb"), ((1, 2.25), "c")], str(tmp_path / "out.srt"))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "1\n00:00:00,000 --> 00:00:01,000\n{a}\nb\n\n2\n00:00:01,000 --> 00:00:02,250\nc\n\n"
@@ -0,0 +1,27 @@
+from app.core import transcription, whisper_models
+from app.utils.media_store import MediaStore
+
+
+def test_same_audio_is_transcribed_once(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_run(audio_filename, model, language, options, chunked_duration=None):
+        calls.append((model, options))
+        return {"text": " Hello world.", "segments": [{"words": [{"text": "Hello", "end": 0.5}, {"text": "world.", "end": 1.0}]}]}
+
+    monkeypatch.setattr(whisper_models, "WHISPER_DEVICE", "cpu")
+    monkeypatch.setattr(transcription, "_run_transcription", fake_run)
+    monkeypatch.setattr(transcription, "_transcript_store", MediaStore(root=str(tmp_path / "store"), max_bytes=1024 * 1024))
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF-audio")
+    copy = tmp_path / "b.wav"
+    copy.write_bytes(b"RIFF-audio")
+
+    first = transcription.transcribe(str(audio), model_size="base")
+    second = transcription.transcribe(str(copy), model_size="base")
+    assert first == second
+    assert len(calls) == 1
+
+    transcription.transcribe(str(audio), model_size="small")
+    transcription.transcribe(str(audio), model_size="base", language="en")
+    assert len(calls) == 3
@@ -0,0 +1,57 @@
+import wave
+
+import pytest
+
+from app.core.tts_sentences import WavStitcher, split_sentences, stitch_wavs, tts_cache_key
+
+
+def write_wav(path, frames, rate=24000):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\x01\x00" * frames)
+    return str(path)
+
+
+def test_split_sentences():
+    text = 'Cats sleep a lot. Why? "They can!" Smith said so\nNew line'
+    assert split_sentences(text) == ["Cats sleep a lot.", "Why?", '"They can!"', "Smith said so\nNew line"]
+    assert split_sentences("  ") == []
+
+
+def test_stitch_keeps_order_and_reports_offsets(tmp_path):
+    parts = [write_wav(tmp_path / "a.wav", 12000), write_wav(tmp_path / "b.wav", 24000)]
+    output = str(tmp_path / "out.wav")
+    assert stitch_wavs(parts, output) == [(0.0, 0.5), (0.5, 1.5)]
+    with wave.open(output, "rb") as wf:
+        assert wf.getnframes() == 36000
+
+
+def test_stitcher_appends_in_order_as_sentences_finish(tmp_path):
+    parts = [write_wav(tmp_path / f"{i}.wav", 12000 * (i + 1)) for i in range(3)]
+    output = str(tmp_path / "out.wav")
+    with WavStitcher(output) as stitcher:
+        stitcher.add(1, parts[1])
+        assert stitcher.offsets == [] and stitcher.pending == [1]
+        stitcher.add(0, parts[0])
+        assert stitcher.offsets == [(0.0, 0.5), (0.5, 1.5)] and stitcher.pending == []
+        stitcher.add(2, parts[2])
+    assert stitcher.offsets[-1] == (1.5, 3.0)
+    with wave.open(output, "rb") as wf:
+        assert wf.getnframes() == 72000
+
+
+def test_stitch_rejects_mixed_formats(tmp_path):
+    parts = [write_wav(tmp_path / "a.wav", 100), write_wav(tmp_path / "b.wav", 100, rate=16000)]
+    with pytest.raises(ValueError):
+        stitch_wavs(parts, str(tmp_path / "out.wav"))
+
+
+def test_cache_key_ignores_spacing_only():
+    key = tts_cache_key("kokoro", "af_heart", 0.8, "Hello  world.\n", "wav")
+    assert key == tts_cache_key("kokoro", "af_heart", 0.8, " Hello world.", "wav")
+    assert key != tts_cache_key("kokoro", "af_heart", 1.0, "Hello world.", "wav")
+    assert key != tts_cache_key("kokoro", "af_bella", 0.8, "Hello world.", "wav")
+    assert key != tts_cache_key("edge", "af_heart", 0.8, "Hello world.", "wav")
+    assert key != tts_cache_key("kokoro", "af_heart", 0.8, "Hello world!", "wav")
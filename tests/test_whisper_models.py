@@ -0,0 +1,9 @@
+import pytest
+
+from app.core import whisper_models
+
+
+def test_int8_is_cpu_only():
+    with pytest.raises(ValueError):
+        whisper_models.get_whisper_model("base", "cuda", "int8")
+    assert ("base", "cuda", "int8") not in whisper_models.whisper_model_stats()
@@ -0,0 +1,123 @@
+import socket
+import sys
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import Listener
+
+import pytest
+
+from app.worker import WorkerJob, _ConnectionWriter, serve
+
+AUTHKEY = b"test-key"
+
+
+class _FakeConn:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def test_writer_forwards_lines_and_progress_redraws():
+    conn = _FakeConn()
+    writer = _ConnectionWriter(conn)
+    writer.write("Rendering video...\n 10%|#  \r 20%|## ")
+    writer.flush()
+    assert [m["line"] for m in conn.sent] == ["Rendering video...", " 10%|#  ", " 20%|## "]
+
+
+def test_worker_job_reads_like_a_subprocess():
+    listener = Listener(("127.0.0.1", 0), authkey=AUTHKEY)
+    host, port = listener.address
+    received = {}
+
+    def serve_one():
+        with listener.accept() as conn:
+            received.update(conn.recv())
+            conn.send({"line": "Generating captions..."})
+            conn.send({"returncode": 0})
+
+    thread = threading.Thread(target=serve_one)
+    thread.start()
+    job = WorkerJob(["--theme", "t", "--title", "x"], env={"VOICE_ID": "af_heart"}, address=f"{host}:{port}", authkey=AUTHKEY)
+    assert job.stdout.readline() == "Generating captions...\n"
+    assert job.stdout.readline() == ""
+    assert job.poll() == 0
+    thread.join()
+    listener.close()
+    assert received == {"argv": ["--theme", "t", "--title", "x"], "env": {"VOICE_ID": "af_heart"}}
+
+
+def _square(x):
+    return x * x
+
+
+def _pool_job(argv):
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        print("sum:", sum(pool.map(_square, range(int(argv[0])))))
+
+
+def _shout(x):
+    print(f"child {x}")
+    sys.stderr.write(f"child error {x}\n")
+    return x
+
+
+def _printing_pool_job(argv):
+    # A partial line in the job's writer (multiprocessing flushes it once before forking)
+    print("before pool", end=" ")
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        total = sum(pool.map(_shout, range(4)))
+    print("done", total)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run_in_worker(job_func, argv):
+    """Output and return code of argv run by job_func in a forked worker."""
+    address = f"127.0.0.1:{_free_port()}"
+    server = multiprocessing.get_context("fork").Process(
+        target=serve, args=(address, 1, AUTHKEY), kwargs=dict(warm_up_func=lambda: None, job_func=job_func),
+    )
+    server.start()
+    try:
+        deadline = time.time() + 10
+        while True:
+            try:
+                job = WorkerJob(argv, address=address, authkey=AUTHKEY)
+                break
+            except ConnectionRefusedError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+        return job.stdout.read(), job.poll()
+    finally:
+        server.terminate()
+        server.join(15)
+        assert server.exitcode == 0
+
+
+def test_worker_jobs_can_start_process_pools():
+    output, returncode = _run_in_worker(_pool_job, ["4"])
+    assert "sum: 14" in output
+    assert returncode == 0
+
+
+def test_pool_workers_do_not_write_to_the_client_socket():
+    output, returncode = _run_in_worker(_printing_pool_job, [])
+    # Sent once by the job, never replayed or joined by the children's output
+    assert output == "before pool \ndone 6\n"
+    assert returncode == 0
+
+
+def test_serve_refuses_to_start_without_a_key(monkeypatch):
+    monkeypatch.setattr("app.worker.JOB_WORKER_AUTHKEY", None)
+    with pytest.raises(SystemExit):
+        serve(f"127.0.0.1:{_free_port()}", 1)